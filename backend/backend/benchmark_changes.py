@@ -0,0 +1,93 @@
+"""
+Benchmark /api/changes queries on a synthetic change set.
+
+    python benchmark_changes.py [number_of_changes]
+
+Compares the ChangeIndex with the previous approach of filtering and sorting
+every change per request, and checks that both return the same pages.
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List, Tuple
+from change_index import ChangeIndex, SIZE_THRESHOLDS, parse_timestamp
+
+def synthetic_changes(count: int, companies: int = 300, seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    changes = []
+    for n in range(count):
+        company = f"company{rng.randrange(companies)}.com"
+        to_version = (start + timedelta(seconds=rng.randrange(5 * 365 * 24 * 3600))).strftime("%Y%m%d_%H%M%S")
+        from_version = f"{n:08d}_000000"
+        total_changes = int(rng.expovariate(1 / 30))
+        changes.append({
+            "id": f"{company}_{from_version}_{to_version}",
+            "company": company,
+            "from_version": f"{from_version}.json",
+            "to_version": f"{to_version}.json",
+            "timestamp": datetime.strptime(to_version, "%Y%m%d_%H%M%S").isoformat() + "Z",
+            "total_changes": total_changes
+        })
+    return changes
+
+def linear_query(changes: List[dict], company=None, change_size=None, from_dt=None, to_dt=None,
+                 offset=0, limit=20) -> Tuple[int, List[dict]]:
+    """The original get_recent_changes filtering, kept as the baseline."""
+    filtered = list(changes)
+    if company:
+        filtered = [c for c in filtered if c['company'] == company]
+    if change_size:
+        threshold = SIZE_THRESHOLDS.get(change_size.lower())
+        if threshold:
+            filtered = [c for c in filtered if c['total_changes'] >= threshold]
+    if from_dt:
+        filtered = [c for c in filtered if parse_timestamp(c['timestamp']) >= from_dt]
+    if to_dt:
+        filtered = [c for c in filtered if parse_timestamp(c['timestamp']) <= to_dt]
+    filtered.sort(key=lambda c: (c['timestamp'], c['id']), reverse=True)
+    return len(filtered), filtered[offset:offset + limit]
+
+def random_queries(changes: List[dict], count: int, seed: int = 1) -> List[dict]:
+    rng = random.Random(seed)
+    companies = sorted({c['company'] for c in changes})
+    queries = []
+    for _ in range(count):
+        from_dt = datetime(2020, 1, 1) + timedelta(days=rng.randrange(5 * 365))
+        queries.append({
+            'company': rng.choice([None, rng.choice(companies)]),
+            'change_size': rng.choice([None, 'small', 'medium', 'large']),
+            'from_dt': rng.choice([None, from_dt]),
+            'to_dt': rng.choice([None, from_dt + timedelta(days=rng.randrange(1, 900))]),
+            'offset': rng.choice([0, 20, 200, 2000]),
+            'limit': 20
+        })
+    return queries
+
+def run(count: int) -> None:
+    changes = synthetic_changes(count)
+
+    start = time.perf_counter()
+    index = ChangeIndex(changes)
+    print(f"{count} changes, index built in {time.perf_counter() - start:.3f}s")
+
+    queries = random_queries(changes, 200)
+    baseline_queries = queries[:20]
+
+    start = time.perf_counter()
+    expected = [linear_query(changes, **query) for query in baseline_queries]
+    linear_time = (time.perf_counter() - start) / len(baseline_queries)
+
+    start = time.perf_counter()
+    for query in queries:
+        index.query(**query)
+    index_time = (time.perf_counter() - start) / len(queries)
+
+    identical = all(index.query(**query) == result for query, result in zip(baseline_queries, expected))
+    print(f"linear: {linear_time * 1000:.2f} ms/query")
+    print(f"index:  {index_time * 1000:.4f} ms/query")
+    print(f"same results: {identical}")
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
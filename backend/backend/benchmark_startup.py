@@ -0,0 +1,77 @@
+"""
+Benchmark backend startup on a synthetic diffs directory.
+
+    python benchmark_startup.py [number_of_diffs] [companies]
+
+Times the previous eager load (json.load of every diff file in turn), a
+parallel rebuild of the metadata index, and a load from the prebuilt index.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from change_index import ChangeIndex
+from metadata_index import DIFF_FILENAME_PATTERN, MetadataIndex, build_index_file
+
+def write_synthetic_diffs(diffs_dir: str, count: int, companies: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    paragraph = "we may share personal information with third parties for advertising " * 20
+    start = datetime(2020, 1, 1)
+    for n in range(count):
+        company_dir = os.path.join(diffs_dir, f"company{n % companies}.com")
+        os.makedirs(company_dir, exist_ok=True)
+        from_version = (start + timedelta(hours=2 * n)).strftime("%Y%m%d_%H%M%S")
+        to_version = (start + timedelta(hours=2 * n + 1)).strftime("%Y%m%d_%H%M%S")
+        changed = {
+            f"root['content'][{i}]['text']": [{"type": "replaced", "old_value": paragraph, "new_value": paragraph, "position": 0}]
+            for i in range(rng.randint(1, 40))
+        }
+        diff = {
+            "from_version": f"{from_version}.json",
+            "to_version": f"{to_version}.json",
+            "diff": {"changed": changed},
+            "summary": {"total_changes": len(changed), "changed": len(changed), "added": 0, "removed": 0,
+                        "type_changes": 0, "preview": []}
+        }
+        with open(os.path.join(company_dir, f"diff_{from_version}_{to_version}.json"), 'w') as f:
+            json.dump(diff, f)
+
+def eager_load(diffs_dir: str) -> int:
+    """The original load_changes: parse every diff file in full, one after another."""
+    changes = {}
+    for company in os.listdir(diffs_dir):
+        company_dir = os.path.join(diffs_dir, company)
+        for diff_file in os.listdir(company_dir):
+            match = DIFF_FILENAME_PATTERN.match(diff_file)
+            if match:
+                with open(os.path.join(company_dir, diff_file), 'r') as f:
+                    changes[diff_file] = json.load(f)
+    return len(changes)
+
+def index_load(index_path: str) -> int:
+    metadata = MetadataIndex(index_path)
+    records = [change for change, path in metadata.records() if path]
+    ChangeIndex(records)
+    return len(records)
+
+def timed(label: str, func, *args) -> None:
+    start = time.perf_counter()
+    result = func(*args)
+    print(f"{label:<32}{time.perf_counter() - start:>8.2f}s  ({result} changes)" if result is not None
+          else f"{label:<32}{time.perf_counter() - start:>8.2f}s")
+
+def run(count: int, companies: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        diffs_dir = os.path.join(tmp, 'diffs')
+        index_path = os.path.join(tmp, 'diffs.idx')
+        write_synthetic_diffs(diffs_dir, count, companies)
+
+        timed("eager json.load of every diff", eager_load, diffs_dir)
+        timed("parallel index rebuild", build_index_file, diffs_dir, index_path)
+        timed("load from prebuilt index", index_load, index_path)
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000, int(sys.argv[2]) if len(sys.argv) > 2 else 100)
@@ -0,0 +1,155 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+SIZE_THRESHOLDS = {'small': 10, 'medium': 50, 'large': 100}
+
+def parse_timestamp(timestamp: str) -> datetime:
+    return datetime.fromisoformat(timestamp[:-1])
+
+def list_keys(change: dict) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    The (company, change size) lists a change belongs to, None meaning any.
+    """
+    total_changes = change['total_changes']
+    sizes = [None] + [size for size, threshold in SIZE_THRESHOLDS.items() if total_changes >= threshold]
+    return [(company, size) for company in (None, change['company']) for size in sizes]
+
+def find_position(timestamps: List[datetime], entries: List[dict], timestamp: datetime, change_id: str) -> int:
+    # Lists are ordered by (timestamp, id)
+    lo = bisect_left(timestamps, timestamp)
+    hi = bisect_right(timestamps, timestamp, lo)
+    return bisect_left(entries, change_id, lo, hi, key=lambda c: c['id'])
+
+class ChangeIndex:
+    """
+    Read-only query index over the changes, built once at load time.
+
+    Every (company, change size) combination gets its own list of changes sorted
+    oldest first, with a parallel list of parsed timestamps. A query picks the
+    matching list, bisects it for the date range and slices one page off the
+    newest end, so it costs O(log n + limit) however much history there is.
+
+    updated() applies a refresh's delta to a copy, leaving this index untouched
+    for requests still reading it.
+    """
+    def __init__(self, changes: Iterable[dict]):
+        self.changes: Dict[str, dict] = {}
+        self.companies = set()
+        self._lists: Dict[Tuple[Optional[str], Optional[str]], Tuple[List[datetime], List[dict]]] = {}
+
+        ordered = sorted(changes, key=lambda c: (c['timestamp'], c['id']))
+        for change in ordered:
+            self.changes[change['id']] = change
+            self.companies.add(change['company'])
+
+            timestamp = parse_timestamp(change['timestamp'])
+            for key in list_keys(change):
+                timestamps, entries = self._lists.setdefault(key, ([], []))
+                timestamps.append(timestamp)
+                entries.append(change)
+
+    def updated(self, added: Iterable[dict] = (), removed: Iterable[str] = ()) -> 'ChangeIndex':
+        """
+        A new index with the ids in `removed` dropped and the changes in `added`
+        inserted, replacing any with the same id. Only the lists those changes
+        belong to are copied, so a refresh costs O(n) list copies instead of a
+        re-sort and a timestamp parse of every change.
+        """
+        index = ChangeIndex(())
+        index.changes = dict(self.changes)
+        index.companies = set(self.companies)
+        index._lists = dict(self._lists)
+        copied = set()
+
+        def lists_of(change):
+            for key in list_keys(change):
+                if key not in copied:
+                    timestamps, entries = index._lists.get(key, ([], []))
+                    index._lists[key] = (list(timestamps), list(entries))
+                    copied.add(key)
+                yield key, index._lists[key]
+
+        def drop(change_id):
+            change = index.changes.pop(change_id, None)
+            if change is None:
+                return
+            timestamp = parse_timestamp(change['timestamp'])
+            for key, (timestamps, entries) in lists_of(change):
+                position = find_position(timestamps, entries, timestamp, change_id)
+                if position < len(entries) and entries[position]['id'] == change_id:
+                    del timestamps[position]
+                    del entries[position]
+                if not entries:
+                    del index._lists[key]
+            if (change['company'], None) not in index._lists:
+                index.companies.discard(change['company'])
+
+        for change_id in removed:
+            drop(change_id)
+        for change in added:
+            drop(change['id'])
+            index.changes[change['id']] = change
+            index.companies.add(change['company'])
+            timestamp = parse_timestamp(change['timestamp'])
+            for _, (timestamps, entries) in lists_of(change):
+                position = find_position(timestamps, entries, timestamp, change['id'])
+                timestamps.insert(position, timestamp)
+                entries.insert(position, change)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.changes)
+
+    def get(self, change_id: str) -> Optional[dict]:
+        return self.changes.get(change_id)
+
+    def _range(self, company: str, change_size: str, from_dt: datetime,
+               to_dt: datetime) -> Tuple[List[datetime], List[dict], int, int]:
+        size = change_size.lower() if change_size else None
+        if size not in SIZE_THRESHOLDS:
+            size = None
+
+        timestamps, entries = self._lists.get((company or None, size), ([], []))
+        lo = bisect_left(timestamps, from_dt) if from_dt else 0
+        hi = bisect_right(timestamps, to_dt) if to_dt else len(timestamps)
+        return timestamps, entries, lo, max(lo, hi)
+
+    def query(self, company: str = None, change_size: str = None, from_dt: datetime = None,
+              to_dt: datetime = None, offset: int = 0, limit: int = 20) -> Tuple[int, List[dict]]:
+        """
+        Return the number of matching changes and one page of them, newest first.
+        Unknown change sizes are ignored, as before.
+        """
+        _, entries, lo, hi = self._range(company, change_size, from_dt, to_dt)
+        start = max(hi - max(offset, 0), lo)
+        end = max(start - max(limit, 0), lo)
+        return hi - lo, entries[end:start][::-1]
+
+    def query_after(self, company: str = None, change_size: str = None, from_dt: datetime = None,
+                    to_dt: datetime = None, cursor: Tuple[datetime, str] = None,
+                    limit: int = 20) -> Tuple[int, List[dict]]:
+        """
+        Keyset pagination: the page of matching changes strictly older than the
+        (timestamp, id) cursor, newest first. Pages stay put as new changes arrive.
+        """
+        timestamps, entries, lo, hi = self._range(company, change_size, from_dt, to_dt)
+        total = hi - lo
+        if cursor:
+            timestamp, change_id = cursor
+            # Changes sharing a timestamp are ordered by id
+            tie_lo = max(lo, bisect_left(timestamps, timestamp, lo, hi))
+            tie_hi = max(tie_lo, bisect_right(timestamps, timestamp, lo, hi))
+            hi = bisect_left(entries, change_id, tie_lo, tie_hi, key=lambda c: c['id'])
+        end = max(hi - max(limit, 0), lo)
+        return total, entries[end:hi][::-1]
+
+    def iter_changes(self, company: str = None, change_size: str = None, from_dt: datetime = None,
+                     to_dt: datetime = None) -> Iterator[dict]:
+        """
+        Yield every matching change newest first without copying the list.
+        An index is never mutated once built, so a refresh during the iteration is harmless.
+        """
+        _, entries, lo, hi = self._range(company, change_size, from_dt, to_dt)
+        for position in range(hi - 1, lo - 1, -1):
+            yield entries[position]
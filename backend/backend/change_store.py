@@ -0,0 +1,178 @@
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from change_index import ChangeIndex
+from diff_store import DiffStore
+from metadata_index import (MetadataIndex, MetadataView, index_line, index_lock, list_companies,
+                            load_metadata_index, removal_line, segment_index_lines)
+
+class Snapshot:
+    """
+    An immutable view of the change database. Requests read store.snapshot once
+    and use it throughout, refreshes swap in a new one with a single assignment.
+    removed holds the ids the previous snapshot had and this one does not.
+    """
+    def __init__(self, generation: int, changes: Dict[str, dict], companies: Set[str],
+                 index: ChangeIndex, metadata: MetadataView, removed: Set[str] = frozenset()):
+        self.generation = generation
+        self.removed = removed
+        self.changes = changes
+        self.companies = companies
+        self.index = index
+        self.metadata = metadata
+
+    def summary(self, change_id: str) -> dict:
+        return self.metadata.summary(change_id) or {}
+
+class ChangeStore:
+    """
+    Owns the change database and keeps it in step with the diffs directory.
+
+    refresh() stats the diff files, ingests only those that are new or rewritten
+    since they were indexed, or deleted since, appends them to the shared
+    metadata index and swaps in a new snapshot built from the previous one. The
+    generation is the index's base generation plus the lines ingested, so every
+    worker reading the same index reports the same generation, and a rebuilt
+    index never reports one already used for different data.
+    """
+    def __init__(self, diffs_dir: str, index_path: str, workers: int = None, cache_size: int = 256):
+        self.diffs_dir = diffs_dir
+        self.index_path = index_path
+        self.workers = workers
+        self.diff_store = DiffStore(cache_size)
+        self.snapshot: Optional[Snapshot] = None
+        self.metadata: Optional[MetadataIndex] = None
+        self.listeners: List[Callable[[Snapshot], None]] = []
+        self._refresh_lock = threading.Lock()
+        self._refresh_requested = threading.Event()
+
+    def add_listener(self, listener: Callable[[Snapshot], None]) -> None:
+        """
+        Call listener with every new snapshot, from the thread that built it.
+        """
+        self.listeners.append(listener)
+
+    def _publish(self, snapshot: Snapshot) -> None:
+        self.snapshot = snapshot
+        for listener in self.listeners:
+            listener(snapshot)
+
+    def load(self) -> Snapshot:
+        with self._refresh_lock:
+            self.metadata = load_metadata_index(self.diffs_dir, self.index_path, self.workers)
+            self._publish(self._build_snapshot(None, self.metadata.records()))
+            return self.snapshot
+
+    def _build_snapshot(self, current: Optional[Snapshot], records: List[Tuple[dict, Optional[str]]]) -> Snapshot:
+        changes = dict(current.changes) if current else {}
+        added: Dict[str, dict] = {}
+        removed: Set[str] = set()
+        for change, diff_path in records:
+            change_id = change["id"]
+            self.diff_store.invalidate(change_id)
+            if diff_path is None:
+                self.diff_store.unregister(change_id)
+                changes.pop(change_id, None)
+                added.pop(change_id, None)
+                removed.add(change_id)
+            else:
+                changes[change_id] = change
+                added[change_id] = change
+                removed.discard(change_id)
+                self.diff_store.register(change_id, diff_path)
+        if current:
+            index = current.index.updated(added.values(), removed)
+        else:
+            index = ChangeIndex(changes.values())
+            # Built from scratch, so compare with whatever was published before
+            removed = self.snapshot.changes.keys() - changes.keys() if self.snapshot else set()
+            for change_id in removed:
+                self.diff_store.unregister(change_id)
+        companies = set(list_companies(self.diffs_dir))
+        return Snapshot(self.metadata.generation, changes, companies, index, self.metadata.view(), removed)
+
+    def updated_index_lines(self, metadata: MetadataIndex) -> List[bytes]:
+        """
+        Index lines for diff files that are new or rewritten since they were
+        indexed, for segment records not indexed yet, and removal lines for
+        indexed diffs that are gone.
+        """
+        lines = []
+        seen = set()
+        for company in list_companies(self.diffs_dir):
+            with os.scandir(os.path.join(self.diffs_dir, company)) as entries:
+                for entry in entries:
+                    if not entry.name.startswith('diff_') or not entry.name.endswith('.json'):
+                        continue
+                    seen.add(entry.path)
+                    indexed_mtime = metadata.mtimes.get(entry.path)
+                    if indexed_mtime is None or entry.stat().st_mtime > indexed_mtime:
+                        line = index_line(self.diffs_dir, company, entry.name)
+                        if line:
+                            lines.append(line)
+            lines.extend(segment_index_lines(self.diffs_dir, company, metadata.mtimes, seen))
+        lines.extend(removal_line(change_id, path) for path, change_id in metadata.ids.items() if path not in seen)
+        return lines
+
+    def refresh(self) -> bool:
+        """
+        Ingest new, changed or deleted diff files. Returns True if a new snapshot was swapped in.
+        """
+        with self._refresh_lock:
+            current = self.snapshot
+
+            with index_lock(self.index_path):
+                if self.metadata.is_replaced():
+                    # The index was rebuilt from scratch, start over from the new file
+                    self.metadata = MetadataIndex(self.index_path)
+                    current = None
+                    records = self.metadata.records()
+                else:
+                    # Pick up lines other workers appended, then anything they have not indexed yet
+                    records = self.metadata.read_new()
+
+                lines = self.updated_index_lines(self.metadata)
+                if lines:
+                    self.metadata.append(lines)
+                    records.extend(self.metadata.read_new())
+
+            companies = set(list_companies(self.diffs_dir))
+            if current is not None and not records and companies == current.companies:
+                return False
+
+            self._publish(self._build_snapshot(current, records))
+            return True
+
+    def request_refresh(self) -> None:
+        """
+        Ask the auto-refresh thread to refresh now. Requests made while a refresh
+        is pending or running are folded into the next one.
+        """
+        self._refresh_requested.set()
+
+    def start_auto_refresh(self, interval: Optional[float], logger=None) -> threading.Thread:
+        """
+        Refresh every interval seconds and whenever request_refresh() is called.
+        With no interval, only when requested.
+        """
+        def run():
+            while True:
+                self._refresh_requested.wait(interval)
+                self._refresh_requested.clear()
+                if stop.is_set():
+                    return
+                try:
+                    self.refresh()
+                except Exception as e:
+                    if logger:
+                        logger.error(f"Error refreshing changes: {e}")
+
+        def stop_refresh():
+            stop.set()
+            self._refresh_requested.set()
+
+        stop = threading.Event()
+        thread = threading.Thread(target=run, name="change-store-refresh", daemon=True)
+        thread.stop = stop_refresh
+        thread.start()
+        return thread
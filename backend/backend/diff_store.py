@@ -0,0 +1,55 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from segment_reader import is_segment_path, segment_reader
+
+class DiffStore:
+    """
+    Loads diff bodies from their diff_*.json files or segment records on first
+    request and keeps the most recently used ones in a bounded LRU cache, so the
+    process never holds every diff in memory.
+    """
+    def __init__(self, cache_size: int = 256):
+        self.cache_size = cache_size
+        self._paths: Dict[str, str] = {}
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, change_id: str, path: str) -> None:
+        self._paths[change_id] = path
+
+    def path(self, change_id: str) -> Optional[str]:
+        return self._paths.get(change_id)
+
+    def unregister(self, change_id: str) -> None:
+        self._paths.pop(change_id, None)
+        self.invalidate(change_id)
+
+    def invalidate(self, change_id: str) -> None:
+        with self._lock:
+            self._cache.pop(change_id, None)
+
+    def read_diff(self, path: str) -> dict:
+        if is_segment_path(path):
+            return segment_reader.read(path).get('diff', {})
+        with open(path, 'r') as f:
+            return json.load(f).get('diff', {})
+
+    def get(self, change_id: str) -> Optional[dict]:
+        with self._lock:
+            if change_id in self._cache:
+                self._cache.move_to_end(change_id)
+                return self._cache[change_id]
+
+        path = self._paths.get(change_id)
+        if path is None:
+            return None
+        diff = self.read_diff(path)
+
+        with self._lock:
+            self._cache[change_id] = diff
+            self._cache.move_to_end(change_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return diff
@@ -0,0 +1,104 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+from flask import Request, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def query_etag(prefix: str, request: Request) -> str:
+    """
+    Weak ETag for a query, from a version prefix and the normalised query string.
+    Weak because the same ETag is sent for every Content-Encoding of the body.
+    """
+    query = '&'.join(f"{key}={value}" for key, value in sorted(request.args.items(multi=True)))
+    return f"{prefix}-{hashlib.sha1(query.encode('utf-8')).hexdigest()[:16]}"
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {part.split(';')[0].strip() for part in accept_encoding.lower().split(',')}
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+class ResponseCache:
+    """
+    Memoises serialised (and compressed) JSON bodies for repeated requests, such as
+    the unfiltered first page. Keys include the store generation or the change
+    version, so stale entries are never hit. invalidate() drops them early, e.g.
+    once their change has been removed.
+    """
+    def __init__(self, max_entries: int = 128, min_compress_size: int = 1024):
+        self.max_entries = max_entries
+        self.min_compress_size = min_compress_size
+        self._bodies: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key) -> Optional[bytes]:
+        with self._lock:
+            body = self._bodies.get(key)
+            if body is not None:
+                self._bodies.move_to_end(key)
+            return body
+
+    def _put(self, key, body: bytes) -> None:
+        with self._lock:
+            self._bodies[key] = body
+            self._bodies.move_to_end(key)
+            while len(self._bodies) > self.max_entries:
+                self._bodies.popitem(last=False)
+
+    def invalidate(self, stale: Callable[[str], bool]) -> None:
+        """
+        Drop every entry whose ETag stale() returns True for.
+        """
+        with self._lock:
+            for key in [key for key in self._bodies if stale(key[0])]:
+                del self._bodies[key]
+
+    def body(self, key, serialize: Callable[[], bytes], encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        raw = self._get((key, None))
+        if raw is None:
+            raw = serialize()
+            self._put((key, None), raw)
+
+        if encoding is None or len(raw) < self.min_compress_size:
+            return raw, None
+
+        encoded = self._get((key, encoding))
+        if encoded is None:
+            encoded = compress(raw, encoding)
+            self._put((key, encoding), encoded)
+        return encoded, encoding
+
+    def respond(self, request: Request, etag: str, build: Callable[[], bytes],
+                cache_control: str, last_modified: float = None) -> Response:
+        """
+        Answer a conditional GET with 304 before building anything, otherwise send
+        the memoised body, compressed when the client accepts it.
+        """
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+            body, content_encoding = self.body(etag, build, encoding)
+            response = Response(body, mimetype='application/json')
+            if content_encoding:
+                response.headers['Content-Encoding'] = content_encoding
+
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = cache_control
+        response.vary.add('Accept-Encoding')
+        if last_modified is not None:
+            response.last_modified = last_modified
+        return response
@@ -1,104 +1,301 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from datetime import datetime
+import base64
+import hmac
+import math
 import os
-import json
-import re
+from change_index import parse_timestamp
+from change_store import ChangeStore
+from http_cache import ResponseCache, query_etag
+from logger import TIMING_LOGS, record_timing, timed
+from search_index import SearchIndex
+from segment_reader import is_segment_path
+import threading
+import time
 
 app = Flask(__name__)
 CORS(app)
 
-# Database to store changes
-changes_db = {}
-companies = set()
+# Database to store changes, summaries and diff bodies are read on demand
+store = ChangeStore(
+    'diffs',
+    os.environ.get('CHANGE_INDEX_PATH', 'diffs.idx'),
+    int(os.environ['INDEX_WORKERS']) if os.environ.get('INDEX_WORKERS') else None,
+    int(os.environ.get('DIFF_CACHE_SIZE', 256))
+)
+
+response_cache = ResponseCache(
+    int(os.environ.get('RESPONSE_CACHE_SIZE', 128)),
+    int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+)
+
+search_index = SearchIndex(os.environ.get('SEARCH_INDEX_PATH', 'search.idx'))
+
+# /api/refresh is only served with a token, and accepted at most once every REFRESH_MIN_INTERVAL seconds
+REFRESH_TOKEN = os.environ.get('REFRESH_TOKEN')
+REFRESH_MIN_INTERVAL = float(os.environ.get('REFRESH_MIN_INTERVAL', 5))
+last_refresh_request = 0.0
+refresh_request_lock = threading.Lock()
+
+# Largest page a list request may ask for, larger limits are clamped to it
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 100))
+
+# Fields a list request may ask for, diff bodies are only served by /api/changes/<id>
+LIST_FIELDS = ("id", "company", "from_version", "to_version", "timestamp", "summary")
 
 def load_changes():
-    global changes_db, companies
-    diffs_dir = 'diffs'
-    
-    for company in os.listdir(diffs_dir):
-        companies.add(company)
-        company_dir = os.path.join(diffs_dir, company)
-        
-        for diff_file in os.listdir(company_dir):
-            if diff_file.startswith('diff_') and diff_file.endswith('.json'):
-                with open(os.path.join(company_dir, diff_file), 'r') as f:
-                    diff_data = json.load(f)
-                
-                # Extract information from filename
-                match = re.match(r'diff_(\d{8}_\d{6})_(\d{8}_\d{6})\.json', diff_file)
-                if match:
-                    from_version, to_version = match.groups()
-                    change_id = f"{company}_{from_version}_{to_version}"
-                    
-                    # Create change object
-                    change = {
-                        "id": change_id,
-                        "company": company,
-                        "from_version": f"{from_version}.json",
-                        "to_version": f"{to_version}.json",
-                        "timestamp": datetime.strptime(to_version, "%Y%m%d_%H%M%S").isoformat() + "Z",
-                        "summary": diff_data.get('summary', {}),
-                        "diff": diff_data.get('diff', {})
-                    }
-                    
-                    changes_db[change_id] = change
+    # Reads the prebuilt index, rebuilding it in parallel first if any company has new diffs
+    with timed('load_changes') as timing:
+        store.load()
+        timing['changes'] = len(store.snapshot.changes)
+
+    # Memoised bodies of the old generation's pages and of removed changes can never be hit again
+    def drop_stale_responses(snapshot):
+        current = f"changes-{snapshot.generation}-"
+        removed = tuple(f"change-{change_id}-" for change_id in snapshot.removed)
+        response_cache.invalidate(
+            lambda etag: (etag.startswith("changes-") and not etag.startswith(current)) or etag.startswith(removed)
+        )
+    store.add_listener(drop_stale_responses)
+
+    # The first sync may read every diff, keep it off the startup path; later
+    # syncs run on the refresh thread and only read new or rewritten diffs
+    sync_search = lambda snapshot: search_index.sync(snapshot, store.diff_store)
+    threading.Thread(target=sync_search, args=(store.snapshot,), name="search-index-sync", daemon=True).start()
+    store.add_listener(sync_search)
+
+    # Pick up new diff files every REFRESH_INTERVAL seconds, 0 turns it off; with
+    # a REFRESH_TOKEN the thread also runs the refreshes /api/refresh asks for
+    refresh_interval = float(os.environ.get('REFRESH_INTERVAL', 30))
+    if refresh_interval > 0 or REFRESH_TOKEN:
+        store.start_auto_refresh(refresh_interval if refresh_interval > 0 else None, app.logger)
+
+def change_view(snapshot, change, fields=LIST_FIELDS):
+    view = {field: change[field] for field in fields if field != "summary"}
+    if "summary" in fields:
+        view["summary"] = snapshot.summary(change["id"])
+    return view
 
 # Load changes when the app starts
 load_changes()
 
-@app.route('/api/changes', methods=['GET'])
-def get_recent_changes():
-    page = int(request.args.get('page', 1))
-    limit = int(request.args.get('limit', 20))
-    company = request.args.get('company')
-    change_size = request.args.get('changeSize')
+if TIMING_LOGS:
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def log_request_timing(response):
+        record_timing('request', time.perf_counter() - g.request_start,
+                      path=request.path, status=response.status_code)
+        return response
+
+DATE_ERROR = "fromDate and toDate must be dates in YYYY-MM-DD form"
+
+def parse_filters():
+    """
+    The company, changeSize and date filters. Raises ValueError for a malformed date.
+    """
     from_date = request.args.get('fromDate')
     to_date = request.args.get('toDate')
+    return {
+        "company": request.args.get('company'),
+        "change_size": request.args.get('changeSize'),
+        "from_dt": datetime.strptime(from_date, "%Y-%m-%d") if from_date else None,
+        "to_dt": datetime.strptime(to_date, "%Y-%m-%d") if to_date else None
+    }
+
+def parse_fields():
+    fields = request.args.get('fields')
+    if fields:
+        return tuple(f for f in fields.split(',') if f in LIST_FIELDS) or LIST_FIELDS
+    return LIST_FIELDS
 
-    filtered_changes = list(changes_db.values())
-
-    # Apply filters
-    if company:
-        filtered_changes = [c for c in filtered_changes if c['company'] == company]
-    if change_size:
-        # Implement change size filtering logic
-        size_thresholds = {'small': 10, 'medium': 50, 'large': 100}
-        threshold = size_thresholds.get(change_size.lower())
-        if threshold:
-            filtered_changes = [c for c in filtered_changes if c['summary']['total_changes'] >= threshold]
-    if from_date:
-        from_dt = datetime.strptime(from_date, "%Y-%m-%d")
-        filtered_changes = [c for c in filtered_changes if datetime.fromisoformat(c['timestamp'][:-1]) >= from_dt]
-    if to_date:
-        to_dt = datetime.strptime(to_date, "%Y-%m-%d")
-        filtered_changes = [c for c in filtered_changes if datetime.fromisoformat(c['timestamp'][:-1]) <= to_dt]
-
-    # Sort changes by timestamp (newest first)
-    filtered_changes.sort(key=lambda x: x['timestamp'], reverse=True)
-
-    # Paginate
-    start = (page - 1) * limit
-    end = start + limit
-    paginated_changes = filtered_changes[start:end]
+def parse_limit():
+    """
+    The limit query parameter clamped to [1, MAX_PAGE_SIZE]. Raises ValueError if it is not an integer.
+    """
+    return min(max(int(request.args.get('limit', 20)), 1), MAX_PAGE_SIZE)
 
+def encode_cursor(change):
+    return base64.urlsafe_b64encode(f"{change['timestamp']}|{change['id']}".encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    timestamp, change_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|', 1)
+    return parse_timestamp(timestamp), change_id
+
+@app.route('/api/changes', methods=['GET'])
+def get_recent_changes():
+    try:
+        limit = parse_limit()
+        page = int(request.args.get('page', 1))
+    except ValueError:
+        return jsonify({"error": "limit and page must be integers"}), 400
+    if page < 1:
+        return jsonify({"error": "page must be at least 1"}), 400
+    try:
+        filters = parse_filters()
+    except ValueError:
+        return jsonify({"error": DATE_ERROR}), 400
+    selected_fields = parse_fields()
+    snapshot = store.snapshot
+
+    if 'cursor' in request.args:
+        # Keyset pagination on (timestamp, id), an empty cursor starts at the newest change
+        try:
+            cursor = decode_cursor(request.args['cursor']) if request.args['cursor'] else None
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        total, paginated_changes = snapshot.index.query_after(**filters, cursor=cursor, limit=limit)
+        # A full page may have more after it, a short or empty one is the last
+        next_cursor = encode_cursor(paginated_changes[-1]) if paginated_changes and len(paginated_changes) == limit else None
+        payload = lambda: {
+            "total": total,
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "generation": snapshot.generation,
+            "changes": [change_view(snapshot, change, selected_fields) for change in paginated_changes]
+        }
+    else:
+        # Newest first, filtered and paginated by the index
+        total, paginated_changes = snapshot.index.query(**filters, offset=(page - 1) * limit, limit=limit)
+        payload = lambda: {
+            "total": total,
+            "page": page,
+            "limit": limit,
+            "generation": snapshot.generation,
+            "changes": [change_view(snapshot, change, selected_fields) for change in paginated_changes]
+        }
+
+    # Serialised at most once per generation and query, and not at all for a 304
+    return response_cache.respond(
+        request,
+        query_etag(f"changes-{snapshot.generation}", request),
+        lambda: app.json.dumps(payload()).encode('utf-8'),
+        "no-cache"
+    )
+
+@app.route('/api/changes/export', methods=['GET'])
+def export_changes():
+    """
+    Stream every matching change as NDJSON, newest first, in constant memory.
+    includeDiff=true adds each diff body, read straight from disk. A diff deleted
+    since the snapshot was taken is sent as "diff": null with "diff_missing": true.
+    """
+    try:
+        filters = parse_filters()
+    except ValueError:
+        return jsonify({"error": DATE_ERROR}), 400
+    selected_fields = parse_fields()
+    include_diff = request.args.get('includeDiff', 'false').lower() == 'true'
+    snapshot = store.snapshot
+
+    def generate():
+        for change in snapshot.index.iter_changes(**filters):
+            view = change_view(snapshot, change, selected_fields)
+            if include_diff:
+                # The snapshot's own paths, the store's may have moved on since
+                try:
+                    view["diff"] = store.diff_store.read_diff(snapshot.metadata.paths[change["id"]])
+                except (KeyError, FileNotFoundError):
+                    view["diff"] = None
+                    view["diff_missing"] = True
+            yield app.json.dumps(view) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/search', methods=['GET'])
+def search_changes():
+    """
+    Ranked search over added and removed wording. q takes terms and "quoted phrases",
+    all of which must match; field=added|removed limits where they must appear.
+    """
+    query = request.args.get('q', '')
+    try:
+        limit = parse_limit()
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    try:
+        filters = parse_filters()
+    except ValueError:
+        return jsonify({"error": DATE_ERROR}), 400
+    snapshot = store.snapshot
+
+    def allowed(change_id):
+        change = snapshot.changes.get(change_id)
+        if change is None:
+            return False
+        if filters["company"] and change["company"] != filters["company"]:
+            return False
+        timestamp = parse_timestamp(change["timestamp"])
+        if filters["from_dt"] and timestamp < filters["from_dt"]:
+            return False
+        if filters["to_dt"] and timestamp > filters["to_dt"]:
+            return False
+        return True
+
+    results = search_index.search(query, request.args.get('field'), allowed)
     return jsonify({
-        "total": len(filtered_changes),
-        "page": page,
+        "total": len(results),
         "limit": limit,
-        "changes": paginated_changes
+        "generation": snapshot.generation,
+        "results": [
+            {**change_view(snapshot, snapshot.changes[change_id], ("id", "company", "from_version", "to_version", "timestamp")),
+             "score": round(score, 4)}
+            for change_id, score in results[:limit]
+        ]
     })
 
 @app.route('/api/changes/<string:id>', methods=['GET'])
 def get_change_details(id):
-    change = changes_db.get(id)
+    snapshot = store.snapshot
+    change = snapshot.changes.get(id)
     if not change:
         return jsonify({"error": "Change not found"}), 404
-    return jsonify(change)
+    # A change only gets a new version when its diff file is rewritten
+    path = snapshot.metadata.paths.get(id)
+    mtime = snapshot.metadata.mtimes.get(path, 0)
+    # A diff file deleted since the last refresh is gone, not answered from the memo
+    if path and not is_segment_path(path) and not os.path.exists(path):
+        return jsonify({"error": "Change not found"}), 404
+    return response_cache.respond(
+        request,
+        f"change-{id}-{mtime!r}",
+        lambda: app.json.dumps({**change_view(snapshot, change), "diff": store.diff_store.get(id)}).encode('utf-8'),
+        "public, max-age=300",
+        last_modified=mtime or None
+    )
 
 @app.route('/api/companies', methods=['GET'])
 def get_companies():
-    return jsonify({"companies": list(companies)})
+    return jsonify({"companies": list(store.snapshot.companies)})
+
+@app.route('/api/status', methods=['GET'])
+def get_status():
+    # Clients can poll the generation to find out when new changes have arrived
+    snapshot = store.snapshot
+    return jsonify({"generation": snapshot.generation, "total": len(snapshot.changes)})
+
+@app.route('/api/refresh', methods=['POST'])
+def refresh_changes():
+    # Called by the scraper's fused diff mode so new diffs show up without waiting for the next interval.
+    # The refresh runs on the refresh thread, the response only says it has been scheduled.
+    global last_refresh_request
+    if not REFRESH_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    if not hmac.compare_digest(request.headers.get('X-Refresh-Token', '').encode('utf-8'), REFRESH_TOKEN.encode('utf-8')):
+        return jsonify({"error": "Forbidden"}), 403
+    with refresh_request_lock:
+        wait = last_refresh_request + REFRESH_MIN_INTERVAL - time.monotonic()
+        if wait > 0:
+            response = jsonify({"error": "Too many refresh requests"})
+            response.headers['Retry-After'] = str(math.ceil(wait))
+            return response, 429
+        last_refresh_request = time.monotonic()
+    store.request_refresh()
+    snapshot = store.snapshot
+    return jsonify({"scheduled": True, "generation": snapshot.generation, "total": len(snapshot.changes)}), 202
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,314 @@
+"""
+Compact metadata index for the change database.
+
+The index is a header line followed by one line per change in a single file:
+
+    #generation \t base
+    id \t company \t from_version \t to_version \t timestamp \t total_changes \t mtime \t path \t summary-json
+
+path is a diff_*.json file or a record in the company's diffs.seg segment. A
+line with an empty timestamp records that the change's diff has been deleted.
+A reader's generation is base plus the number of change lines it has read. A
+rebuild starts its base past every generation the old file reached, so the
+generation only ever grows and names exactly one state of the index.
+
+It is rebuilt in parallel from the diff files whenever a company directory is
+newer than it, otherwise startup only reads this file. New or rewritten diff
+files are appended as new lines, the last line for an id wins. The file is
+memory-mapped and summaries are decoded from it on demand, so gunicorn workers
+share one copy through the page cache instead of each holding every summary on
+its heap. Writers take an flock on <index>.lock.
+
+    python metadata_index.py [diffs_dir] [index_path]   # prebuild after a differ run
+"""
+import fcntl
+import json
+import mmap
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from segment_reader import INDEX_FILE as SEGMENT_INDEX_FILE, read_index_entries, segment_path, segment_reader
+
+DIFF_FILENAME_PATTERN = re.compile(r'diff_(\d{8}_\d{6})_(\d{8}_\d{6})\.json')
+FIELD_COUNT = 8
+GENERATION_HEADER = b'#generation\t'
+
+def list_companies(diffs_dir: str) -> List[str]:
+    return sorted(d for d in os.listdir(diffs_dir) if os.path.isdir(os.path.join(diffs_dir, d)))
+
+def make_index_line(company: str, from_version: str, to_version: str, mtime: float,
+                    path: str, summary: dict) -> bytes:
+    fields = [
+        f"{company}_{from_version}_{to_version}",
+        company,
+        f"{from_version}.json",
+        f"{to_version}.json",
+        datetime.strptime(to_version, "%Y%m%d_%H%M%S").isoformat() + "Z",
+        str(summary.get('total_changes', 0)),
+        repr(mtime),
+        path,
+        json.dumps(summary, separators=(',', ':'))
+    ]
+    return '\t'.join(fields).encode('utf-8') + b'\n'
+
+def removal_line(change_id: str, path: str) -> bytes:
+    company = os.path.basename(os.path.dirname(path))
+    return '\t'.join([change_id, company, '', '', '', '0', '0', path, 'null']).encode('utf-8') + b'\n'
+
+def index_line(diffs_dir: str, company: str, diff_file: str) -> Optional[bytes]:
+    match = DIFF_FILENAME_PATTERN.match(diff_file)
+    if not match:
+        return None
+    diff_path = os.path.join(diffs_dir, company, diff_file)
+    mtime = os.path.getmtime(diff_path)
+    with open(diff_path, 'r') as f:
+        summary = json.load(f).get('summary', {})
+    return make_index_line(company, *match.groups(), mtime, diff_path, summary)
+
+def segment_index_lines(diffs_dir: str, company: str, known_paths=(), seen: set = None) -> List[bytes]:
+    """
+    Index lines for the company's segment entries whose path is not in known_paths.
+    A segment entry's write time stands in for a file mtime. Every entry's path
+    is added to seen, when given.
+    """
+    company_dir = os.path.join(diffs_dir, company)
+    lines = []
+    for from_version, to_version, offset, written_at in read_index_entries(company_dir):
+        path = segment_path(company_dir, offset)
+        if seen is not None:
+            seen.add(path)
+        if path in known_paths:
+            continue
+        summary = segment_reader.read(path).get('summary', {})
+        lines.append(make_index_line(company, from_version, to_version, written_at, path, summary))
+    return lines
+
+def scan_company(diffs_dir: str, company: str) -> List[bytes]:
+    """
+    Read the summary of every diff of one company, from diff files and from its
+    segment if it has one, and return index lines. Runs in a worker process.
+    """
+    lines = []
+    for diff_file in sorted(os.listdir(os.path.join(diffs_dir, company))):
+        line = index_line(diffs_dir, company, diff_file)
+        if line:
+            lines.append(line)
+    lines.extend(segment_index_lines(diffs_dir, company))
+    return lines
+
+@contextmanager
+def index_lock(index_path: str):
+    with open(f"{index_path}.lock", 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def read_base_generation(f) -> Tuple[int, int]:
+    """
+    The base generation in the header at the start of an open index file, and
+    the header's length. Files written before the header existed have base 0.
+    """
+    header = f.readline()
+    if header.startswith(GENERATION_HEADER) and header.endswith(b'\n'):
+        return int(header[len(GENERATION_HEADER):]), len(header)
+    return 0, 0
+
+def next_base_generation(index_path: str) -> int:
+    """
+    The base for a rebuild of index_path: past the last generation the current
+    file reached, and at least the current time in seconds, so it also moves
+    past a file that was deleted.
+    """
+    last = -1
+    try:
+        with open(index_path, 'rb') as f:
+            base, header_length = read_base_generation(f)
+            f.seek(header_length)
+            last = base + sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b''))
+    except FileNotFoundError:
+        pass
+    return max(last + 1, int(time.time()))
+
+def build_index_file(diffs_dir: str, index_path: str, workers: int = None) -> None:
+    """
+    Scan every company directory in parallel and atomically replace the index file.
+    """
+    companies = list_companies(diffs_dir)
+    base = next_base_generation(index_path)
+    # A unique temporary file, so concurrent builders never write into each other's copy
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(index_path)),
+                                    prefix=f"{os.path.basename(index_path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f, ProcessPoolExecutor(max_workers=workers) as executor:
+            f.write(GENERATION_HEADER + str(base).encode('ascii') + b'\n')
+            for lines in executor.map(scan_company, [diffs_dir] * len(companies), companies):
+                f.writelines(lines)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def index_is_stale(diffs_dir: str, index_path: str) -> bool:
+    # Adding or replacing a diff file updates its company directory's mtime,
+    # appending to a segment updates its index file's mtime
+    if not os.path.exists(index_path):
+        return True
+    index_mtime = os.path.getmtime(index_path)
+    for company in list_companies(diffs_dir):
+        company_dir = os.path.join(diffs_dir, company)
+        if os.path.getmtime(company_dir) > index_mtime:
+            return True
+        segment_index = os.path.join(company_dir, SEGMENT_INDEX_FILE)
+        if os.path.exists(segment_index) and os.path.getmtime(segment_index) > index_mtime:
+            return True
+    return False
+
+class MetadataView:
+    """
+    The summaries and mtimes of a MetadataIndex as of one read, for a snapshot.
+    Later reads of the index never change a view.
+    """
+    def __init__(self, mapping: Optional[mmap.mmap], summary_spans: Dict[str, Tuple[int, int]],
+                 mtimes: Dict[str, float], paths: Dict[str, str] = None):
+        self._mmap = mapping
+        self._summary_spans = summary_spans
+        self.mtimes = mtimes
+        # Change id -> the diff file or segment record it was read from
+        self.paths = paths if paths is not None else {}
+
+    def summary(self, change_id: str) -> Optional[dict]:
+        span = self._summary_spans.get(change_id)
+        if span is None:
+            return None
+        return json.loads(self._mmap[span[0]:span[1]])
+
+class MetadataIndex:
+    """
+    Memory-mapped view of an index file. read_new() gives the small per-change
+    fields of lines not seen yet; summary() decodes a change's summary straight
+    from the mapping.
+
+    The mapping and the dicts below are replaced rather than modified when new
+    lines are read, so view() can hand them to a snapshot without copying.
+    """
+    def __init__(self, index_path: str):
+        self.index_path = index_path
+        with open(index_path, 'rb') as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self.base_generation, self.header_length = read_base_generation(f)
+        self.offset = self.header_length
+        self.lines = 0
+        self.mtimes: Dict[str, float] = {}
+        # Path of every indexed diff -> its change id, and change id -> the path its last line gave
+        self.ids: Dict[str, str] = {}
+        self.paths: Dict[str, str] = {}
+        self._mmap = None
+        self._summary_spans: Dict[str, Tuple[int, int]] = {}
+
+    def _remap(self) -> None:
+        with open(self.index_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            # Requests may still be reading the old mapping, it is closed when collected
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    @property
+    def generation(self) -> int:
+        return self.base_generation + self.lines
+
+    def is_replaced(self) -> bool:
+        # A rebuild's file may reuse a freed inode, its header still tells it apart
+        try:
+            with open(self.index_path, 'rb') as f:
+                return (os.fstat(f.fileno()).st_ino != self.inode
+                        or read_base_generation(f)[0] != self.base_generation)
+        except FileNotFoundError:
+            return True
+
+    def read_new(self) -> List[Tuple[dict, Optional[str]]]:
+        """
+        Return (change, diff_path) for every line appended since the last call,
+        without decoding any summary. A deleted change comes back as
+        ({"id", "company"}, None).
+        """
+        self._remap()
+        records = []
+        mapping = self._mmap
+        if mapping is None or self.offset >= len(mapping):
+            return records
+
+        spans, mtimes, ids, paths = dict(self._summary_spans), dict(self.mtimes), dict(self.ids), dict(self.paths)
+        mapping.seek(self.offset)
+        while True:
+            line_start = mapping.tell()
+            line = mapping.readline()
+            if not line or not line.endswith(b'\n'):
+                break
+            parts = line.rstrip(b'\n').split(b'\t', FIELD_COUNT)
+            change_id, company, from_version, to_version, timestamp, total_changes, mtime, path = (
+                part.decode('utf-8') for part in parts[:FIELD_COUNT]
+            )
+            self.offset = line_start + len(line)
+            self.lines += 1
+            if not timestamp:
+                mtimes.pop(path, None)
+                ids.pop(path, None)
+                # The change may have been written again elsewhere, e.g. to the segment
+                if paths.get(change_id) == path:
+                    del paths[change_id]
+                    spans.pop(change_id, None)
+                    records.append(({"id": change_id, "company": company}, None))
+                continue
+            summary_start = line_start + sum(len(part) for part in parts[:FIELD_COUNT]) + FIELD_COUNT
+            spans[change_id] = (summary_start, line_start + len(line) - 1)
+            mtimes[path] = float(mtime)
+            ids[path] = change_id
+            paths[change_id] = path
+            records.append(({
+                "id": change_id,
+                "company": company,
+                "from_version": from_version,
+                "to_version": to_version,
+                "timestamp": timestamp,
+                "total_changes": int(total_changes)
+            }, path))
+        self._summary_spans, self.mtimes, self.ids, self.paths = spans, mtimes, ids, paths
+        return records
+
+    def records(self) -> List[Tuple[dict, Optional[str]]]:
+        self.offset = self.header_length
+        self.lines = 0
+        self._summary_spans, self.mtimes, self.ids, self.paths = {}, {}, {}, {}
+        return self.read_new()
+
+    def append(self, lines: Iterable[bytes]) -> None:
+        # Callers hold index_lock and have caught up with read_new first
+        with open(self.index_path, 'ab') as f:
+            f.writelines(lines)
+
+    def view(self) -> MetadataView:
+        return MetadataView(self._mmap, self._summary_spans, self.mtimes, self.paths)
+
+    def summary(self, change_id: str) -> Optional[dict]:
+        return self.view().summary(change_id)
+
+def load_metadata_index(diffs_dir: str, index_path: str, workers: int = None) -> MetadataIndex:
+    with index_lock(index_path):
+        if index_is_stale(diffs_dir, index_path):
+            build_index_file(diffs_dir, index_path, workers)
+    return MetadataIndex(index_path)
+
+if __name__ == "__main__":
+    diffs_directory = sys.argv[1] if len(sys.argv) > 1 else 'diffs'
+    index_file = sys.argv[2] if len(sys.argv) > 2 else 'diffs.idx'
+    with index_lock(index_file):
+        build_index_file(diffs_directory, index_file)
@@ -0,0 +1,268 @@
+import fcntl
+import json
+import math
+import os
+import re
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+QUERY_PATTERN = re.compile(r'"([^"]+)"|(\S+)')
+FIELDS = ('added', 'removed')
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+def element_texts(value: Any) -> Iterable[str]:
+    # Added or removed selector keys hold lists of {'html', 'text'} elements
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        if isinstance(value.get('text'), str):
+            yield value['text']
+    elif isinstance(value, list):
+        for item in value:
+            yield from element_texts(item)
+
+def diff_texts(diff: dict) -> Dict[str, List[str]]:
+    """
+    Collect the added and removed wording of a compact diff. Only the 'text'
+    side of changed elements is used, the 'html' side repeats it with markup.
+    """
+    texts = {field: [] for field in FIELDS}
+    for path, changes in diff.get('changed', {}).items():
+        if not path.endswith("['text']"):
+            continue
+        for change in changes:
+            if change['type'] == 'added':
+                texts['added'].append(change['value'])
+            elif change['type'] == 'removed':
+                texts['removed'].append(change['value'])
+            elif change['type'] == 'replaced':
+                texts['removed'].append(change['old_value'])
+                texts['added'].append(change['new_value'])
+    for field in FIELDS:
+        if isinstance(diff.get(field), dict):
+            for value in diff[field].values():
+                texts[field].extend(element_texts(value))
+    return texts
+
+def positions_by_term(texts: List[str]) -> Tuple[Dict[str, List[int]], int]:
+    positions = defaultdict(list)
+    position = 0
+    for text in texts:
+        for token in tokenize(text):
+            positions[token].append(position)
+            position += 1
+        # Leave a gap so phrases never match across two separate edits
+        position += 1
+    return dict(positions), position
+
+def parse_query(query: str) -> List[List[str]]:
+    """
+    Split a query into clauses: a quoted phrase is one clause of several terms,
+    every other word is a clause of its own. All clauses must match.
+    """
+    clauses = []
+    for phrase, term in QUERY_PATTERN.findall(query):
+        tokens = tokenize(phrase or term)
+        if tokens:
+            clauses.append(tokens)
+    return clauses
+
+class SearchIndex:
+    """
+    Inverted index over the wording added and removed by each change.
+
+    Each change's term positions are appended as one JSON line to the index
+    file, the last line for an id wins, so startup rebuilds the postings without
+    opening any diff file and only new or rewritten diffs are read. Writers take
+    an flock on <path>.lock and catch up with other workers' lines first.
+    Changes that leave the store are dropped from the postings on the next sync,
+    their lines stay in the file and are dropped again after a restart.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.postings: Dict[str, Dict[str, Dict[str, List[int]]]] = {field: defaultdict(dict) for field in FIELDS}
+        self.lengths: Dict[str, Dict[str, int]] = {field: {} for field in FIELDS}
+        self.versions: Dict[str, float] = {}
+        self._doc_terms: Dict[str, Dict[str, List[str]]] = {}
+        self._offset = 0
+        # _lock guards the postings for searches, _sync_lock runs one sync at a time
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+
+    def _remove(self, change_id: str) -> None:
+        for field, terms in self._doc_terms.pop(change_id, {}).items():
+            postings = self.postings[field]
+            for term in terms:
+                postings[term].pop(change_id, None)
+                if not postings[term]:
+                    del postings[term]
+            self.lengths[field].pop(change_id, None)
+
+    def _add(self, entry: dict) -> None:
+        change_id = entry['id']
+        self._remove(change_id)
+        self._doc_terms[change_id] = {}
+        for field in FIELDS:
+            terms = entry['fields'][field]
+            for term, positions in terms.items():
+                self.postings[field][term][change_id] = positions
+            self.lengths[field][change_id] = entry['lengths'][field]
+            self._doc_terms[change_id][field] = list(terms)
+        self.versions[change_id] = entry['version']
+
+    def _read_entries(self) -> Tuple[List[dict], int]:
+        """
+        Parse the lines appended since the last catch-up, without applying them.
+        Returns the entries and the offset after the last complete line.
+        """
+        entries = []
+        offset = self._offset
+        # Offsets are byte positions, so the file is read in binary
+        if not os.path.exists(self.path):
+            return entries, offset
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            while True:
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    # End of file, or a line a crashed writer left unfinished
+                    break
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # Unreadable, the change keeps its old version and is indexed again
+                    pass
+                offset = f.tell()
+        return entries, offset
+
+    def _catch_up(self) -> None:
+        entries, offset = self._read_entries()
+        with self._lock:
+            for entry in entries:
+                self._add(entry)
+        self._offset = offset
+
+    def _truncate_torn_tail(self) -> None:
+        # Callers hold the flock and have caught up, so anything past the last
+        # complete line was left by a writer that died mid-line
+        if os.path.exists(self.path) and os.path.getsize(self.path) > self._offset:
+            os.truncate(self.path, self._offset)
+
+    def build_entry(self, change_id: str, version: float, diff: dict) -> dict:
+        entry = {'id': change_id, 'version': version, 'fields': {}, 'lengths': {}}
+        for field, texts in diff_texts(diff).items():
+            entry['fields'][field], entry['lengths'][field] = positions_by_term(texts)
+        return entry
+
+    def sync(self, snapshot, diff_store) -> int:
+        """
+        Bring the index in line with a change store snapshot, reading only the
+        diffs that are new or rewritten since they were indexed, and dropping
+        changes the snapshot no longer has. Diffs are read and their postings
+        built before taking the lock searches wait on, which is only held to
+        apply them. Returns the number of changes indexed.
+        """
+        with self._sync_lock:
+            # Other workers' lines first, so only diffs nobody has indexed are read
+            self._catch_up()
+            entries = []
+            for change_id in snapshot.changes:
+                path = snapshot.metadata.paths.get(change_id)
+                version = snapshot.metadata.mtimes.get(path, 0)
+                if self.versions.get(change_id) != version:
+                    try:
+                        diff = diff_store.read_diff(path)
+                    except FileNotFoundError:
+                        # Deleted since the snapshot, the next refresh drops the change
+                        continue
+                    entries.append(self.build_entry(change_id, version, diff))
+
+            with open(f"{self.path}.lock", 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._catch_up()
+                    # Another worker may have indexed the same versions meanwhile
+                    entries = [entry for entry in entries if self.versions.get(entry['id']) != entry['version']]
+                    if entries:
+                        self._truncate_torn_tail()
+                        with open(self.path, 'ab') as f:
+                            for entry in entries:
+                                f.write(json.dumps(entry, separators=(',', ':')).encode('utf-8') + b'\n')
+                        self._catch_up()
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+            removed = [change_id for change_id in self.versions if change_id not in snapshot.changes]
+            with self._lock:
+                for change_id in removed:
+                    self._remove(change_id)
+                    del self.versions[change_id]
+            return len(entries)
+
+    def _clause_matches(self, field: str, clause: List[str]) -> Dict[str, int]:
+        """
+        Map change id -> number of occurrences of the term or phrase in a field.
+        """
+        postings = self.postings[field]
+        first = postings.get(clause[0], {})
+        if len(clause) == 1:
+            return {change_id: len(positions) for change_id, positions in first.items()}
+
+        matches = {}
+        for change_id, positions in first.items():
+            following = []
+            for term in clause[1:]:
+                term_positions = postings.get(term, {}).get(change_id)
+                if term_positions is None:
+                    break
+                following.append(set(term_positions))
+            else:
+                count = sum(
+                    1 for start in positions
+                    if all(start + offset + 1 in term_positions for offset, term_positions in enumerate(following))
+                )
+                if count:
+                    matches[change_id] = count
+        return matches
+
+    def search(self, query: str, field: str = None, allowed=None) -> List[Tuple[str, float]]:
+        """
+        Rank changes matching every clause of the query in the given field, or in
+        either field. allowed is an optional predicate on the change id used for
+        company and date filters. Returns (change_id, score) best first.
+        """
+        clauses = parse_query(query)
+        if not clauses:
+            return []
+        fields = [field] if field in FIELDS else list(FIELDS)
+
+        with self._lock:
+            scores: Optional[Dict[str, float]] = None
+            for clause in clauses:
+                clause_scores = defaultdict(float)
+                for name in fields:
+                    document_count = max(len(self.lengths[name]), 1)
+                    matches = self._clause_matches(name, clause)
+                    if not matches:
+                        continue
+                    # tf-idf with the document frequency of the rarest term in the clause
+                    rarest = min(len(self.postings[name].get(term, {})) for term in clause)
+                    idf = math.log(1 + document_count / max(rarest, 1))
+                    for change_id, count in matches.items():
+                        length = self.lengths[name].get(change_id, 1)
+                        clause_scores[change_id] += count * idf * len(clause) / math.sqrt(max(length, 1))
+                if scores is None:
+                    scores = dict(clause_scores)
+                else:
+                    scores = {change_id: score + clause_scores[change_id]
+                              for change_id, score in scores.items() if change_id in clause_scores}
+                if not scores:
+                    return []
+
+        results = [(change_id, score) for change_id, score in scores.items() if allowed is None or allowed(change_id)]
+        results.sort(key=lambda result: (-result[1], result[0]))
+        return results
@@ -0,0 +1,73 @@
+"""
+Random-access reader for the differ's segment storage.
+
+    diffs.seg      records of <u32 little-endian length><zlib-compressed JSON diff>
+    diffs.seg.idx  fixed-size entries of <from:15s><to:15s><offset:u64><length:u32><written_at:f64>
+
+Changes stored in a segment are addressed as "<company_dir>/diffs.seg@<offset>",
+in the same places a diff_*.json path is used for per-pair files.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from typing import Dict, List, Tuple
+
+SEGMENT_FILE = 'diffs.seg'
+INDEX_FILE = 'diffs.seg.idx'
+LENGTH = struct.Struct('<I')
+ENTRY = struct.Struct('<15s15sQId')
+MARKER = '@'
+
+def segment_path(company_dir: str, offset: int) -> str:
+    return f"{os.path.join(company_dir, SEGMENT_FILE)}{MARKER}{offset}"
+
+def is_segment_path(path: str) -> bool:
+    return MARKER in os.path.basename(path)
+
+def read_index_entries(company_dir: str) -> List[Tuple[str, str, int, float]]:
+    """
+    Return (from_version, to_version, offset, written_at) for every complete entry.
+    """
+    index_path = os.path.join(company_dir, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return []
+    with open(index_path, 'rb') as f:
+        data = f.read()
+    usable = len(data) - len(data) % ENTRY.size
+    return [
+        (from_version.decode('ascii'), to_version.decode('ascii'), offset, written_at)
+        for from_version, to_version, offset, _, written_at in ENTRY.iter_unpack(data[:usable])
+    ]
+
+class SegmentReader:
+    """
+    Keeps one read-only mmap per segment file and decodes single records from it.
+    A mapping is replaced when a record lies past its end because the differ has
+    appended since.
+    """
+    def __init__(self):
+        self._mappings: Dict[str, mmap.mmap] = {}
+        self._lock = threading.Lock()
+
+    def _mapping(self, path: str, end: int) -> mmap.mmap:
+        with self._lock:
+            mapping = self._mappings.get(path)
+            if mapping is None or len(mapping) < end:
+                with open(path, 'rb') as f:
+                    mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._mappings[path] = mapping
+            return mapping
+
+    def read(self, path: str) -> dict:
+        file_path, offset = path.rsplit(MARKER, 1)
+        offset = int(offset)
+        mapping = self._mapping(file_path, offset + LENGTH.size)
+        (length,) = LENGTH.unpack_from(mapping, offset)
+        start = offset + LENGTH.size
+        mapping = self._mapping(file_path, start + length)
+        return json.loads(zlib.decompress(mapping[start:start + length]))
+
+segment_reader = SegmentReader()
@@ -0,0 +1,26 @@
+import importlib
+import os
+import sys
+import pytest
+
+# The backend's modules import each other by bare name, as when run from backend/backend
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    """
+    Import main afresh against tmp_path, which the test fills with diffs first.
+    Returns a function that does the import and gives back the module.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('REFRESH_INTERVAL', '0')
+    monkeypatch.setenv('CHANGE_INDEX_PATH', str(tmp_path / 'diffs.idx'))
+    monkeypatch.setenv('SEARCH_INDEX_PATH', str(tmp_path / 'search.idx'))
+    os.makedirs(tmp_path / 'diffs', exist_ok=True)
+
+    def load():
+        sys.modules.pop('main', None)
+        return importlib.import_module('main')
+
+    yield load
+    sys.modules.pop('main', None)
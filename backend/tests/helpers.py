@@ -0,0 +1,10 @@
+import json
+import os
+
+def write_diff(diffs_dir, company, from_version, to_version, total_changes=1, diff=None):
+    os.makedirs(os.path.join(diffs_dir, company), exist_ok=True)
+    path = os.path.join(diffs_dir, company, f"diff_{from_version}_{to_version}.json")
+    with open(path, 'w') as f:
+        json.dump({'from_version': f"{from_version}.json", 'to_version': f"{to_version}.json",
+                   'diff': diff or {}, 'summary': {'total_changes': total_changes}}, f)
+    return path
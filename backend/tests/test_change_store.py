@@ -0,0 +1,125 @@
+import os
+import random
+import pytest
+import metadata_index
+from change_index import ChangeIndex
+from change_store import ChangeStore
+from helpers import write_diff
+from metadata_index import build_index_file, index_lock
+
+def make_change(n, company='acme', total_changes=1):
+    return {'id': f"{company}_{n}", 'company': company, 'from_version': '', 'to_version': '',
+            'timestamp': f"2024-01-{1 + n % 28:02d}T00:00:{n % 60:02d}Z", 'total_changes': total_changes}
+
+def page_ids(index, **filters):
+    return [c['id'] for c in index.iter_changes(**filters)]
+
+def test_updated_index_matches_a_full_rebuild():
+    rng = random.Random(0)
+    changes = {}
+    for n in range(200):
+        change = make_change(n, rng.choice(['acme', 'globex']), rng.choice([1, 10, 60, 200]))
+        changes[change['id']] = change
+    index = ChangeIndex(list(changes.values())[:150])
+    original = page_ids(index)
+
+    rewritten = dict(list(changes.values())[30], total_changes=500)
+    added = list(changes.values())[150:] + [rewritten]
+    removed = list(changes)[:20]
+    updated = index.updated(added, removed)
+
+    expected = {cid: c for cid, c in changes.items() if cid not in removed}
+    for change in added:
+        expected[change['id']] = change
+    rebuilt = ChangeIndex(expected.values())
+    for company in (None, 'acme', 'globex'):
+        for size in (None, 'small', 'medium', 'large'):
+            assert page_ids(updated, company=company, change_size=size) == \
+                page_ids(rebuilt, company=company, change_size=size)
+    assert updated.companies == rebuilt.companies
+    assert len(updated) == len(rebuilt)
+    # The old index still answers as before
+    assert page_ids(index) == original
+
+def test_removing_a_company_drops_it():
+    index = ChangeIndex([make_change(1, 'acme'), make_change(2, 'globex')])
+    updated = index.updated(removed=['globex_2'])
+    assert updated.companies == {'acme'}
+    assert updated.query(company='globex') == (0, [])
+
+@pytest.fixture
+def store(tmp_path):
+    diffs = str(tmp_path / 'diffs')
+    write_diff(diffs, 'acme', '20240101_000000', '20240102_000000', 3)
+    write_diff(diffs, 'acme', '20240102_000000', '20240103_000000', 4)
+    store = ChangeStore(diffs, str(tmp_path / 'diffs.idx'), workers=1)
+    store.load()
+    return store
+
+def test_refresh_picks_up_new_and_deleted_diffs(store):
+    first = store.snapshot
+    write_diff(store.diffs_dir, 'globex', '20240101_000000', '20240104_000000', 7)
+    os.remove(os.path.join(store.diffs_dir, 'acme', 'diff_20240101_000000_20240102_000000.json'))
+    assert store.refresh()
+    snapshot = store.snapshot
+    assert sorted(snapshot.changes) == ['acme_20240102_000000_20240103_000000', 'globex_20240101_000000_20240104_000000']
+    assert page_ids(snapshot.index) == ['globex_20240101_000000_20240104_000000', 'acme_20240102_000000_20240103_000000']
+    assert snapshot.generation > first.generation
+    assert not store.refresh()
+
+def test_deletions_reach_other_workers_and_restarts(store):
+    other = ChangeStore(store.diffs_dir, store.index_path, workers=1)
+    other.load()
+    os.remove(os.path.join(store.diffs_dir, 'acme', 'diff_20240101_000000_20240102_000000.json'))
+    store.refresh()
+    other.refresh()
+    assert sorted(other.snapshot.changes) == ['acme_20240102_000000_20240103_000000']
+    assert other.snapshot.generation == store.snapshot.generation
+    restarted = ChangeStore(store.diffs_dir, store.index_path, workers=1)
+    restarted.load()
+    assert sorted(restarted.snapshot.changes) == ['acme_20240102_000000_20240103_000000']
+
+def test_snapshot_metadata_is_frozen(store):
+    change_id = 'acme_20240101_000000_20240102_000000'
+    first = store.snapshot
+    path = write_diff(store.diffs_dir, 'acme', '20240101_000000', '20240102_000000', 99)
+    os.utime(path, (first.metadata.mtimes[path] + 10,) * 2)
+    assert store.refresh()
+    assert store.snapshot.summary(change_id) == {'total_changes': 99}
+    assert first.summary(change_id) == {'total_changes': 3}
+    assert first.metadata.mtimes[path] != store.snapshot.metadata.mtimes[path]
+
+def test_rewritten_diff_is_reindexed(store):
+    path = write_diff(store.diffs_dir, 'acme', '20240102_000000', '20240103_000000', 80)
+    os.utime(path, (os.path.getmtime(path) + 10,) * 2)
+    store.refresh()
+    assert store.snapshot.changes['acme_20240102_000000_20240103_000000']['total_changes'] == 80
+    assert page_ids(store.snapshot.index, change_size='medium') == ['acme_20240102_000000_20240103_000000']
+
+def test_generation_keeps_growing_across_a_rebuild(store, monkeypatch):
+    generations = [store.snapshot.generation]
+    write_diff(store.diffs_dir, 'acme', '20240103_000000', '20240104_000000')
+    store.refresh()
+    generations.append(store.snapshot.generation)
+    # Another worker rebuilds the index after deletions, so it has fewer lines than before
+    os.remove(os.path.join(store.diffs_dir, 'acme', 'diff_20240101_000000_20240102_000000.json'))
+    os.remove(os.path.join(store.diffs_dir, 'acme', 'diff_20240102_000000_20240103_000000.json'))
+    monkeypatch.setattr(metadata_index.time, 'time', lambda: 0)
+    with index_lock(store.index_path):
+        build_index_file(store.diffs_dir, store.index_path, workers=1)
+    assert store.refresh()
+    generations.append(store.snapshot.generation)
+    assert sorted(store.snapshot.changes) == ['acme_20240103_000000_20240104_000000']
+    write_diff(store.diffs_dir, 'acme', '20240104_000000', '20240105_000000')
+    store.refresh()
+    generations.append(store.snapshot.generation)
+    assert generations == sorted(set(generations))
+    other = ChangeStore(store.diffs_dir, store.index_path, workers=1)
+    other.load()
+    assert other.snapshot.generation == store.snapshot.generation
+
+def test_rebuild_reusing_the_inode_is_still_noticed(store):
+    metadata = store.metadata
+    with open(store.index_path, 'r+b') as f:
+        f.write(metadata_index.GENERATION_HEADER + str(metadata.base_generation + 1).encode('ascii') + b'\n')
+    assert metadata.is_replaced()
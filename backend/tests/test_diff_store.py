@@ -0,0 +1,46 @@
+import pytest
+from diff_store import DiffStore
+from helpers import write_diff
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = DiffStore(cache_size=2)
+    for day in range(1, 5):
+        path = write_diff(str(tmp_path), 'acme', f"202401{day:02d}_000000", f"202401{day + 1:02d}_000000",
+                          diff={'day': day})
+        store.register(f"change{day}", path)
+    store.reads = []
+    read_diff = store.read_diff
+    monkeypatch.setattr(store, 'read_diff', lambda path: store.reads.append(path) or read_diff(path))
+    return store
+
+def test_diffs_are_loaded_lazily(store):
+    assert store.reads == []
+    assert store.get('change1') == {'day': 1}
+    assert len(store.reads) == 1
+    assert store.get('change1') == {'day': 1}
+    assert len(store.reads) == 1
+
+def test_least_recently_used_is_evicted(store):
+    store.get('change1')
+    store.get('change2')
+    store.get('change1')
+    store.get('change3')
+    assert list(store._cache) == ['change1', 'change3']
+    store.get('change2')
+    assert len(store.reads) == 4
+    store.get('change3')
+    assert len(store.reads) == 4
+
+def test_invalidate_and_unregister(store):
+    store.get('change1')
+    store.invalidate('change1')
+    store.get('change1')
+    assert len(store.reads) == 2
+    store.unregister('change1')
+    assert store.get('change1') is None
+    assert store.path('change1') is None
+
+def test_cache_size_comes_from_the_environment(backend, monkeypatch):
+    monkeypatch.setenv('DIFF_CACHE_SIZE', '3')
+    assert backend().store.diff_store.cache_size == 3
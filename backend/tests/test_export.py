@@ -0,0 +1,50 @@
+import json
+import os
+import pytest
+from helpers import write_diff
+
+@pytest.fixture
+def main(backend, tmp_path):
+    for day in range(1, 4):
+        write_diff(str(tmp_path / 'diffs'), 'acme', f"202401{day:02d}_000000", f"202401{day + 1:02d}_000000",
+                   day, {'changed': {'day': day}})
+    return backend()
+
+def export(client, query=''):
+    response = client.get(f'/api/changes/export?{query}')
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+
+def test_export_includes_diffs(main):
+    lines = export(main.app.test_client(), 'includeDiff=true')
+    assert [line['diff'] for line in lines] == [{'changed': {'day': 3}}, {'changed': {'day': 2}}, {'changed': {'day': 1}}]
+
+def test_diff_deleted_mid_export_is_marked(main, tmp_path):
+    os.remove(str(tmp_path / 'diffs' / 'acme' / 'diff_20240102_000000_20240103_000000.json'))
+    main.store.refresh()
+    # Exporting the snapshot from before the refresh
+    lines = export(main.app.test_client(), 'includeDiff=true')
+    assert len(lines) == 2
+    assert main.store.diff_store.path('acme_20240102_000000_20240103_000000') is None
+
+    stale = main.store.snapshot
+    write_diff(str(tmp_path / 'diffs'), 'acme', '20240104_000000', '20240105_000000')
+    main.store.refresh()
+    os.remove(str(tmp_path / 'diffs' / 'acme' / 'diff_20240101_000000_20240102_000000.json'))
+    main.store.snapshot = stale
+    lines = export(main.app.test_client(), 'includeDiff=true')
+    assert [line['id'] for line in lines] == ['acme_20240103_000000_20240104_000000', 'acme_20240101_000000_20240102_000000']
+    assert lines[0]['diff'] == {'changed': {'day': 3}}
+    assert lines[1]['diff'] is None and lines[1]['diff_missing']
+
+@pytest.mark.parametrize('url', ['/api/changes', '/api/changes?cursor=', '/api/changes/export', '/api/search?q=day'])
+@pytest.mark.parametrize('query', ['fromDate=yesterday', 'toDate=2024-13-01', 'fromDate=2024-01-01T00:00'])
+def test_bad_dates_are_rejected(main, url, query):
+    separator = '&' if '?' in url else '?'
+    response = main.app.test_client().get(f'{url}{separator}{query}')
+    assert response.status_code == 400
+    assert 'fromDate' in response.get_json()['error']
+
+def test_good_dates_filter(main):
+    lines = export(main.app.test_client(), 'fromDate=2024-01-03&toDate=2024-01-03')
+    assert [line['id'] for line in lines] == ['acme_20240102_000000_20240103_000000']
@@ -0,0 +1,86 @@
+import gzip
+import os
+import pytest
+import http_cache
+from helpers import write_diff
+
+CHANGE_ID = 'acme_20240101_000000_20240102_000000'
+
+@pytest.fixture
+def main(backend, tmp_path):
+    write_diff(str(tmp_path / 'diffs'), 'acme', '20240101_000000', '20240102_000000', 3,
+               {'changed': {'text': 'word ' * 400}})
+    return backend()
+
+def test_if_none_match_gets_a_304(main):
+    client = main.app.test_client()
+    for url in ('/api/changes', f'/api/changes/{CHANGE_ID}'):
+        response = client.get(url)
+        etag = response.headers['ETag']
+        assert etag.startswith('W/')
+        cached = client.get(url, headers={'If-None-Match': etag})
+        assert cached.status_code == 304
+        assert cached.data == b''
+        assert cached.headers['ETag'] == etag
+
+def test_different_queries_get_different_etags(main):
+    client = main.app.test_client()
+    assert client.get('/api/changes?limit=1').headers['ETag'] != client.get('/api/changes?limit=2').headers['ETag']
+    assert client.get('/api/changes?limit=1&company=acme').headers['ETag'] == \
+        client.get('/api/changes?company=acme&limit=1').headers['ETag']
+
+def test_gzip_is_negotiated(main):
+    client = main.app.test_client()
+    response = client.get(f'/api/changes/{CHANGE_ID}', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    plain = client.get(f'/api/changes/{CHANGE_ID}')
+    assert 'Content-Encoding' not in plain.headers
+    assert gzip.decompress(response.data) == plain.data
+
+def test_brotli_is_preferred_when_installed(main):
+    brotli = pytest.importorskip('brotli')
+    client = main.app.test_client()
+    response = client.get(f'/api/changes/{CHANGE_ID}', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data) == client.get(f'/api/changes/{CHANGE_ID}').data
+
+def test_choose_encoding(monkeypatch):
+    monkeypatch.setattr(http_cache, 'brotli', None)
+    assert http_cache.choose_encoding('br, gzip;q=0.5') == 'gzip'
+    assert http_cache.choose_encoding('br') is None
+    assert http_cache.choose_encoding('') is None
+    monkeypatch.setattr(http_cache, 'brotli', object())
+    assert http_cache.choose_encoding('gzip, br') == 'br'
+
+def test_small_bodies_are_not_compressed(backend, tmp_path, monkeypatch):
+    monkeypatch.setenv('COMPRESS_MIN_SIZE', '100000')
+    write_diff(str(tmp_path / 'diffs'), 'acme', '20240101_000000', '20240102_000000', 3,
+               {'changed': {'text': 'word ' * 400}})
+    client = backend().app.test_client()
+    response = client.get(f'/api/changes/{CHANGE_ID}', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json()['id'] == CHANGE_ID
+
+def test_refresh_invalidates_list_pages(main, tmp_path):
+    client = main.app.test_client()
+    first = client.get('/api/changes')
+    write_diff(str(tmp_path / 'diffs'), 'acme', '20240102_000000', '20240103_000000')
+    assert main.store.refresh()
+    response = client.get('/api/changes', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert response.get_json()['total'] == 2
+    # Only the current generation's pages are kept
+    assert all(not key[0].startswith('changes-') or key[0].startswith(f"changes-{main.store.snapshot.generation}-")
+               for key in main.response_cache._bodies)
+
+def test_removed_changes_are_not_served_from_the_memo(main, tmp_path):
+    client = main.app.test_client()
+    url = f'/api/changes/{CHANGE_ID}'
+    assert client.get(url).status_code == 200
+    os.remove(str(tmp_path / 'diffs' / 'acme' / 'diff_20240101_000000_20240102_000000.json'))
+    # Deleted but not refreshed yet
+    assert client.get(url).status_code == 404
+    assert main.store.refresh()
+    assert client.get(url).status_code == 404
+    assert not any(key[0].startswith(f"change-{CHANGE_ID}-") for key in main.response_cache._bodies)
@@ -0,0 +1,38 @@
+import json
+import pytest
+from helpers import write_diff
+
+@pytest.fixture
+def client(backend, tmp_path):
+    write_diff(str(tmp_path / 'diffs'), 'acme', '20240101_000000', '20240102_000000', 3, {'changed': {'a': 1}})
+    return backend().app.test_client()
+
+def test_list_is_slim_by_default(client):
+    change = client.get('/api/changes').get_json()['changes'][0]
+    assert change == {'id': 'acme_20240101_000000_20240102_000000', 'company': 'acme',
+                      'from_version': '20240101_000000.json', 'to_version': '20240102_000000.json',
+                      'timestamp': '2024-01-02T00:00:00Z', 'summary': {'total_changes': 3}}
+    assert 'diff' not in change
+
+def test_details_include_the_diff(client):
+    change = client.get('/api/changes/acme_20240101_000000_20240102_000000').get_json()
+    assert change['diff'] == {'changed': {'a': 1}}
+    assert change['summary'] == {'total_changes': 3}
+
+@pytest.mark.parametrize('url', ['/api/changes?fields=id,timestamp', '/api/changes?cursor=&fields=id,timestamp'])
+def test_fields_narrow_the_list(client, url):
+    assert client.get(url).get_json()['changes'] == [{'id': 'acme_20240101_000000_20240102_000000', 'timestamp': '2024-01-02T00:00:00Z'}]
+
+def test_fields_narrow_the_export(client):
+    line = json.loads(client.get('/api/changes/export?fields=id,timestamp').data)
+    assert line == {'id': 'acme_20240101_000000_20240102_000000', 'timestamp': '2024-01-02T00:00:00Z'}
+
+def test_unknown_fields_are_ignored(client):
+    changes = client.get('/api/changes?fields=id,diff,nonsense').get_json()['changes']
+    assert changes == [{'id': 'acme_20240101_000000_20240102_000000'}]
+    # Nothing usable left falls back to every list field
+    full = client.get('/api/changes').get_json()['changes']
+    assert client.get('/api/changes?fields=diff').get_json()['changes'] == full
+
+def test_fields_are_part_of_the_etag(client):
+    assert client.get('/api/changes?fields=id').headers['ETag'] != client.get('/api/changes').headers['ETag']
@@ -0,0 +1,55 @@
+import os
+import threading
+import pytest
+import metadata_index
+from helpers import write_diff
+from metadata_index import MetadataIndex, build_index_file, load_metadata_index
+
+@pytest.fixture
+def diffs_dir(tmp_path):
+    diffs = str(tmp_path / 'diffs')
+    write_diff(diffs, 'acme', '20240101_000000', '20240102_000000', 3)
+    write_diff(diffs, 'globex', '20240101_000000', '20240103_000000', 5)
+    return diffs
+
+def test_build_and_read(diffs_dir, tmp_path):
+    index_path = str(tmp_path / 'diffs.idx')
+    build_index_file(diffs_dir, index_path, workers=1)
+    index = MetadataIndex(index_path)
+    records = index.records()
+    assert sorted(change['id'] for change, _ in records) == [
+        'acme_20240101_000000_20240102_000000', 'globex_20240101_000000_20240103_000000']
+    assert index.summary('globex_20240101_000000_20240103_000000') == {'total_changes': 5}
+
+def test_concurrent_builds_use_their_own_temporary_files(diffs_dir, tmp_path):
+    index_path = str(tmp_path / 'diffs.idx')
+    errors = []
+
+    def build():
+        try:
+            build_index_file(diffs_dir, index_path, workers=1)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=build) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(MetadataIndex(index_path).records()) == 2
+    assert sorted(os.listdir(tmp_path)) == ['diffs', 'diffs.idx']
+
+def test_failed_build_leaves_no_temporary_file(diffs_dir, tmp_path, monkeypatch):
+    index_path = str(tmp_path / 'diffs.idx')
+    monkeypatch.setattr(metadata_index.os, 'replace', lambda src, dst: (_ for _ in ()).throw(OSError("disk full")))
+    with pytest.raises(OSError):
+        build_index_file(diffs_dir, index_path, workers=1)
+    assert sorted(os.listdir(tmp_path)) == ['diffs']
+
+def test_stale_index_is_rebuilt(diffs_dir, tmp_path):
+    index_path = str(tmp_path / 'diffs.idx')
+    assert len(load_metadata_index(diffs_dir, index_path, workers=1).records()) == 2
+    os.utime(index_path, (0, 0))
+    write_diff(diffs_dir, 'acme', '20240102_000000', '20240105_000000')
+    assert len(load_metadata_index(diffs_dir, index_path, workers=1).records()) == 3
@@ -0,0 +1,48 @@
+import pytest
+from helpers import write_diff
+
+@pytest.fixture
+def client(backend, tmp_path):
+    for day in range(1, 6):
+        write_diff(str(tmp_path / 'diffs'), 'acme', f"202401{day:02d}_000000", f"202401{day + 1:02d}_000000", day)
+    return backend().app.test_client()
+
+def test_cursor_pages_through_everything(client):
+    seen, cursor = [], ''
+    while cursor is not None:
+        body = client.get(f'/api/changes?limit=2&cursor={cursor}').get_json()
+        seen.extend(change['id'] for change in body['changes'])
+        cursor = body['next_cursor']
+    assert len(seen) == len(set(seen)) == 5
+    assert seen[0] == 'acme_20240105_000000_20240106_000000'
+
+@pytest.mark.parametrize('query', ['limit=abc', 'limit=1.5', 'page=x', 'page=0', 'page=-1'])
+def test_invalid_parameters_are_rejected(client, query):
+    assert client.get(f'/api/changes?{query}').status_code == 400
+    assert client.get(f'/api/changes?{query}&cursor=').status_code == 400
+
+@pytest.mark.parametrize('limit, expected', [('0', 1), ('-5', 1), ('1000', 5)])
+def test_limit_is_clamped(client, limit, expected):
+    body = client.get(f'/api/changes?limit={limit}&cursor=').get_json()
+    assert len(body['changes']) == expected
+    assert body['limit'] >= 1
+
+def test_limit_is_capped(backend, tmp_path, monkeypatch):
+    monkeypatch.setenv('MAX_PAGE_SIZE', '3')
+    for day in range(1, 6):
+        write_diff(str(tmp_path / 'diffs'), 'acme', f"202401{day:02d}_000000", f"202401{day + 1:02d}_000000")
+    body = backend().app.test_client().get('/api/changes?limit=50').get_json()
+    assert body['limit'] == 3
+    assert len(body['changes']) == 3
+
+def test_empty_page_has_no_next_cursor(client):
+    body = client.get('/api/changes?limit=5&cursor=').get_json()
+    last = client.get(f"/api/changes?limit=5&cursor={body['next_cursor']}").get_json()
+    assert last['changes'] == []
+    assert last['next_cursor'] is None
+
+def test_invalid_cursor(client):
+    assert client.get('/api/changes?cursor=!!!').status_code == 400
+
+def test_search_limit_is_validated(client):
+    assert client.get('/api/search?q=x&limit=abc').status_code == 400
@@ -0,0 +1,42 @@
+import time
+import pytest
+from helpers import write_diff
+
+@pytest.fixture
+def app(backend, tmp_path, monkeypatch):
+    monkeypatch.setenv('REFRESH_TOKEN', 'secret')
+    monkeypatch.setenv('REFRESH_MIN_INTERVAL', '60')
+    write_diff(str(tmp_path / 'diffs'), 'acme', '20240101_000000', '20240102_000000')
+    return backend()
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_refresh_is_disabled_without_a_token(backend):
+    client = backend().app.test_client()
+    assert client.post('/api/refresh').status_code == 404
+
+def test_refresh_needs_the_token(app):
+    client = app.app.test_client()
+    assert client.post('/api/refresh').status_code == 403
+    assert client.post('/api/refresh', headers={'X-Refresh-Token': 'wrong'}).status_code == 403
+    assert client.post('/api/refresh', headers={'X-Refresh-Token': 'sécret'}).status_code == 403
+
+def test_refresh_runs_in_the_background(app, tmp_path):
+    client = app.app.test_client()
+    write_diff(str(tmp_path / 'diffs'), 'acme', '20240102_000000', '20240103_000000')
+    response = client.post('/api/refresh', headers={'X-Refresh-Token': 'secret'})
+    assert response.status_code == 202
+    assert response.get_json()['scheduled']
+    assert wait_for(lambda: client.get('/api/status').get_json()['total'] == 2)
+
+def test_refresh_is_rate_limited(app):
+    client = app.app.test_client()
+    headers = {'X-Refresh-Token': 'secret'}
+    assert client.post('/api/refresh', headers=headers).status_code == 202
+    response = client.post('/api/refresh', headers=headers)
+    assert response.status_code == 429
+    assert 0 < int(response.headers['Retry-After']) <= 60
@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+import time
+import pytest
+from change_store import ChangeStore
+from helpers import write_diff
+from search_index import SearchIndex
+
+def added_diff(text):
+    return {'added': {'content': [{'html': f"<p>{text}</p>", 'text': text}]}}
+
+@pytest.fixture
+def store(tmp_path):
+    diffs = str(tmp_path / 'diffs')
+    write_diff(diffs, 'acme', '20240101_000000', '20240102_000000', diff=added_diff("we sell your data"))
+    write_diff(diffs, 'acme', '20240102_000000', '20240103_000000', diff=added_diff("café cookies everywhere"))
+    store = ChangeStore(diffs, str(tmp_path / 'diffs.idx'), workers=1)
+    store.load()
+    return store
+
+def ids(results):
+    return [change_id for change_id, _ in results]
+
+def test_sync_and_search(store, tmp_path):
+    index = SearchIndex(str(tmp_path / 'search.idx'))
+    assert index.sync(store.snapshot, store.diff_store) == 2
+    assert ids(index.search('"sell your data"')) == ['acme_20240101_000000_20240102_000000']
+    assert index.sync(store.snapshot, store.diff_store) == 0
+
+def test_non_ascii_offsets_are_bytes(store, tmp_path):
+    path = str(tmp_path / 'search.idx')
+    SearchIndex(path).sync(store.snapshot, store.diff_store)
+    write_diff(store.diffs_dir, 'acme', '20240103_000000', '20240104_000000', diff=added_diff("naïve résumé"))
+    store.refresh()
+    reader = SearchIndex(path)
+    reader.sync(store.snapshot, store.diff_store)
+    assert ids(reader.search('résumé')) == ['acme_20240103_000000_20240104_000000']
+    assert ids(reader.search('café')) == ['acme_20240102_000000_20240103_000000']
+
+def test_torn_line_is_truncated_before_appending(store, tmp_path):
+    path = str(tmp_path / 'search.idx')
+    SearchIndex(path).sync(store.snapshot, store.diff_store)
+    size = os.path.getsize(path)
+    # A writer died halfway through its line
+    with open(path, 'ab') as f:
+        f.write(b'{"id":"acme_torn","ver')
+
+    write_diff(store.diffs_dir, 'acme', '20240103_000000', '20240104_000000', diff=added_diff("new clause"))
+    store.refresh()
+    index = SearchIndex(path)
+    assert index.sync(store.snapshot, store.diff_store) == 1
+    with open(path, 'rb') as f:
+        f.seek(size)
+        appended = f.read().splitlines()
+    assert [json.loads(line)['id'] for line in appended] == ['acme_20240103_000000_20240104_000000']
+
+    # Every line parses for a fresh reader
+    fresh = SearchIndex(path)
+    assert fresh.sync(store.snapshot, store.diff_store) == 0
+    assert ids(fresh.search('clause')) == ['acme_20240103_000000_20240104_000000']
+
+class BlockingDiffStore:
+    """
+    Wraps a DiffStore so reading a diff waits until the test releases it.
+    """
+    def __init__(self, diff_store):
+        self.diff_store = diff_store
+        self.reading = threading.Event()
+        self.release = threading.Event()
+
+    def read_diff(self, path):
+        self.reading.set()
+        assert self.release.wait(5)
+        return self.diff_store.read_diff(path)
+
+def test_search_is_not_blocked_while_diffs_are_read(store, tmp_path):
+    index = SearchIndex(str(tmp_path / 'search.idx'))
+    index.sync(store.snapshot, store.diff_store)
+    write_diff(store.diffs_dir, 'acme', '20240103_000000', '20240104_000000', diff=added_diff("new clause"))
+    store.refresh()
+    blocking = BlockingDiffStore(store.diff_store)
+    sync = threading.Thread(target=index.sync, args=(store.snapshot, blocking))
+    sync.start()
+    try:
+        assert blocking.reading.wait(5)
+        start = time.monotonic()
+        assert ids(index.search('sell')) == ['acme_20240101_000000_20240102_000000']
+        assert time.monotonic() - start < 1
+    finally:
+        blocking.release.set()
+        sync.join()
+    assert ids(index.search('clause')) == ['acme_20240103_000000_20240104_000000']
+
+def test_removed_changes_leave_the_postings(store, tmp_path):
+    index = SearchIndex(str(tmp_path / 'search.idx'))
+    index.sync(store.snapshot, store.diff_store)
+    os.remove(os.path.join(store.diffs_dir, 'acme', 'diff_20240101_000000_20240102_000000.json'))
+    store.refresh()
+    index.sync(store.snapshot, store.diff_store)
+    assert index.search('sell') == []
+    assert 'sell' not in index.postings['added']
+    assert 'acme_20240101_000000_20240102_000000' not in index.versions
+    # A restarted worker reads the old line back and drops it again
+    restarted = SearchIndex(str(tmp_path / 'search.idx'))
+    assert restarted.sync(store.snapshot, store.diff_store) == 0
+    assert restarted.search('sell') == []
+    assert ids(restarted.search('cookies')) == ['acme_20240102_000000_20240103_000000']
+
+def test_diff_deleted_before_the_sync_is_skipped(store, tmp_path):
+    os.remove(os.path.join(store.diffs_dir, 'acme', 'diff_20240101_000000_20240102_000000.json'))
+    index = SearchIndex(str(tmp_path / 'search.idx'))
+    assert index.sync(store.snapshot, store.diff_store) == 1
+    assert ids(index.search('cookies')) == ['acme_20240102_000000_20240103_000000']
@@ -7,6 +7,8 @@ export async function getChanges(params: {
   changeSize?: string;
   fromDate?: string;
   toDate?: string;
+  fields?: string;
+  cursor?: string;
 }) {
   const queryParams = new URLSearchParams(
     Object.entries(params).filter(([_, v]) => v != null) as [string, string][]
@@ -31,6 +31,8 @@ export interface Diff {
   company: string;
   from_version: string;
   to_version: string;
-  diff: DiffContent;
+  timestamp: string;
+  // Only returned by /api/changes/<id>, list responses omit it
+  diff?: DiffContent;
   summary: DiffSummary;
 }
\ No newline at end of file
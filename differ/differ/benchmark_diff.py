@@ -0,0 +1,84 @@
+"""
+Compare the selector-list fast path in generate_diff with the DeepDiff path.
+
+    python benchmark_diff.py                      # synthetic snapshots
+    python benchmark_diff.py <data_dir> <domain>  # consecutive pairs of real snapshots
+"""
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+from diff_generator import generate_diff
+from diff_tool import DiffTool
+from file_handler import FileHandler
+
+WORDS = ("we collect share personal data information third parties services "
+         "cookies consent process retain account device location advertising "
+         "partners security rights request delete access law").split()
+
+def random_paragraph(rng: random.Random, length: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(length))
+
+def synthetic_pair(paragraphs: int, churn: float, seed: int = 0) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Build an old/new snapshot pair where roughly `churn` of the paragraphs are
+    edited, removed or inserted.
+    """
+    rng = random.Random(seed)
+    old = [random_paragraph(rng, rng.randint(20, 120)) for _ in range(paragraphs)]
+    new = []
+    for text in old:
+        roll = rng.random()
+        if roll < churn / 3:
+            continue
+        if roll < 2 * churn / 3:
+            words = text.split()
+            words[rng.randrange(len(words))] = rng.choice(WORDS)
+            text = ' '.join(words)
+        new.append(text)
+        if rng.random() < churn / 3:
+            new.append(random_paragraph(rng, rng.randint(20, 120)))
+
+    def snapshot(texts: List[str]) -> Dict[str, Any]:
+        return {'content': [{'html': f"<p>{text}</p>", 'text': text} for text in texts]}
+
+    return snapshot(old), snapshot(new)
+
+def time_call(func, *args, **kwargs) -> Tuple[float, Any]:
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def compare(label: str, data1: Dict[str, Any], data2: Dict[str, Any]) -> None:
+    deep_time, deep_diff = time_call(generate_diff, data1, data2, fast_path=False)
+    fast_time, fast_diff = time_call(generate_diff, data1, data2, fast_path=True)
+    deep_changed = len(deep_diff.get('changed', {}))
+    fast_changed = len(fast_diff.get('changed', {}))
+    speedup = deep_time / fast_time if fast_time else float('inf')
+    print(f"{label:<36}{deep_time:>10.3f}{fast_time:>10.3f}{speedup:>9.1f}x{deep_changed:>9}{fast_changed:>9}")
+
+def print_header() -> None:
+    print(f"{'pair':<36}{'deepdiff':>10}{'fast':>10}{'speedup':>10}{'dd paths':>9}{'fp paths':>9}")
+
+def run_synthetic() -> None:
+    print_header()
+    for paragraphs in (50, 200, 500):
+        for churn in (0.02, 0.1):
+            data1, data2 = synthetic_pair(paragraphs, churn)
+            compare(f"{paragraphs} paragraphs, {churn:.0%} churn", data1, data2)
+
+def run_snapshots(data_directory: str, domain: str) -> None:
+    diff_tool = DiffTool(FileHandler())
+    versions = diff_tool.get_file_versions(data_directory, domain)
+    print_header()
+    for from_version, to_version in zip(versions, versions[1:]):
+        data1 = diff_tool.load_json_file(os.path.join(data_directory, domain, from_version))
+        data2 = diff_tool.load_json_file(os.path.join(data_directory, domain, to_version))
+        compare(f"{from_version[:15]} -> {to_version[:15]}", data1, data2)
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        run_snapshots(sys.argv[1], sys.argv[2])
+    else:
+        run_synthetic()
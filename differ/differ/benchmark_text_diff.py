@@ -0,0 +1,79 @@
+"""
+Compare the word-level text diff engines.
+
+    python benchmark_text_diff.py                      # synthetic long paragraphs
+    python benchmark_text_diff.py <data_dir> <domain>  # changed values from real snapshots
+
+For each engine it reports the total time, the number of words marked as
+changed (lower is a tighter diff) and how many paths match SequenceMatcher exactly.
+"""
+import os
+import random
+import sys
+from typing import List, Tuple
+from deepdiff import DeepDiff
+from benchmark_diff import WORDS, time_call
+from diff_generator import selector_list_diff, text_diff
+from diff_tool import DiffTool
+from file_handler import FileHandler
+from text_diff_engines import ENGINES
+
+def changed_words(diff: List[dict]) -> int:
+    total = 0
+    for change in diff:
+        if change['type'] == 'replaced':
+            total += len(change['old_value'].split()) + len(change['new_value'].split())
+        else:
+            total += len(change['value'].split())
+    return total
+
+def synthetic_values(seed: int = 0) -> List[Tuple[str, str]]:
+    rng = random.Random(seed)
+    values = []
+    for length in (1000, 5000, 10000):
+        # Legal text repeats itself, so draw from a small vocabulary
+        old = [rng.choice(WORDS) for _ in range(length)]
+        new = list(old)
+        for _ in range(length // 200):
+            position = rng.randrange(len(new))
+            roll = rng.random()
+            if roll < 0.4:
+                new[position] = rng.choice(WORDS)
+            elif roll < 0.7:
+                del new[position:position + rng.randint(1, 10)]
+            else:
+                new[position:position] = [rng.choice(WORDS) for _ in range(rng.randint(1, 10))]
+        values.append((' '.join(old), ' '.join(new)))
+    return values
+
+def snapshot_values(data_directory: str, domain: str) -> List[Tuple[str, str]]:
+    diff_tool = DiffTool(FileHandler())
+    versions = diff_tool.get_file_versions(data_directory, domain)
+    values = []
+    for from_version, to_version in zip(versions, versions[1:]):
+        data1 = diff_tool.load_json_file(os.path.join(data_directory, domain, from_version))
+        data2 = diff_tool.load_json_file(os.path.join(data_directory, domain, to_version))
+        diff = selector_list_diff(data1, data2)
+        if diff is None:
+            diff = DeepDiff(data1, data2, ignore_order=True, verbose_level=2)
+        for change in diff.get('values_changed', {}).values():
+            values.append((str(change['old_value']), str(change['new_value'])))
+    return values
+
+def run(values: List[Tuple[str, str]]) -> None:
+    words = sum(len(old.split()) + len(new.split()) for old, new in values)
+    print(f"{len(values)} changed values, {words} words")
+    reference = [text_diff(old, new, 'sequencematcher') for old, new in values]
+
+    print(f"{'engine':<18}{'time (s)':>10}{'changed words':>15}{'same as SM':>12}")
+    for engine in ENGINES:
+        elapsed, results = time_call(lambda: [text_diff(old, new, engine) for old, new in values])
+        changed = sum(changed_words(result) for result in results)
+        same = sum(result == expected for result, expected in zip(results, reference))
+        print(f"{engine:<18}{elapsed:>10.3f}{changed:>15}{same:>8}/{len(values)}")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        run(snapshot_values(sys.argv[1], sys.argv[2]))
+    else:
+        run(synthetic_values())
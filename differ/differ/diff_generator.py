@@ -1,11 +1,180 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+from collections import Counter, defaultdict, deque
 from deepdiff import DeepDiff
-import difflib
+from config import get_env_var
+from text_diff_engines import get_engine
+from minhash import align_near_duplicates
 
-def generate_diff(data1: Dict[str, Any], data2: Dict[str, Any]) -> Dict[str, Any]:
-    diff = DeepDiff(data1, data2, ignore_order=True, verbose_level=2)
+ELEMENT_KEYS = ('html', 'text')
+# Word overlap above which two unmatched elements are treated as one edited element
+PAIR_SIMILARITY = 0.5
+# How far ahead to look for an edited element, in unmatched elements
+PAIR_WINDOW = 5
+# In the fast path, also pair similar leftovers anywhere in the list through MinHash/LSH
+# after the windowed pass. Only read when DIFF_FAST_PATH is on: the default DeepDiff
+# path pairs edited elements itself (ignore_order=True pairs items by distance)
+PAIR_NEAR_DUPLICATES = get_env_var('PAIR_NEAR_DUPLICATES', 'true').lower() == 'true'
+# Diff the scraper's selector lists directly instead of through DeepDiff. Faster, but
+# reports edits as changed elements rather than DeepDiff's per-item paths, so it is opt-in
+DIFF_FAST_PATH = get_env_var('DIFF_FAST_PATH', 'false').lower() == 'true'
+# Word-level diff engine for changed values: sequencematcher, myers or patience
+TEXT_DIFF_ENGINE = get_env_var('TEXT_DIFF_ENGINE', 'sequencematcher')
+
+def generate_diff(data1: Dict[str, Any], data2: Dict[str, Any], fast_path: bool = None) -> Dict[str, Any]:
+    diff = None
+    if fast_path is None:
+        fast_path = DIFF_FAST_PATH
+    if fast_path:
+        diff = selector_list_diff(data1, data2)
+    if diff is None:
+        diff = DeepDiff(data1, data2, ignore_order=True, verbose_level=2)
     return compact_diff(diff)
 
+def is_selector_data(data: Any) -> bool:
+    """
+    Check for the scraper's snapshot shape: selector key -> list of {'html', 'text'} elements.
+    """
+    if not isinstance(data, dict):
+        return False
+    for elements in data.values():
+        if not isinstance(elements, list):
+            return False
+        for element in elements:
+            if not isinstance(element, dict) or len(element) != 2:
+                return False
+            if not all(isinstance(element.get(key), str) for key in ELEMENT_KEYS):
+                return False
+    return True
+
+def word_set(text: str) -> set:
+    # The words text_similarity compares, for both pairing passes
+    return set(text.split())
+
+def text_similarity(words1: set, words2: set) -> float:
+    if not words1 and not words2:
+        return 1.0
+    return len(words1 & words2) / len(words1 | words2)
+
+def align_similar(old_texts: List[str], new_texts: List[str], threshold: float = PAIR_SIMILARITY,
+                  window: int = PAIR_WINDOW):
+    """
+    Walk both lists in order and pair each old text with the first sufficiently
+    similar new text within `window` positions. Returns (pairs, removed, added)
+    as indexes into the two lists.
+    """
+    old_words = [word_set(text) for text in old_texts]
+    new_words = [word_set(text) for text in new_texts]
+    pairs, removed = [], []
+    next_new = 0
+    for a, words in enumerate(old_words):
+        for b in range(next_new, min(next_new + window, len(new_words))):
+            if text_similarity(words, new_words[b]) >= threshold:
+                pairs.append((a, b))
+                next_new = b + 1
+                break
+        else:
+            removed.append(a)
+    paired_new = {b for _, b in pairs}
+    added = [b for b in range(len(new_texts)) if b not in paired_new]
+    return pairs, removed, added
+
+def selector_list_diff(data1: Dict[str, Any], data2: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Structural diff for snapshots in the scraper's shape, returning the same report
+    keys DeepDiff(ignore_order=True, verbose_level=2) does.
+    Returns None for any other shape so the caller can fall back to DeepDiff.
+
+    Elements are matched without regard to order: identical elements first, then
+    elements with the same text, then similar leftovers in document order, then
+    similar leftovers anywhere (see minhash). Anything still unmatched is reported
+    as added or removed. Paths use the old element's
+    index, as DeepDiff does.
+    """
+    if not (is_selector_data(data1) and is_selector_data(data2)):
+        return None
+
+    diff = defaultdict(dict)
+
+    for key in data2:
+        if key not in data1:
+            diff['dictionary_item_added'][f"root[{key!r}]"] = data2[key]
+    for key in data1:
+        if key not in data2:
+            diff['dictionary_item_removed'][f"root[{key!r}]"] = data1[key]
+
+    for key in data1:
+        if key not in data2:
+            continue
+
+        old_elements, new_elements = data1[key], data2[key]
+
+        # Identical elements cancel out, whatever their position
+        new_counts = Counter((e['html'], e['text']) for e in new_elements)
+        unmatched_old = []
+        for i, element in enumerate(old_elements):
+            element_key = (element['html'], element['text'])
+            if new_counts[element_key]:
+                new_counts[element_key] -= 1
+            else:
+                unmatched_old.append(i)
+        unmatched_new = []
+        for j, element in enumerate(new_elements):
+            element_key = (element['html'], element['text'])
+            if new_counts[element_key]:
+                new_counts[element_key] -= 1
+                unmatched_new.append(j)
+
+        # Same text but different markup is the same paragraph
+        new_by_text = defaultdict(deque)
+        for j in unmatched_new:
+            new_by_text[new_elements[j]['text']].append(j)
+        pairs, leftover_old = [], []
+        for i in unmatched_old:
+            candidates = new_by_text.get(old_elements[i]['text'])
+            if candidates:
+                pairs.append((i, candidates.popleft()))
+            else:
+                leftover_old.append(i)
+        paired_new = {j for _, j in pairs}
+        leftover_new = [j for j in unmatched_new if j not in paired_new]
+
+        # Leftovers are paired in document order when they look like an edit of each other
+        edited, removed, added = align_similar(
+            [old_elements[i]['text'] for i in leftover_old],
+            [new_elements[j]['text'] for j in leftover_new]
+        )
+        pairs.extend((leftover_old[a], leftover_new[b]) for a, b in edited)
+        removed = [leftover_old[a] for a in removed]
+        added = [leftover_new[b] for b in added]
+
+        # Then reworded clauses that moved further than the window
+        if PAIR_NEAR_DUPLICATES and removed and added:
+            moved, still_removed, still_added = align_near_duplicates(
+                [word_set(old_elements[i]['text']) for i in removed],
+                [word_set(new_elements[j]['text']) for j in added],
+                PAIR_SIMILARITY,
+                text_similarity
+            )
+            pairs.extend((removed[a], added[b]) for a, b in moved)
+            removed = [removed[a] for a in still_removed]
+            added = [added[b] for b in still_added]
+
+        for i, j in sorted(pairs):
+            for field in ELEMENT_KEYS:
+                old_value, new_value = old_elements[i][field], new_elements[j][field]
+                if old_value != new_value:
+                    diff['values_changed'][f"root[{key!r}][{i}][{field!r}]"] = {
+                        'new_value': new_value,
+                        'old_value': old_value,
+                        'new_path': f"root[{key!r}][{j}][{field!r}]"
+                    }
+        for i in removed:
+            diff['iterable_item_removed'][f"root[{key!r}][{i}]"] = old_elements[i]
+        for j in added:
+            diff['iterable_item_added'][f"root[{key!r}][{j}]"] = new_elements[j]
+
+    return dict(diff)
+
 def compact_diff(diff: Dict[str, Any]) -> Dict[str, Any]:
     compact = {}
     
@@ -32,9 +201,10 @@ def compact_diff(diff: Dict[str, Any]) -> Dict[str, Any]:
     
     return compact
 
-def text_diff(text1: str, text2: str) -> List[Dict[str, Any]]:
+def text_diff(text1: str, text2: str, engine: str = None) -> List[Dict[str, Any]]:
     """
-    Generate a compact word-level diff between two strings.
+    Generate a compact word-level diff between two strings, using the given
+    engine or TEXT_DIFF_ENGINE.
     Returns a list of changes, where each change is a dict with keys:
     - 'type': 'added', 'removed', or 'replaced'
     - 'value': the word(s) that were changed
@@ -43,10 +213,10 @@ def text_diff(text1: str, text2: str) -> List[Dict[str, Any]]:
     words1 = text1.split()
     words2 = text2.split()
 
-    seqmatcher = difflib.SequenceMatcher(None, words1, words2)
+    get_opcodes = get_engine(engine or TEXT_DIFF_ENGINE)
     diff = []
 
-    for opcode, i1, i2, j1, j2 in seqmatcher.get_opcodes():
+    for opcode, i1, i2, j1, j2 in get_opcodes(words1, words2):
         if opcode == 'insert':
             diff.append({'type': 'added', 'value': ' '.join(words2[j1:j2]), 'position': i1})
         elif opcode == 'delete':
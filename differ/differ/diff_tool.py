@@ -1,17 +1,31 @@
 import os
 import json
-from typing import List, Dict, Any
+import re
+from typing import List, Dict, Any, Iterator, Set, Tuple
 from file_handler import FileHandler
 from diff_generator import generate_diff
 from diff_serializer import serialize_diff, generate_diff_summary
+from segment_store import SegmentStore
+from snapshot_reader import SnapshotReader
+from logger import timed
+
+DIFF_FILENAME_PATTERN = re.compile(r'diff_(\d{8}_\d{6})_(\d{8}_\d{6})\.json')
+
+def diff_filename(from_version: str, to_version: str) -> str:
+    return f"diff_{from_version.split('.')[0]}_{to_version.split('.')[0]}.json"
 
 class DiffTool:
-    def __init__(self, file_handler: FileHandler):
+    def __init__(self, file_handler: FileHandler, storage: str = "json"):
+        if storage not in ("json", "segment"):
+            raise ValueError(f"Unknown diff storage: {storage}")
         self.file_handler = file_handler
+        self.storage = storage
+        self.snapshot_reader = SnapshotReader(file_handler)
 
     def load_json_file(self, file_path: str) -> Dict[str, Any]:
-        content = self.file_handler.read_file(file_path)
-        return json.loads(content)
+        # Content-addressed snapshots are rebuilt into the full dict here
+        with timed('load_snapshot', path=file_path):
+            return self.snapshot_reader.read(file_path)
 
     def compare_versions(self, file_path1: str, file_path2: str) -> Dict[str, Any]:
         data1 = self.load_json_file(file_path1)
@@ -25,25 +39,69 @@ class DiffTool:
             if f.endswith(".json")
         ])
 
-    def compare_all_versions(self, directory: str, domain: str) -> List[Dict[str, Any]]:
+    def get_existing_pairs(self, output_dir: str) -> Set[Tuple[str, str]]:
+        if not os.path.isdir(output_dir):
+            return set()
+        # Pairs saved in either format count, so switching storage does not rediff history
+        pairs = SegmentStore(output_dir).existing_pairs()
+        for filename in self.file_handler.list_files(output_dir):
+            match = DIFF_FILENAME_PATTERN.match(filename)
+            if match:
+                pairs.add((f"{match.group(1)}.json", f"{match.group(2)}.json"))
+        return pairs
+
+    def get_missing_pairs(self, directory: str, domain: str, output_dir: str = None) -> List[Tuple[str, str]]:
         versions = self.get_file_versions(directory, domain)
-        diffs = []
-        for i in range(len(versions) - 1):
-            file_path1 = os.path.join(directory, domain, versions[i])
-            file_path2 = os.path.join(directory, domain, versions[i+1])
-            diff = self.compare_versions(file_path1, file_path2)
-            serialized_diff = serialize_diff(diff)
-            summary = generate_diff_summary(diff)
-            diffs.append({
-                'from_version': versions[i],
-                'to_version': versions[i+1],
-                'diff': serialized_diff,
-                'summary': summary
-            })
-        return diffs
+        existing_pairs = self.get_existing_pairs(output_dir) if output_dir else set()
+        return [
+            (versions[i], versions[i+1])
+            for i in range(len(versions) - 1)
+            if (versions[i], versions[i+1]) not in existing_pairs
+        ]
+
+    def build_diff(self, from_version: str, to_version: str, data1: Dict[str, Any], data2: Dict[str, Any]) -> Dict[str, Any]:
+        with timed('generate_diff', from_version=from_version, to_version=to_version):
+            diff = generate_diff(data1, data2)
+        return {
+            'from_version': from_version,
+            'to_version': to_version,
+            'diff': serialize_diff(diff),
+            'summary': generate_diff_summary(diff)
+        }
+
+    def iter_version_diffs(self, directory: str, domain: str, output_dir: str = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the diff of every consecutive pair of snapshots for a domain.
+        When output_dir is given, pairs that already have a diff file there are skipped.
+        """
+        # Holds the last snapshot loaded, so each snapshot is read once even though it is
+        # the right side of one pair and the left side of the next
+        cached_version, cached_data = None, None
+
+        for from_version, to_version in self.get_missing_pairs(directory, domain, output_dir):
+            if cached_version == from_version:
+                data1 = cached_data
+            else:
+                data1 = self.load_json_file(os.path.join(directory, domain, from_version))
+            data2 = self.load_json_file(os.path.join(directory, domain, to_version))
+            cached_version, cached_data = to_version, data2
+
+            yield self.build_diff(from_version, to_version, data1, data2)
+
+    def compare_all_versions(self, directory: str, domain: str, output_dir: str = None) -> List[Dict[str, Any]]:
+        return list(self.iter_version_diffs(directory, domain, output_dir))
 
     def save_diffs(self, diffs: List[Dict[str, Any]], output_dir: str):
-        for i, diff in enumerate(diffs):
-            filename = f"diff_{diff['from_version'].split('.')[0]}_{diff['to_version'].split('.')[0]}.json"
-            filepath = os.path.join(output_dir, filename)
-            self.file_handler.write_file(filepath, json.dumps(diff))
\ No newline at end of file
+        with timed('save_diffs', count=len(diffs), storage=self.storage):
+            self._save_diffs(diffs, output_dir)
+
+    def _save_diffs(self, diffs: List[Dict[str, Any]], output_dir: str):
+        if self.storage == "segment":
+            segment_store = SegmentStore(output_dir)
+            for diff in diffs:
+                segment_store.append(diff)
+            return
+
+        for diff in diffs:
+            filepath = os.path.join(output_dir, diff_filename(diff['from_version'], diff['to_version']))
+            self.file_handler.write_file(filepath, json.dumps(diff))
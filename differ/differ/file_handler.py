@@ -6,10 +6,17 @@ class FileHandler:
         with open(file_path, 'r') as file:
             return file.read()
 
+    def read_bytes(self, file_path: str) -> bytes:
+        with open(file_path, 'rb') as file:
+            return file.read()
+
     def write_file(self, file_path: str, content: str) -> None:
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
         with open(file_path, 'w') as file:
             file.write(content)
 
     def list_files(self, directory: str) -> List[str]:
-        return [f for f in os.listdir(directory) if os.path.isfile(os.path.join(directory, f))]
\ No newline at end of file
+        return [f for f in os.listdir(directory) if os.path.isfile(os.path.join(directory, f))]
+
+    def list_directories(self, directory: str) -> List[str]:
+        return [d for d in os.listdir(directory) if os.path.isdir(os.path.join(directory, d))]
\ No newline at end of file
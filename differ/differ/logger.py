@@ -0,0 +1,59 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List
+from config import get_env_var
+
+def get_logger(name: str) -> logging.Logger:
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+    return logger
+
+# Structured timing, off unless TIMING_LOGS=true or a listener is registered
+TIMING_LOGS = get_env_var('TIMING_LOGS', 'false').lower() == 'true'
+timing_listeners: List[Callable[[dict], None]] = []
+
+def get_timing_logger() -> logging.Logger:
+    logger = logging.getLogger('timing')
+    if not logger.handlers:
+        # One JSON object per line, so the output can be parsed back
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+def add_timing_listener(listener: Callable[[dict], None]) -> None:
+    timing_listeners.append(listener)
+
+def record_timing(stage: str, seconds: float, **fields) -> None:
+    if not TIMING_LOGS and not timing_listeners:
+        return
+    event = {'stage': stage, 'seconds': round(seconds, 6), **fields}
+    for listener in timing_listeners:
+        listener(event)
+    if TIMING_LOGS:
+        get_timing_logger().info(json.dumps(event))
+
+@contextmanager
+def timed(stage: str, **fields) -> Iterator[dict]:
+    """
+    Time the block as one stage. The yielded dict can be used to add fields
+    that are only known once the block has run. Nothing is measured while
+    timing is off.
+    """
+    if not TIMING_LOGS and not timing_listeners:
+        yield fields
+        return
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        record_timing(stage, time.perf_counter() - start, **fields)
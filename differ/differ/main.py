@@ -3,27 +3,42 @@ import json
 from config import get_env_var
 from file_handler import FileHandler
 from diff_tool import DiffTool
+from parallel_diff import ParallelDiffRunner
+
+def print_summary(diff):
+    print(f"Diff between {diff['from_version']} and {diff['to_version']}:")
+    print(json.dumps(diff['summary'], indent=2))
+    print("\n" + "="*50 + "\n")
 
 def main():
     data_directory = get_env_var('DATA_DIRECTORY', 'data')
     domain = get_env_var('DOMAIN', 'policies.google.com')
     output_directory = get_env_var('OUTPUT_DIRECTORY', 'diffs')
+    # INCREMENTAL=true skips pairs that already have a diff, so old pairs are not
+    # regenerated after a diff format change; by default every pair is rebuilt
+    incremental = get_env_var('INCREMENTAL', 'false').lower() == 'true'
+    all_domains = get_env_var('ALL_DOMAINS', 'false').lower() == 'true'
+    workers = get_env_var('DIFF_WORKERS')
+    # json writes one diff_<from>_<to>.json per pair, segment appends to diffs.seg
+    storage = get_env_var('DIFF_STORAGE', 'json')
 
     file_handler = FileHandler()
-    diff_tool = DiffTool(file_handler)
 
-    # Compare all versions
-    diffs = diff_tool.compare_all_versions(data_directory, domain)
+    if all_domains:
+        # Diff every domain under the data directory, spread across worker processes
+        runner = ParallelDiffRunner(file_handler, int(workers) if workers else None, incremental, storage)
+        for diff in runner.run(data_directory, output_directory):
+            print(f"[{diff['domain']}]")
+            print_summary(diff)
+        return
 
-    # Save the diffs
+    diff_tool = DiffTool(file_handler, storage)
     os.makedirs(output_directory, exist_ok=True)
-    diff_tool.save_diffs(diffs, output_directory)
 
-    # Print summaries
-    for diff in diffs:
-        print(f"Diff between {diff['from_version']} and {diff['to_version']}:")
-        print(json.dumps(diff['summary'], indent=2))
-        print("\n" + "="*50 + "\n")
+    # Compare all versions, or only the pairs without a diff yet, saving each as it is produced
+    for diff in diff_tool.iter_version_diffs(data_directory, domain, output_directory if incremental else None):
+        diff_tool.save_diffs([diff], output_directory)
+        print_summary(diff)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
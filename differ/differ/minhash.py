@@ -0,0 +1,90 @@
+"""
+MinHash signatures and an LSH index for pairing near-duplicate paragraphs in
+diff_generator's fast path (DIFF_FAST_PATH), under PAIR_NEAR_DUPLICATES.
+
+Texts come in as the word sets diff_generator.word_set makes, and candidates
+are checked with the similarity the caller passes, text_similarity, so both
+pairing passes share one definition of similar. A signature holds, for each of
+NUM_PERM hash functions, the smallest hash of any word in the set; two
+signatures agree in a position with probability equal to the Jaccard
+similarity of the sets.
+
+Signatures are cut into BANDS bands of ROWS rows and texts sharing any band
+become candidates, so finding candidates is close to linear in the number of
+texts. With 16 bands of 4 rows a pair at similarity s is found with probability
+1 - (1 - s^4)^16: about 0.65 at s = 0.5 and 0.99 at s = 0.7, where s is the
+Jaccard similarity text_similarity computes.
+
+Word hashes come from shake_128 rather than hash(), so pairing does not depend
+on PYTHONHASHSEED and the same snapshots always produce the same diff.
+"""
+import struct
+from hashlib import shake_128
+from collections import defaultdict
+from typing import Callable, Dict, List, Sequence, Set, Tuple
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+WORD_HASHES = struct.Struct(f'<{NUM_PERM}I')
+EMPTY = 1 << 32
+
+def word_hashes(word: str) -> Tuple[int, ...]:
+    """
+    NUM_PERM independent 32-bit hashes of a word, as consecutive slices of one
+    extendable-output digest.
+    """
+    return WORD_HASHES.unpack(shake_128(word.encode('utf-8')).digest(WORD_HASHES.size))
+
+def signature(words: Set[str], cache: Dict[str, Tuple[int, ...]] = None) -> Tuple[int, ...]:
+    if not words:
+        return (EMPTY,) * NUM_PERM
+    if cache is None:
+        cache = {}
+    columns = []
+    for word in words:
+        hashes = cache.get(word)
+        if hashes is None:
+            hashes = cache[word] = word_hashes(word)
+        columns.append(hashes)
+    return tuple(map(min, zip(*columns)))
+
+def band_keys(sig: Sequence[int]) -> List[Tuple[int, Tuple[int, ...]]]:
+    return [(band, tuple(sig[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+
+def align_near_duplicates(old_words: List[Set[str]], new_words: List[Set[str]], threshold: float,
+                          similarity: Callable[[Set[str], Set[str]], float]):
+    """
+    Pair old and new word sets whose similarity is at least `threshold`,
+    wherever they are in their lists. The most similar pairs are taken first,
+    ties go to the pair closest in position. Returns (pairs, removed, added) as
+    indexes into the two lists.
+    """
+
+    cache: Dict[str, Tuple[int, ...]] = {}
+    buckets = defaultdict(list)
+    for b, words in enumerate(new_words):
+        for key in band_keys(signature(words, cache)):
+            buckets[key].append(b)
+
+    scored = []
+    for a, words in enumerate(old_words):
+        candidates = set()
+        for key in band_keys(signature(words, cache)):
+            candidates.update(buckets.get(key, ()))
+        for b in candidates:
+            score = similarity(words, new_words[b])
+            if score >= threshold:
+                scored.append((-score, abs(a - b), a, b))
+
+    pairs = []
+    used_old, used_new = set(), set()
+    for _, _, a, b in sorted(scored):
+        if a not in used_old and b not in used_new:
+            pairs.append((a, b))
+            used_old.add(a)
+            used_new.add(b)
+
+    removed = [a for a in range(len(old_words)) if a not in used_old]
+    added = [b for b in range(len(new_words)) if b not in used_new]
+    return sorted(pairs), removed, added
@@ -0,0 +1,106 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Any, Iterator, List, Tuple
+from file_handler import FileHandler
+from diff_tool import DiffTool
+from logger import get_logger
+
+def diff_pairs(directory: str, domain: str, pairs: List[Tuple[str, str]], output_dir: str,
+               storage: str = "json") -> List[Dict[str, Any]]:
+    """
+    Diff a run of consecutive snapshot pairs of one domain and write each diff straight to output_dir.
+    Runs in a worker process, so only the summaries are sent back to the parent.
+
+    Each snapshot is loaded once, since it is the right side of one pair and the left
+    side of the next. A pair that fails is reported with an 'error' instead of a
+    'summary' and the rest of the run carries on.
+    """
+    diff_tool = DiffTool(FileHandler(), storage)
+    cached_version, cached_data = None, None
+    results = []
+    for from_version, to_version in pairs:
+        result = {'domain': domain, 'from_version': from_version, 'to_version': to_version}
+        try:
+            if cached_version == from_version:
+                data1 = cached_data
+            else:
+                data1 = diff_tool.load_json_file(os.path.join(directory, domain, from_version))
+            cached_version, cached_data = None, None
+            data2 = diff_tool.load_json_file(os.path.join(directory, domain, to_version))
+            cached_version, cached_data = to_version, data2
+            diff = diff_tool.build_diff(from_version, to_version, data1, data2)
+            diff_tool.save_diffs([diff], output_dir)
+            result['summary'] = diff['summary']
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+        results.append(result)
+    return results
+
+def chunk_pairs(pairs: List[Tuple[str, str]], pairs_per_task: int) -> List[List[Tuple[str, str]]]:
+    return [pairs[i:i + pairs_per_task] for i in range(0, len(pairs), pairs_per_task)]
+
+class ParallelDiffRunner:
+    """
+    Diffs the snapshot pairs of every domain under a data directory on a process pool.
+    Each domain's diffs are written to <output_directory>/<domain>, the layout the backend reads.
+
+    Pairs are handed out in runs of up to pairs_per_task consecutive pairs, so a
+    snapshot is loaded once per run instead of once per pair it belongs to.
+    """
+    def __init__(self, file_handler: FileHandler, max_workers: int = None, incremental: bool = True,
+                 storage: str = "json", pairs_per_task: int = 8):
+        self.file_handler = file_handler
+        self.diff_tool = DiffTool(file_handler, storage)
+        self.storage = storage
+        self.max_workers = max_workers
+        self.incremental = incremental
+        self.pairs_per_task = max(1, pairs_per_task)
+        self.failures: List[Dict[str, Any]] = []
+        self.logger = get_logger(__name__)
+
+    def find_domains(self, data_directory: str) -> List[str]:
+        return sorted(self.file_handler.list_directories(data_directory))
+
+    def collect_tasks(self, data_directory: str, output_directory: str) -> List[Tuple[str, List[Tuple[str, str]], str]]:
+        tasks = []
+        for domain in self.find_domains(data_directory):
+            output_dir = os.path.join(output_directory, domain)
+            pairs = self.diff_tool.get_missing_pairs(data_directory, domain, output_dir if self.incremental else None)
+            tasks.extend((domain, chunk, output_dir) for chunk in chunk_pairs(pairs, self.pairs_per_task))
+        return tasks
+
+    def run(self, data_directory: str, output_directory: str) -> Iterator[Dict[str, Any]]:
+        """
+        Yield each pair's summary as soon as its run of diffs has been written.
+        Pairs that fail are logged and kept in self.failures, the others still complete.
+        """
+        self.failures = []
+        tasks = self.collect_tasks(data_directory, output_directory)
+        if not tasks:
+            return
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(diff_pairs, data_directory, domain, pairs, output_dir, self.storage): (domain, pairs)
+                for domain, pairs, output_dir in tasks
+            }
+            for future in as_completed(futures):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    # The worker itself died, so none of its pairs are known to be written
+                    domain, pairs = futures[future]
+                    results = [
+                        {'domain': domain, 'from_version': from_version, 'to_version': to_version,
+                         'error': f"{type(e).__name__}: {e}"}
+                        for from_version, to_version in pairs
+                    ]
+                for result in results:
+                    if 'error' in result:
+                        self.logger.error(
+                            f"Error diffing {result['domain']} {result['from_version']} -> "
+                            f"{result['to_version']}: {result['error']}"
+                        )
+                        self.failures.append(result)
+                    else:
+                        yield result
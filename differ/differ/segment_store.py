@@ -0,0 +1,86 @@
+"""
+Append-only segment storage for a domain's diffs, as an alternative to one
+diff_<from>_<to>.json file per pair.
+
+A domain directory holds two files:
+
+    diffs.seg      records of <u32 little-endian length><zlib-compressed JSON diff>
+    diffs.seg.idx  fixed-size entries of <from:15s><to:15s><offset:u64><length:u32><written_at:f64>
+
+The record is written before its index entry, so the index only ever points at
+complete records. Rewriting a pair appends a new record, the last entry wins.
+A writer that dies mid-append leaves a torn index entry or bytes past the last
+indexed record; the next append cuts both off before writing.
+Readers can mmap the segment and decode one record without parsing the rest.
+"""
+import fcntl
+import json
+import os
+import struct
+import time
+import zlib
+from typing import Any, Dict, List, Set, Tuple
+
+SEGMENT_FILE = 'diffs.seg'
+INDEX_FILE = 'diffs.seg.idx'
+LENGTH = struct.Struct('<I')
+ENTRY = struct.Struct('<15s15sQId')
+
+class SegmentStore:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.segment_path = os.path.join(directory, SEGMENT_FILE)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+
+    def entries(self) -> List[Tuple[str, str, int, int, float]]:
+        if not os.path.exists(self.index_path):
+            return []
+        with open(self.index_path, 'rb') as f:
+            data = f.read()
+        # A torn trailing entry from an interrupted write is ignored
+        usable = len(data) - len(data) % ENTRY.size
+        return [
+            (from_version.decode('ascii'), to_version.decode('ascii'), offset, length, written_at)
+            for from_version, to_version, offset, length, written_at in ENTRY.iter_unpack(data[:usable])
+        ]
+
+    def existing_pairs(self) -> Set[Tuple[str, str]]:
+        return {(f"{from_version}.json", f"{to_version}.json") for from_version, to_version, *_ in self.entries()}
+
+    def _truncate_torn_tails(self, segment, index) -> None:
+        # Called with the segment locked. Offsets in the index are increasing, so
+        # the last whole entry marks where the segment's last complete record ends.
+        index_size = index.seek(0, os.SEEK_END)
+        whole_size = index_size - index_size % ENTRY.size
+        if whole_size != index_size:
+            index.truncate(whole_size)
+        segment_end = 0
+        if whole_size:
+            with open(self.index_path, 'rb') as f:
+                f.seek(whole_size - ENTRY.size)
+                *_, offset, length, _ = ENTRY.unpack(f.read(ENTRY.size))
+            segment_end = offset + LENGTH.size + length
+        if segment.seek(0, os.SEEK_END) > segment_end:
+            segment.truncate(segment_end)
+
+    def append(self, diff: Dict[str, Any]) -> None:
+        payload = zlib.compress(json.dumps(diff, separators=(',', ':')).encode('utf-8'))
+        os.makedirs(self.directory, exist_ok=True)
+        # Several worker processes may append to the same domain
+        with open(self.segment_path, 'ab') as segment, open(self.index_path, 'ab') as index:
+            fcntl.flock(segment, fcntl.LOCK_EX)
+            try:
+                self._truncate_torn_tails(segment, index)
+                offset = segment.seek(0, os.SEEK_END)
+                segment.write(LENGTH.pack(len(payload)) + payload)
+                segment.flush()
+                index.write(ENTRY.pack(
+                    diff['from_version'].split('.')[0].encode('ascii'),
+                    diff['to_version'].split('.')[0].encode('ascii'),
+                    offset,
+                    len(payload),
+                    time.time()
+                ))
+                index.flush()
+            finally:
+                fcntl.flock(segment, fcntl.LOCK_UN)
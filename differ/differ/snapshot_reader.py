@@ -0,0 +1,63 @@
+"""
+Reader for the scraper's content-addressed snapshots.
+
+A snapshot file is either a full {key: [element, ...]} dump or a manifest
+
+    {"format": "cas-v1", "elements": {key: [hash, ...]}, "objects": {pack: [hash, ...]}}
+
+whose elements live in packs under objects/, relative to the domain directory.
+Packs are written once and never modified, so they are cached by path.
+"""
+import gzip
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Dict
+from file_handler import FileHandler
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FORMAT = "cas-v1"
+
+def is_manifest(data: Any) -> bool:
+    return isinstance(data, dict) and data.get('format') == FORMAT
+
+def decompress(content: bytes, pack_name: str) -> bytes:
+    if pack_name.endswith('.gz'):
+        return gzip.decompress(content)
+    if pack_name.endswith('.zst'):
+        if zstandard is None:
+            raise ValueError(f"{pack_name} needs the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(content)
+    return content
+
+class SnapshotReader:
+    def __init__(self, file_handler: FileHandler, cache_size: int = 16):
+        self.file_handler = file_handler
+        self.cache_size = cache_size
+        self._packs: OrderedDict = OrderedDict()
+
+    def read_pack(self, path: str) -> Dict[str, dict]:
+        if path in self._packs:
+            self._packs.move_to_end(path)
+            return self._packs[path]
+        pack = json.loads(decompress(self.file_handler.read_bytes(path), path))
+        self._packs[path] = pack
+        while len(self._packs) > self.cache_size:
+            self._packs.popitem(last=False)
+        return pack
+
+    def resolve(self, domain_dir: str, manifest: dict) -> Dict[str, Any]:
+        lookup = {}
+        for pack_name in manifest['objects']:
+            lookup.update(self.read_pack(os.path.join(domain_dir, pack_name)))
+        return {key: [lookup[hash_value] for hash_value in hashes] for key, hashes in manifest['elements'].items()}
+
+    def read(self, file_path: str) -> Dict[str, Any]:
+        data = json.loads(self.file_handler.read_file(file_path))
+        if is_manifest(data):
+            return self.resolve(os.path.dirname(file_path), data)
+        return data
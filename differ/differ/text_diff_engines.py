@@ -0,0 +1,246 @@
+import bisect
+import difflib
+from typing import Callable, Dict, List, Sequence, Tuple
+
+Opcode = Tuple[str, int, int, int, int]
+MatchingBlock = Tuple[int, int, int]
+
+# Myers costs O((N + M) * D) for an edit script of D words. Past this many the
+# texts are mostly rewritten, and the engines hand them to SequenceMatcher
+MAX_EDIT_COST = 200
+
+class EditCostExceeded(Exception):
+    pass
+
+def intern_words(words1: Sequence[str], words2: Sequence[str]) -> Tuple[List[int], List[int]]:
+    """
+    Map words to small integer ids so the engines compare ints instead of strings.
+    """
+    ids: Dict[str, int] = {}
+    seq1 = [ids.setdefault(word, len(ids)) for word in words1]
+    seq2 = [ids.setdefault(word, len(ids)) for word in words2]
+    return seq1, seq2
+
+def opcodes_from_blocks(blocks: List[MatchingBlock], len1: int, len2: int) -> List[Opcode]:
+    """
+    Turn matching blocks into SequenceMatcher-style opcodes.
+    """
+    opcodes = []
+    i = j = 0
+    for a, b, size in blocks + [(len1, len2, 0)]:
+        tag = ''
+        if i < a and j < b:
+            tag = 'replace'
+        elif i < a:
+            tag = 'delete'
+        elif j < b:
+            tag = 'insert'
+        if tag:
+            opcodes.append((tag, i, a, j, b))
+        i, j = a + size, b + size
+        if size:
+            opcodes.append(('equal', a, i, b, j))
+    return opcodes
+
+def merge_blocks(blocks: List[MatchingBlock]) -> List[MatchingBlock]:
+    merged = []
+    for a, b, size in sorted(blocks):
+        if size == 0:
+            continue
+        if merged and merged[-1][0] + merged[-1][2] == a and merged[-1][1] + merged[-1][2] == b:
+            last = merged.pop()
+            merged.append((last[0], last[1], last[2] + size))
+        else:
+            merged.append((a, b, size))
+    return merged
+
+def trim_common(seq1: Sequence[int], lo1: int, hi1: int, seq2: Sequence[int], lo2: int, hi2: int,
+                blocks: List[MatchingBlock]) -> Tuple[int, int, int, int]:
+    """
+    Strip the common prefix and suffix of a region, recording them as matches.
+    """
+    start1, start2 = lo1, lo2
+    while lo1 < hi1 and lo2 < hi2 and seq1[lo1] == seq2[lo2]:
+        lo1 += 1
+        lo2 += 1
+    if lo1 > start1:
+        blocks.append((start1, start2, lo1 - start1))
+
+    end1, end2 = hi1, hi2
+    while lo1 < hi1 and lo2 < hi2 and seq1[hi1 - 1] == seq2[hi2 - 1]:
+        hi1 -= 1
+        hi2 -= 1
+    if hi1 < end1:
+        blocks.append((hi1, hi2, end1 - hi1))
+
+    return lo1, hi1, lo2, hi2
+
+def middle_snake(seq1: Sequence[int], lo1: int, hi1: int,
+                 seq2: Sequence[int], lo2: int, hi2: int, max_cost: int = None) -> Tuple[int, int, int, int]:
+    """
+    Find the middle snake of a shortest edit script between two regions
+    (Myers 1986, section 4b). Returns its start and end points.
+    Raises EditCostExceeded if the script is longer than max_cost.
+    """
+    n, m = hi1 - lo1, hi2 - lo2
+    delta = n - m
+    odd = delta % 2 == 1
+    bound = (n + m + 1) // 2
+    offset = bound + 1
+    forward = [0] * (2 * offset + 1)
+    backward = [0] * (2 * offset + 1)
+    # The paths meet at d = ceil(D / 2)
+    max_d = bound if max_cost is None else min(bound, (max_cost + 1) // 2)
+
+    for d in range(max_d + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and seq1[lo1 + x] == seq2[lo2 + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            if odd and delta - (d - 1) <= k <= delta + (d - 1):
+                if x + backward[offset + delta - k] >= n:
+                    return lo1 + start_x, lo2 + start_y, lo1 + x, lo2 + y
+
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and seq1[hi1 - 1 - x] == seq2[hi2 - 1 - y]:
+                x += 1
+                y += 1
+            backward[offset + k] = x
+            if not odd and -d <= delta - k <= d:
+                if x + forward[offset + delta - k] >= n:
+                    return hi1 - x, hi2 - y, hi1 - start_x, hi2 - start_y
+
+    if max_d < bound:
+        raise EditCostExceeded(f"edit script longer than {max_cost} words")
+    # Unreachable for well-formed input, the paths always meet by bound
+    raise RuntimeError("Myers diff failed to find a middle snake")
+
+def myers_blocks(seq1: Sequence[int], lo1: int, hi1: int, seq2: Sequence[int], lo2: int, hi2: int,
+                 blocks: List[MatchingBlock], max_cost: int = None) -> None:
+    # An explicit stack keeps deep recursion out of very long paragraphs
+    stack = [(lo1, hi1, lo2, hi2)]
+    while stack:
+        lo1, hi1, lo2, hi2 = stack.pop()
+        lo1, hi1, lo2, hi2 = trim_common(seq1, lo1, hi1, seq2, lo2, hi2, blocks)
+        if lo1 == hi1 or lo2 == hi2:
+            continue
+        x1, y1, x2, y2 = middle_snake(seq1, lo1, hi1, seq2, lo2, hi2, max_cost)
+        if x2 > x1:
+            blocks.append((x1, y1, x2 - x1))
+        stack.append((lo1, x1, lo2, y1))
+        stack.append((x2, hi1, y2, hi2))
+
+def myers_opcodes(words1: Sequence[str], words2: Sequence[str], max_cost: int = MAX_EDIT_COST) -> List[Opcode]:
+    """
+    Minimal word-level edit script in linear space. Texts that differ by more
+    than max_cost words (None for no limit) are diffed by SequenceMatcher.
+    """
+    seq1, seq2 = intern_words(words1, words2)
+    blocks: List[MatchingBlock] = []
+    try:
+        myers_blocks(seq1, 0, len(seq1), seq2, 0, len(seq2), blocks, max_cost)
+    except EditCostExceeded:
+        return sequencematcher_opcodes(words1, words2)
+    return opcodes_from_blocks(merge_blocks(blocks), len(seq1), len(seq2))
+
+def longest_increasing_anchors(anchors: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    Patience sort: the longest run of anchors increasing in both sequences.
+    anchors must be sorted by their position in the first sequence.
+    """
+    tails: List[int] = []
+    tail_items: List[int] = []
+    previous = [-1] * len(anchors)
+    for index, (_, b) in enumerate(anchors):
+        pos = bisect.bisect_left(tails, b)
+        if pos > 0:
+            previous[index] = tail_items[pos - 1]
+        if pos == len(tails):
+            tails.append(b)
+            tail_items.append(index)
+        else:
+            tails[pos] = b
+            tail_items[pos] = index
+    result = []
+    index = tail_items[-1] if tail_items else -1
+    while index != -1:
+        result.append(anchors[index])
+        index = previous[index]
+    return result[::-1]
+
+def patience_blocks(seq1: Sequence[int], lo1: int, hi1: int, seq2: Sequence[int], lo2: int, hi2: int,
+                    blocks: List[MatchingBlock], max_cost: int = None) -> None:
+    stack = [(lo1, hi1, lo2, hi2)]
+    while stack:
+        lo1, hi1, lo2, hi2 = stack.pop()
+        lo1, hi1, lo2, hi2 = trim_common(seq1, lo1, hi1, seq2, lo2, hi2, blocks)
+        if lo1 == hi1 or lo2 == hi2:
+            continue
+
+        # Words that occur exactly once on each side anchor the alignment
+        counts1: Dict[int, int] = {}
+        for i in range(lo1, hi1):
+            counts1[seq1[i]] = counts1.get(seq1[i], 0) + 1
+        positions2: Dict[int, int] = {}
+        counts2: Dict[int, int] = {}
+        for j in range(lo2, hi2):
+            counts2[seq2[j]] = counts2.get(seq2[j], 0) + 1
+            positions2[seq2[j]] = j
+        anchors = [
+            (i, positions2[seq1[i]]) for i in range(lo1, hi1)
+            if counts1[seq1[i]] == 1 and counts2.get(seq1[i]) == 1
+        ]
+        anchors = longest_increasing_anchors(anchors)
+
+        if not anchors:
+            # Nothing unique left, e.g. boilerplate repeated throughout, use Myers here
+            myers_blocks(seq1, lo1, hi1, seq2, lo2, hi2, blocks, max_cost)
+            continue
+
+        previous1, previous2 = lo1, lo2
+        for i, j in anchors:
+            blocks.append((i, j, 1))
+            stack.append((previous1, i, previous2, j))
+            previous1, previous2 = i + 1, j + 1
+        stack.append((previous1, hi1, previous2, hi2))
+
+def patience_opcodes(words1: Sequence[str], words2: Sequence[str], max_cost: int = MAX_EDIT_COST) -> List[Opcode]:
+    """
+    Patience diff: aligns on words unique to both sides, which keeps repetitive
+    legal phrasing from being matched across unrelated clauses. Falls back to
+    SequenceMatcher when a region left to Myers differs by more than max_cost words.
+    """
+    seq1, seq2 = intern_words(words1, words2)
+    blocks: List[MatchingBlock] = []
+    try:
+        patience_blocks(seq1, 0, len(seq1), seq2, 0, len(seq2), blocks, max_cost)
+    except EditCostExceeded:
+        return sequencematcher_opcodes(words1, words2)
+    return opcodes_from_blocks(merge_blocks(blocks), len(seq1), len(seq2))
+
+def sequencematcher_opcodes(words1: Sequence[str], words2: Sequence[str]) -> List[Opcode]:
+    return difflib.SequenceMatcher(None, words1, words2).get_opcodes()
+
+ENGINES: Dict[str, Callable[[Sequence[str], Sequence[str]], List[Opcode]]] = {
+    'sequencematcher': sequencematcher_opcodes,
+    'myers': myers_opcodes,
+    'patience': patience_opcodes,
+}
+
+def get_engine(name: str) -> Callable[[Sequence[str], Sequence[str]], List[Opcode]]:
+    if name not in ENGINES:
+        raise ValueError(f"Unknown text diff engine: {name}")
+    return ENGINES[name]
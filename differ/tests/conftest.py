@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The differ's modules import each other by bare name, as when run from differ/differ
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'differ'))
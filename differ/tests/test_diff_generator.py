@@ -0,0 +1,59 @@
+import diff_generator
+from diff_generator import generate_diff, selector_list_diff, text_similarity
+
+def element(text):
+    return {'html': f"<p>{text}</p>", 'text': text}
+
+OLD = {'content': [element("we collect your data"), element("we share it with partners")]}
+NEW = {'content': [element("we collect your personal data"), element("we share it with partners")]}
+
+def test_fast_path_is_opt_in(monkeypatch):
+    calls = []
+    monkeypatch.setattr(diff_generator, 'selector_list_diff', lambda a, b: calls.append(1) or None)
+    generate_diff(OLD, NEW)
+    assert calls == []
+    monkeypatch.setattr(diff_generator, 'DIFF_FAST_PATH', True)
+    generate_diff(OLD, NEW)
+    assert calls == [1]
+    generate_diff(OLD, NEW, fast_path=False)
+    assert calls == [1]
+
+def test_default_matches_deepdiff():
+    assert generate_diff(OLD, NEW) == generate_diff(OLD, NEW, fast_path=False)
+
+def test_fast_path_reports_edited_element():
+    diff = generate_diff(OLD, NEW, fast_path=True)
+    assert diff
+    assert generate_diff(OLD, OLD, fast_path=True) == {}
+
+def test_fast_path_falls_back_for_other_shapes():
+    assert selector_list_diff({'a': 1}, {'a': 2}) is None
+    assert generate_diff({'a': 1}, {'a': 2}, fast_path=True) == generate_diff({'a': 1}, {'a': 2}, fast_path=False)
+
+def test_text_similarity():
+    assert text_similarity(set(), set()) == 1.0
+    assert text_similarity({'a', 'b'}, {'b', 'c'}) == 1 / 3
+
+def far_moved_edit():
+    filler = [element(f"filler paragraph number {n} about cookies") for n in range(10)]
+    clause = "we collect your email address and phone number to provide the service"
+    old = {'content': [element(clause)] + filler}
+    # New clauses ahead of it push the edit past the windowed pass
+    inserted = [element(f"new clause {n} on {topic}") for n, topic in enumerate(
+        ["children", "arbitration", "retention", "transfers", "security", "contact"])]
+    new = {'content': filler + inserted + [element(clause.replace("phone number", "postal address"))]}
+    return old, new
+
+def test_default_settings_report_a_moved_edit_as_a_change():
+    old, new = far_moved_edit()
+    diff = generate_diff(old, new)
+    assert diff['changed']["root['content'][0]['text']"] == [
+        {'type': 'replaced', 'old_value': 'phone number', 'new_value': 'postal address', 'position': 6}]
+
+def test_fast_path_pairs_a_moved_edit_only_with_near_duplicates(monkeypatch):
+    old, new = far_moved_edit()
+    assert "root['content'][0]['text']" in generate_diff(old, new, fast_path=True)['changed']
+    monkeypatch.setattr(diff_generator, 'PAIR_NEAR_DUPLICATES', False)
+    diff = selector_list_diff(old, new)
+    assert 'values_changed' not in diff
+    assert list(diff['iterable_item_removed']) == ["root['content'][0]"]
@@ -0,0 +1,52 @@
+import json
+import os
+import pytest
+import main
+from diff_tool import DiffTool, diff_filename
+from file_handler import FileHandler
+
+VERSIONS = ['20240101_000000.json', '20240102_000000.json', '20240103_000000.json']
+
+@pytest.fixture
+def data(tmp_path):
+    domain_dir = tmp_path / 'data' / 'a.com'
+    os.makedirs(domain_dir)
+    for i, version in enumerate(VERSIONS):
+        with open(domain_dir / version, 'w') as file:
+            json.dump({'content': [f"clause version {i}"]}, file)
+    return tmp_path
+
+def write_stale_diff(output_dir, from_version, to_version):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, diff_filename(from_version, to_version))
+    with open(path, 'w') as file:
+        json.dump({'from_version': from_version, 'to_version': to_version, 'diff': {}, 'summary': {'stale': True}}, file)
+    return path
+
+def test_incremental_skips_pairs_with_a_diff(data):
+    tool = DiffTool(FileHandler())
+    output_dir = str(data / 'diffs')
+    write_stale_diff(output_dir, VERSIONS[0], VERSIONS[1])
+    diffs = tool.compare_all_versions(str(data / 'data'), 'a.com', output_dir)
+    assert [(d['from_version'], d['to_version']) for d in diffs] == [(VERSIONS[1], VERSIONS[2])]
+    assert len(tool.compare_all_versions(str(data / 'data'), 'a.com')) == 2
+
+def test_main_rebuilds_every_pair_by_default(data, monkeypatch):
+    monkeypatch.chdir(data)
+    monkeypatch.setenv('DOMAIN', 'a.com')
+    monkeypatch.delenv('INCREMENTAL', raising=False)
+    stale = write_stale_diff('diffs', VERSIONS[0], VERSIONS[1])
+    main.main()
+    with open(stale) as file:
+        assert 'stale' not in json.load(file)['summary']
+    assert len(os.listdir('diffs')) == 2
+
+def test_main_incremental_keeps_existing_diffs(data, monkeypatch):
+    monkeypatch.chdir(data)
+    monkeypatch.setenv('DOMAIN', 'a.com')
+    monkeypatch.setenv('INCREMENTAL', 'true')
+    stale = write_stale_diff('diffs', VERSIONS[0], VERSIONS[1])
+    main.main()
+    with open(stale) as file:
+        assert json.load(file)['summary'] == {'stale': True}
+    assert len(os.listdir('diffs')) == 2
@@ -0,0 +1,36 @@
+from diff_generator import selector_list_diff, text_similarity, word_set
+from minhash import align_near_duplicates, signature
+
+def words(texts):
+    return [word_set(text) for text in texts]
+
+def test_pairs_moved_rewordings_with_the_callers_similarity():
+    old = ["we share your data with advertising partners", "cookies track you", "contact us by email"]
+    new = ["contact us by email today", "unrelated new clause about children", "we share your data with advertising partners and affiliates"]
+    pairs, removed, added = align_near_duplicates(words(old), words(new), 0.5, text_similarity)
+    assert pairs == [(0, 2), (2, 0)]
+    assert removed == [1]
+    assert added == [1]
+
+def test_similarity_is_the_one_passed_in():
+    calls = []
+
+    def similarity(a, b):
+        calls.append((a, b))
+        return text_similarity(a, b)
+
+    align_near_duplicates(words(["a b c d"]), words(["a b c d e"]), 0.5, similarity)
+    assert calls == [(word_set("a b c d"), word_set("a b c d e"))]
+
+def test_signatures_are_deterministic():
+    assert signature(word_set("the same words")) == signature(word_set("words the same"))
+
+def test_selector_diff_pairs_far_moved_clause():
+    def element(text):
+        return {'html': f"<p>{text}</p>", 'text': text}
+    filler = [element(f"filler paragraph number {n} about nothing") for n in range(10)]
+    old = {'content': [element("we sell personal data to brokers")] + filler}
+    new = {'content': filler + [element("we sell personal data to many brokers")]}
+    diff = selector_list_diff(old, new)
+    assert "root['content'][0]['text']" in diff['values_changed']
+    assert 'iterable_item_added' not in diff
@@ -0,0 +1,52 @@
+import json
+import os
+from diff_tool import DiffTool
+from file_handler import FileHandler
+from parallel_diff import ParallelDiffRunner, chunk_pairs, diff_pairs
+
+VERSIONS = ['20240101_000000.json', '20240102_000000.json', '20240103_000000.json', '20240104_000000.json']
+
+def write_snapshots(directory, domain, versions=VERSIONS):
+    os.makedirs(os.path.join(directory, domain), exist_ok=True)
+    for i, version in enumerate(versions):
+        with open(os.path.join(directory, domain, version), 'w') as file:
+            json.dump({'content': [f"clause {j} version {min(i, j)}" for j in range(5)]}, file)
+
+def test_each_snapshot_is_loaded_once(tmp_path, monkeypatch):
+    write_snapshots(tmp_path / 'data', 'a.com')
+    loaded = []
+    original = DiffTool.load_json_file
+    monkeypatch.setattr(DiffTool, 'load_json_file', lambda self, path: loaded.append(path) or original(self, path))
+    pairs = list(zip(VERSIONS, VERSIONS[1:]))
+    results = diff_pairs(str(tmp_path / 'data'), 'a.com', pairs, str(tmp_path / 'diffs'))
+    assert [r['to_version'] for r in results] == VERSIONS[1:]
+    assert sorted(os.path.basename(path) for path in loaded) == VERSIONS
+
+def test_failed_pair_does_not_stop_the_run(tmp_path):
+    write_snapshots(tmp_path / 'data', 'a.com')
+    with open(tmp_path / 'data' / 'a.com' / VERSIONS[1], 'w') as file:
+        file.write('{not json')
+    pairs = list(zip(VERSIONS, VERSIONS[1:]))
+    results = diff_pairs(str(tmp_path / 'data'), 'a.com', pairs, str(tmp_path / 'diffs'))
+    assert ['error' in r for r in results] == [True, True, False]
+    assert os.listdir(tmp_path / 'diffs') == ['diff_20240103_000000_20240104_000000.json']
+
+def test_runner_logs_failures_and_continues(tmp_path):
+    data = tmp_path / 'data'
+    write_snapshots(data, 'a.com')
+    write_snapshots(data, 'b.com')
+    with open(data / 'a.com' / VERSIONS[0], 'w') as file:
+        file.write('{not json')
+    runner = ParallelDiffRunner(FileHandler(), max_workers=2, pairs_per_task=2)
+    summaries = list(runner.run(str(data), str(tmp_path / 'diffs')))
+    assert len(summaries) == 5
+    assert [(f['domain'], f['from_version']) for f in runner.failures] == [('a.com', VERSIONS[0])]
+    assert len(os.listdir(tmp_path / 'diffs' / 'b.com')) == 3
+    # Incremental runs only retry what is missing
+    assert runner.collect_tasks(str(data), str(tmp_path / 'diffs')) == [
+        ('a.com', [(VERSIONS[0], VERSIONS[1])], str(tmp_path / 'diffs' / 'a.com'))]
+
+def test_chunk_pairs():
+    pairs = list(zip(VERSIONS, VERSIONS[1:]))
+    assert chunk_pairs(pairs, 2) == [pairs[:2], pairs[2:]]
+    assert chunk_pairs([], 2) == []
@@ -0,0 +1,58 @@
+import json
+import os
+import zlib
+from segment_store import ENTRY, LENGTH, SegmentStore
+
+def make_diff(day, text="x"):
+    return {'from_version': f"202401{day:02d}_000000.json", 'to_version': f"202401{day + 1:02d}_000000.json",
+            'diff': {'changed': text}, 'summary': {'total_changes': day}}
+
+def read_record(store, offset, length):
+    with open(store.segment_path, 'rb') as f:
+        f.seek(offset)
+        assert LENGTH.unpack(f.read(LENGTH.size))[0] == length
+        return json.loads(zlib.decompress(f.read(length)))
+
+def check_consistent(store, expected_days):
+    entries = store.entries()
+    assert [entry[0] for entry in entries] == [f"202401{day:02d}_000000" for day in expected_days]
+    for from_version, _, offset, length, _ in entries:
+        assert read_record(store, offset, length)['from_version'] == f"{from_version}.json"
+    assert os.path.getsize(store.index_path) % ENTRY.size == 0
+
+def test_append_and_read_back(tmp_path):
+    store = SegmentStore(str(tmp_path))
+    for day in (1, 2, 3):
+        store.append(make_diff(day))
+    check_consistent(store, [1, 2, 3])
+    assert ('20240102_000000.json', '20240103_000000.json') in store.existing_pairs()
+
+def test_append_after_torn_index_entry(tmp_path):
+    store = SegmentStore(str(tmp_path))
+    store.append(make_diff(1))
+    store.append(make_diff(2))
+    # Crash halfway through writing the second index entry
+    os.truncate(store.index_path, ENTRY.size + ENTRY.size // 2)
+    store.append(make_diff(3))
+    check_consistent(store, [1, 3])
+
+def test_append_after_torn_record(tmp_path):
+    store = SegmentStore(str(tmp_path))
+    store.append(make_diff(1))
+    # Crash after the length prefix and part of the payload, before the index entry
+    with open(store.segment_path, 'ab') as f:
+        f.write(LENGTH.pack(1000) + b'partial')
+    store.append(make_diff(2))
+    check_consistent(store, [1, 2])
+    entries = store.entries()
+    assert entries[1][2] == entries[0][2] + LENGTH.size + entries[0][3]
+
+def test_append_after_crash_on_first_write(tmp_path):
+    store = SegmentStore(str(tmp_path))
+    with open(store.segment_path, 'wb') as f:
+        f.write(LENGTH.pack(50))
+    with open(store.index_path, 'wb') as f:
+        f.write(b'\0' * 7)
+    store.append(make_diff(1))
+    check_consistent(store, [1])
+    assert store.entries()[0][2] == 0
@@ -0,0 +1,94 @@
+import random
+import time
+import pytest
+import diff_generator
+import text_diff_engines
+from diff_generator import text_diff
+from text_diff_engines import ENGINES, get_engine, myers_opcodes, patience_opcodes, sequencematcher_opcodes
+
+def apply_opcodes(a, b, opcodes):
+    rebuilt = []
+    i = j = 0
+    for tag, i1, i2, j1, j2 in opcodes:
+        assert (i1, j1) == (i, j)
+        if tag == 'equal':
+            assert a[i1:i2] == b[j1:j2]
+            rebuilt.extend(a[i1:i2])
+        else:
+            rebuilt.extend(b[j1:j2])
+        i, j = i2, j2
+    assert (i, j) == (len(a), len(b))
+    return rebuilt
+
+def edit_distance(a, b):
+    # Insertions and deletions only, the quantity Myers minimises
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            if a[i - 1] == b[j - 1]:
+                current[j] = previous[j - 1]
+            else:
+                current[j] = min(previous[j], current[j - 1]) + 1
+        previous = current
+    return previous[-1]
+
+def script_cost(opcodes):
+    return sum((i2 - i1) + (j2 - j1) for tag, i1, i2, j1, j2 in opcodes if tag != 'equal')
+
+def random_pairs(count, length, vocabulary, seed=0):
+    rng = random.Random(seed)
+    words = [f"w{n}" for n in range(vocabulary)]
+    for _ in range(count):
+        yield ([rng.choice(words) for _ in range(rng.randint(0, length))],
+               [rng.choice(words) for _ in range(rng.randint(0, length))])
+
+@pytest.mark.parametrize('name', sorted(ENGINES))
+def test_opcodes_rebuild_the_new_text(name):
+    engine = get_engine(name)
+    for a, b in random_pairs(200, 30, 6):
+        assert apply_opcodes(a, b, engine(a, b)) == b
+
+def test_myers_is_minimal():
+    for a, b in random_pairs(200, 12, 4, seed=1):
+        assert script_cost(myers_opcodes(a, b, max_cost=None)) == edit_distance(a, b)
+
+def test_myers_finds_the_obvious_edit():
+    a = "we may share your data with partners".split()
+    b = "we may sell your data to partners".split()
+    assert myers_opcodes(a, b) == [('equal', 0, 2, 0, 2), ('replace', 2, 3, 2, 3), ('equal', 3, 5, 3, 5),
+                                   ('replace', 5, 6, 5, 6), ('equal', 6, 7, 6, 7)]
+
+@pytest.mark.parametrize('engine', [myers_opcodes, patience_opcodes])
+def test_full_rewrites_fall_back_to_sequencematcher(engine):
+    rng = random.Random(3)
+    a = [f"a{rng.randrange(300)}" for _ in range(3000)]
+    b = [f"b{rng.randrange(300)}" for _ in range(3000)]
+    start = time.perf_counter()
+    assert engine(a, b) == sequencematcher_opcodes(a, b)
+    assert time.perf_counter() - start < 2
+
+def test_cost_limit_only_applies_past_it(monkeypatch):
+    a = [f"w{n}" for n in range(50)]
+    b = [word if n % 10 else "x" for n, word in enumerate(a)]
+    fallbacks = []
+    monkeypatch.setattr(text_diff_engines, 'sequencematcher_opcodes',
+                        lambda a, b: fallbacks.append(1) or sequencematcher_opcodes(a, b))
+    # Five words replaced is an edit script of ten
+    assert myers_opcodes(a, b, max_cost=10) == myers_opcodes(a, b, max_cost=None)
+    assert fallbacks == []
+    myers_opcodes(a, b, max_cost=4)
+    assert fallbacks == [1]
+
+def test_engine_selection(monkeypatch):
+    calls = []
+    monkeypatch.setitem(ENGINES, 'myers', lambda a, b: calls.append('myers') or myers_opcodes(a, b))
+    monkeypatch.setitem(ENGINES, 'patience', lambda a, b: calls.append('patience') or patience_opcodes(a, b))
+    assert text_diff("a b c", "a x c", engine='myers') == [
+        {'type': 'replaced', 'old_value': 'b', 'new_value': 'x', 'position': 1}]
+    assert calls == ['myers']
+    monkeypatch.setattr(diff_generator, 'TEXT_DIFF_ENGINE', 'patience')
+    text_diff("a b c", "a x c")
+    assert calls == ['myers', 'patience']
+    with pytest.raises(ValueError):
+        text_diff("a", "b", engine='unknown')
@@ -0,0 +1,55 @@
+"""
+Exercise FetchScheduler against a local server that injects delays and errors.
+
+    python benchmark_fetch.py [fetches] [threads]
+
+Each scenario fetches the same page `fetches` times from `threads` threads
+through a fresh scheduler and reports how long it took, the rate the host
+actually saw and the scheduler's metrics.
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from fetch_scheduler import FetchScheduler
+from synthetic_site import PolicyServer, generate_versions
+
+SCENARIOS = [
+    # (name, server options, scheduler options)
+    ("healthy, 5/s", {}, {'rate': 5, 'burst': 2}),
+    ("30% 503 + Retry-After: 1", {'error_rate': 0.3, 'retry_after': 1}, {'rate': 5, 'burst': 2}),
+    ("20% 500, backoff", {'error_rate': 0.2, 'error_status': 500, 'seed': 1}, {'rate': 5, 'burst': 2, 'backoff_base': 0.2}),
+    ("Crawl-delay: 0.5", {'crawl_delay': 0.5}, {'rate': 5, 'burst': 2}),
+    ("hung server, 0.5s read timeout", {'delay': 2}, {'rate': 5, 'burst': 2, 'read_timeout': 0.5,
+                                                      'max_retries': 1, 'backoff_base': 0.1}),
+]
+
+def run_scenario(pages, fetches: int, threads: int, server_options: dict, scheduler_options: dict):
+    server = PolicyServer(pages, **server_options).start()
+    scheduler = FetchScheduler(**scheduler_options)
+
+    def fetch(_):
+        try:
+            return scheduler.fetch(requests.Session(), server.url, crawl_delay=server.crawl_delay).status_code
+        except requests.RequestException:
+            return None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        statuses = list(executor.map(fetch, range(fetches)))
+    elapsed = time.perf_counter() - start
+    server.stop()
+    metrics = next(iter(scheduler.metrics().values()))
+    return elapsed, server.hits, statuses.count(200), metrics
+
+def main(fetches: int = 20, threads: int = 4) -> None:
+    pages = generate_versions(paragraphs=20, versions=1)
+    print(f"{fetches} fetches from {threads} threads per scenario")
+    print(f"{'scenario':<34}{'time (s)':>9}{'hits':>6}{'hits/s':>8}{'ok':>5}{'retries':>9}{'errors':>8}{'p95 (ms)':>10}")
+    for name, server_options, scheduler_options in SCENARIOS:
+        elapsed, hits, ok, metrics = run_scenario(pages, fetches, threads, server_options, scheduler_options)
+        print(f"{name:<34}{elapsed:>9.2f}{hits:>6}{hits / elapsed:>8.2f}{ok:>5}{metrics['retries']:>9}"
+              f"{metrics['errors']:>8}{metrics['p95_latency'] * 1000:>10.0f}")
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,57 @@
+"""
+Time the cloud FileHandler against a fake bucket with simulated latency.
+
+    python benchmark_file_handler.py [domains] [latency_ms]
+
+Each simulated scrape does what WebsiteScraper does for a changed page:
+read latest.manifest, list the domain, write a snapshot, the manifest and the
+validators. Both modes must leave identical bucket contents.
+"""
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fake_gcs import FakeBucket
+from file_handler import FileHandler
+
+def scrape(file_handler: FileHandler, domain: str) -> None:
+    data_dir = f"data/{domain}"
+    try:
+        json.loads(file_handler.read_file(f"{data_dir}/latest.manifest"))
+    except Exception:
+        pass
+    file_handler.list_files(data_dir)
+    with file_handler.write_group():
+        write_snapshot(file_handler, domain, data_dir)
+
+def write_snapshot(file_handler: FileHandler, domain: str, data_dir: str) -> None:
+    snapshot = {'content': [{'html': f"<p>{i}</p>", 'text': f"paragraph {i} of {domain}"} for i in range(1000)]}
+    file_handler.write_file(f"{data_dir}/20240101_000000.json", json.dumps(snapshot, indent=2))
+    file_handler.write_file(f"{data_dir}/latest.manifest", json.dumps({'snapshot': '20240101_000000.json'}))
+    file_handler.write_file(f"validators/{domain}/page.json", json.dumps({'etag': domain}))
+
+def run(domains: int, latency: float, batch_writes: bool):
+    bucket = FakeBucket(latency=latency)
+    file_handler = FileHandler(bucket=bucket, batch_writes=batch_writes)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda number: scrape(file_handler, f"site{number}.example"), range(domains)))
+    file_handler.flush()
+    file_handler.close()
+    return time.perf_counter() - start, bucket
+
+def main(domains: int = 50, latency_ms: float = 20) -> None:
+    latency = latency_ms / 1000
+    print(f"{domains} domains, {latency_ms} ms per request")
+    print(f"{'mode':<12}{'time (s)':>10}{'requests':>10}{'stored (KB)':>13}")
+    results = {}
+    for name, batch_writes in (('immediate', False), ('batched', True)):
+        elapsed, bucket = run(domains, latency, batch_writes)
+        stored = sum(len(content) for content, _ in bucket.objects.values()) / 1024
+        print(f"{name:<12}{elapsed:>10.2f}{bucket.requests:>10}{stored:>13.1f}")
+        results[name] = {name: blob.download_as_bytes() for name, blob in
+                         ((name, bucket.blob(name)) for name in bucket.objects)}
+    print(f"identical: {results['immediate'] == results['batched']}")
+
+if __name__ == "__main__":
+    main(*(float(arg) if i else int(arg) for i, arg in enumerate(sys.argv[1:])))
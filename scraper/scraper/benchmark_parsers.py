@@ -0,0 +1,51 @@
+"""
+Compare the parser backends on saved HTML pages.
+
+    python benchmark_parsers.py <pages_directory> <config.yaml> [repeat]
+
+Every backend's output is checked against html.parser. lxml can repair
+malformed markup differently, and a backend that is not identical here means
+a site switched to it needs a re-baseline (see parsing.ParserBackend).
+"""
+import os
+import sys
+import time
+import yaml
+from parsing import available_backends, get_parser_backend
+
+def benchmark(pages_directory: str, config_path: str, repeat: int = 5) -> None:
+    with open(config_path, 'r') as file:
+        selectors = yaml.safe_load(file)['selectors']
+
+    pages = []
+    for filename in sorted(os.listdir(pages_directory)):
+        if filename.endswith(('.html', '.htm')):
+            with open(os.path.join(pages_directory, filename), 'r', encoding='utf-8') as file:
+                pages.append((filename, file.read()))
+
+    if not pages:
+        print(f"No .html files found in {pages_directory}")
+        return
+
+    reference = get_parser_backend('html.parser', selectors)
+    expected = {filename: reference.parse(content) for filename, content in pages}
+
+    print(f"{'backend':<14}{'total (s)':>12}{'per page (ms)':>16}  identical")
+    for name in available_backends():
+        backend = get_parser_backend(name, selectors)
+        identical = all(backend.parse(content) == expected[filename] for filename, content in pages)
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for _, content in pages:
+                backend.parse(content)
+        elapsed = time.perf_counter() - start
+
+        per_page = elapsed / (repeat * len(pages)) * 1000
+        print(f"{name:<14}{elapsed:>12.3f}{per_page:>16.2f}  {identical}")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    benchmark(sys.argv[1], sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 5)
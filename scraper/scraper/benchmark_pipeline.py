@@ -0,0 +1,138 @@
+"""
+End-to-end benchmark of scrape -> diff -> serve on a synthetic policy.
+
+    python benchmark_pipeline.py [--paragraphs 200] [--churn 0.05] [--versions 5]
+                                 [--requests 50] [--workdir DIR] [--events FILE]
+
+A local server serves each generated version in turn and the scraper fetches
+it into <workdir>/data. The differ then diffs the snapshots into
+<workdir>/diffs/synthetic, and the backend loads them and answers /api/changes
+requests. The differ and backend run as subprocesses with TIMING_LOGS=true,
+since their modules share names with the scraper's; their stage timings are
+read back from the same structured logs production would emit.
+
+Snapshot names have one-second resolution, so the scraper waits for the next
+second between versions; that wait is not part of any stage.
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+from file_handler import FileHandler
+from logger import add_timing_listener
+from synthetic_site import SELECTORS, PolicyServer, generate_versions
+from website_config import WebsiteConfig
+from website_scraper import WebsiteScraper
+
+PACKAGE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DIFFER_DIRECTORY = os.path.join(PACKAGE_ROOT, 'differ', 'differ')
+BACKEND_DIRECTORY = os.path.join(PACKAGE_ROOT, 'backend', 'backend')
+COMPANY = 'synthetic'
+
+BACKEND_SCRIPT = """
+import sys
+import main
+client = main.app.test_client()
+for _ in range(int(sys.argv[1])):
+    client.get('/api/changes')
+"""
+
+STAGES = ('fetch', 'scrape', 'parse_data', 'save_data', 'load_snapshot', 'generate_diff', 'save_diffs',
+          'load_changes', '/api/changes')
+
+def parse_timings(output: str) -> List[dict]:
+    events = []
+    for line in output.splitlines():
+        if line.startswith('{'):
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if 'stage' in event:
+                events.append(event)
+    return events
+
+def run_stage(directory: str, args: List[str], workdir: str, env: Dict[str, str]) -> List[dict]:
+    env = {**os.environ, **env, 'TIMING_LOGS': 'true', 'PYTHONPATH': directory}
+    result = subprocess.run([sys.executable, *args], cwd=workdir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr}")
+    return parse_timings(result.stderr)
+
+def scrape_versions(pages: List[str], workdir: str) -> Tuple[List[dict], str]:
+    events = []
+    add_timing_listener(events.append)
+    server = PolicyServer(pages).start()
+    config = WebsiteConfig({'url': server.url, 'scraper_type': 'requests', 'selectors': SELECTORS})
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for version in range(len(pages)):
+            server.version = version
+            WebsiteScraper(config, FileHandler()).scrape_and_save()
+            now = time.time()
+            time.sleep(math.ceil(now) - now + 0.01)
+    finally:
+        os.chdir(cwd)
+        server.stop()
+    return events, server.url
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def report(events: List[dict]) -> None:
+    print(f"{'stage':<16}{'count':>7}{'total (ms)':>12}{'mean (ms)':>11}{'p50 (ms)':>10}{'p95 (ms)':>10}")
+    for stage in STAGES:
+        values = [event['seconds'] * 1000 for event in events if event['stage'] == stage]
+        if values:
+            print(f"{stage:<16}{len(values):>7}{sum(values):>12.1f}{sum(values) / len(values):>11.2f}"
+                  f"{percentile(values, 0.5):>10.2f}{percentile(values, 0.95):>10.2f}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--paragraphs', type=int, default=200)
+    parser.add_argument('--churn', type=float, default=0.05)
+    parser.add_argument('--versions', type=int, default=5)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', help="kept after the run, a temporary directory otherwise")
+    parser.add_argument('--events', help="write every timing event to this file as JSON lines")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='pipeline-benchmark-')
+    os.makedirs(workdir, exist_ok=True)
+    print(f"{args.versions} versions of {args.paragraphs} paragraphs, {args.churn:.0%} churn, in {workdir}")
+
+    pages = generate_versions(args.paragraphs, args.churn, args.versions, args.seed)
+    events, url = scrape_versions(pages, workdir)
+    domain = url.split('/')[2]
+
+    events += run_stage(DIFFER_DIRECTORY, [os.path.join(DIFFER_DIRECTORY, 'main.py')], workdir, {
+        'DATA_DIRECTORY': 'data',
+        'DOMAIN': domain,
+        'OUTPUT_DIRECTORY': os.path.join('diffs', COMPANY),
+        'ALL_DOMAINS': 'false'
+    })
+
+    backend_events = run_stage(BACKEND_DIRECTORY, ['-c', BACKEND_SCRIPT, str(args.requests)], workdir, {
+        'REFRESH_INTERVAL': '0'
+    })
+    for event in backend_events:
+        if event['stage'] == 'request':
+            event['stage'] = event['path']
+    events += backend_events
+
+    report(events)
+    if args.events:
+        with open(args.events, 'w') as file:
+            file.writelines(json.dumps(event) + '\n' for event in events)
+
+if __name__ == "__main__":
+    main()
@@ -9,9 +9,10 @@ def load_config_from_yaml(file_path: str, file_handler: FileHandler) -> WebsiteC
     return WebsiteConfig(config_data)
 
 def load_all_configs(directory: str, file_handler: FileHandler) -> List[WebsiteConfig]:
-    configs = []
-    for filename in file_handler.list_files(directory):
-        if filename.endswith(".yaml"):
-            file_path = f"{directory}/{filename}"
-            configs.append(load_config_from_yaml(file_path, file_handler))
-    return configs
\ No newline at end of file
+    file_paths = [
+        f"{directory}/{filename}" for filename in sorted(file_handler.list_files(directory))
+        if filename.endswith(".yaml")
+    ]
+    # Fetched concurrently in cloud mode
+    contents = file_handler.read_files(file_paths)
+    return [WebsiteConfig(yaml.safe_load(contents[file_path].decode('utf-8'))) for file_path in file_paths]
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""
+An in-memory stand-in for the parts of google.cloud.storage.Bucket that
+FileHandler uses, for exercising and benchmarking the cloud code path offline:
+
+    handler = FileHandler(bucket=FakeBucket(latency=0.05))
+
+latency is added to every request, to approximate a round trip to GCS.
+"""
+import gzip
+import io
+import threading
+import time
+from typing import Dict, Iterator, Tuple
+from google.api_core.exceptions import NotFound
+
+class FakeBlob:
+    def __init__(self, bucket: 'FakeBucket', name: str):
+        self.bucket = bucket
+        self.name = name
+        self.content_encoding = None
+        self.content_type = None
+
+    def download_as_bytes(self) -> bytes:
+        content, content_encoding = self.bucket.get(self.name)
+        # Like GCS, serve gzip-encoded objects decompressed
+        return gzip.decompress(content) if content_encoding == 'gzip' else content
+
+    def download_as_text(self) -> str:
+        return self.download_as_bytes().decode('utf-8')
+
+    def upload_from_string(self, content, content_type: str = None) -> None:
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        self.bucket.put(self.name, content, self.content_encoding)
+
+    def open(self, mode: str = 'rb', ignore_flush: bool = False, content_type: str = None, **kwargs):
+        if mode != 'wb':
+            raise ValueError("FakeBlob only supports opening for write")
+        return FakeWriter(self)
+
+class FakeWriter(io.BytesIO):
+    def __init__(self, blob: FakeBlob):
+        super().__init__()
+        self.blob = blob
+
+    def close(self) -> None:
+        if not self.closed:
+            self.blob.bucket.put(self.blob.name, self.getvalue(), self.blob.content_encoding)
+        super().close()
+
+class FakeBucket:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.objects: Dict[str, Tuple[bytes, str]] = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _request(self) -> None:
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def blob(self, name: str) -> FakeBlob:
+        return FakeBlob(self, name)
+
+    def get(self, name: str) -> Tuple[bytes, str]:
+        self._request()
+        with self._lock:
+            if name not in self.objects:
+                raise NotFound(f"No such object: {name}")
+            return self.objects[name]
+
+    def put(self, name: str, content: bytes, content_encoding: str = None) -> None:
+        self._request()
+        with self._lock:
+            self.objects[name] = (content, content_encoding)
+
+    def list_blobs(self, prefix: str = '', delimiter: str = None) -> Iterator[FakeBlob]:
+        self._request()
+        with self._lock:
+            names = sorted(self.objects)
+        for name in names:
+            if not name.startswith(prefix):
+                continue
+            if delimiter and delimiter in name[len(prefix):]:
+                continue
+            yield FakeBlob(self, name)
@@ -0,0 +1,220 @@
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, Optional
+from urllib.parse import urlparse
+import requests
+from config import get_env_var
+from logger import get_logger, record_timing
+
+# Latencies kept per host for the run's metrics
+MAX_LATENCIES = 10000
+# Responses worth retrying; 429 and 503 also slow the host down
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+
+def retry_after(headers, now: float = None) -> Optional[float]:
+    """
+    Seconds to wait according to a Retry-After header, given in seconds or as an HTTP date.
+    """
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - (now or time.time()))
+    except (TypeError, ValueError):
+        return None
+
+class HostState:
+    """
+    Token bucket and fetch metrics for one host. rate drops when the host
+    throttles us and climbs back towards max_rate while it does not.
+    """
+    def __init__(self, max_rate: float, burst: float):
+        self.max_rate = max_rate
+        self.rate = max_rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        # No request may start before this, set by Crawl-delay, Retry-After and backoff
+        self.not_before = 0.0
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.latencies: Deque[float] = deque(maxlen=MAX_LATENCIES)
+        self.statuses: Dict[int, int] = {}
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+class FetchScheduler:
+    """
+    Shared by every scraper, so all fetches to a host go through one per-host
+    token bucket however many threads are scraping it.
+
+    fetch() retries connection errors, timeouts and RETRY_STATUSES with
+    exponential backoff and full jitter, or for as long as Retry-After asks, up
+    to max_retry_after; a retry pauses the whole host, not just the one
+    request. Crawl-delay from robots.txt caps the host's rate. Every request has
+    connect and read timeouts, so a run takes bounded time.
+    """
+    def __init__(self, rate: float = 1.0, burst: float = 2, max_retries: int = 3,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0, max_retry_after: float = 120.0,
+                 connect_timeout: float = 10.0, read_timeout: float = 30.0, min_rate: float = 0.05):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+        self.timeout = (connect_timeout, read_timeout)
+        self.min_rate = min_rate
+        self.logger = get_logger(__name__)
+        self._hosts: Dict[str, HostState] = {}
+        self._lock = threading.Lock()
+
+    def host_state(self, host: str) -> HostState:
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = HostState(self.rate, self.burst)
+            return state
+
+    def acquire(self, host: str, crawl_delay: float = None) -> None:
+        """
+        Block until a request to host may start.
+        """
+        state = self.host_state(host)
+        while True:
+            with state.lock:
+                if crawl_delay:
+                    state.max_rate = min(state.max_rate, 1.0 / crawl_delay)
+                    state.rate = min(state.rate, state.max_rate)
+                    state.burst = 1.0
+                now = time.monotonic()
+                state.refill(now)
+                if now >= state.not_before and state.tokens >= 1:
+                    state.tokens -= 1
+                    return
+                wait = max(state.not_before - now, (1 - state.tokens) / state.rate)
+            time.sleep(wait)
+
+    def pause(self, host: str, seconds: float) -> None:
+        state = self.host_state(host)
+        with state.lock:
+            state.not_before = max(state.not_before, time.monotonic() + seconds)
+
+    def record(self, host: str, seconds: float, status: int = None, error: bool = False) -> None:
+        state = self.host_state(host)
+        with state.lock:
+            state.requests += 1
+            state.latencies.append(seconds)
+            if status is not None:
+                state.statuses[status] = state.statuses.get(status, 0) + 1
+            if error:
+                state.errors += 1
+            if status in THROTTLE_STATUSES:
+                state.rate = max(self.min_rate, state.rate / 2)
+            elif not error:
+                state.rate = min(state.max_rate, state.rate + state.max_rate / 10)
+        record_timing('fetch', seconds, host=host, status=status, error=error)
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def fetch(self, session: requests.Session, url: str, headers: Dict[str, str] = None,
+              crawl_delay: float = None) -> requests.Response:
+        """
+        GET url politely. Returns the last response, which may still be an error
+        status once retries run out, or raises the last requests exception.
+        """
+        host = urlparse(url).netloc
+        for attempt in range(self.max_retries + 1):
+            self.acquire(host, crawl_delay)
+            start = time.perf_counter()
+            try:
+                response = session.get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.record(host, time.perf_counter() - start, error=True)
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                self.logger.warning(f"{url} failed ({e}), retrying in {delay:.1f}s")
+            else:
+                retryable = response.status_code in RETRY_STATUSES
+                self.record(host, time.perf_counter() - start, response.status_code, error=retryable)
+                if not retryable or attempt == self.max_retries:
+                    return response
+                delay = retry_after(response.headers)
+                if delay is None:
+                    delay = self.backoff(attempt)
+                elif delay > self.max_retry_after:
+                    self.logger.warning(f"{url} asked us to retry after {delay:.0f}s, giving up")
+                    return response
+                self.logger.warning(f"{url} returned {response.status_code}, retrying in {delay:.1f}s")
+
+            state = self.host_state(host)
+            with state.lock:
+                state.retries += 1
+            self.pause(host, delay)
+
+    def metrics(self) -> Dict[str, dict]:
+        result = {}
+        with self._lock:
+            hosts = dict(self._hosts)
+        for host, state in hosts.items():
+            with state.lock:
+                latencies = sorted(state.latencies)
+                result[host] = {
+                    'requests': state.requests,
+                    'errors': state.errors,
+                    'retries': state.retries,
+                    'statuses': dict(state.statuses),
+                    'rate': round(state.rate, 3),
+                    'mean_latency': sum(latencies) / len(latencies) if latencies else None,
+                    'p95_latency': latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else None
+                }
+        return result
+
+    def log_metrics(self) -> None:
+        for host, metrics in sorted(self.metrics().items()):
+            mean = metrics['mean_latency'] or 0
+            self.logger.info(
+                f"{host}: {metrics['requests']} requests, {metrics['errors']} errors, "
+                f"{metrics['retries']} retries, mean latency {mean * 1000:.0f}ms, rate {metrics['rate']}/s"
+            )
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def reset_fetch_scheduler() -> None:
+    """
+    Start the next get_fetch_scheduler() afresh, so throttled rates and metrics
+    do not carry over from an earlier run in the same process.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = None
+
+def get_fetch_scheduler() -> FetchScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = FetchScheduler(
+                rate=float(get_env_var('FETCH_RATE', '1.0')),
+                burst=float(get_env_var('FETCH_BURST', '2')),
+                max_retries=int(get_env_var('FETCH_RETRIES', '3')),
+                backoff_base=float(get_env_var('FETCH_BACKOFF', '1.0')),
+                backoff_max=float(get_env_var('FETCH_BACKOFF_MAX', '60')),
+                max_retry_after=float(get_env_var('FETCH_MAX_RETRY_AFTER', '120')),
+                connect_timeout=float(get_env_var('FETCH_CONNECT_TIMEOUT', '10')),
+                read_timeout=float(get_env_var('FETCH_READ_TIMEOUT', '30'))
+            )
+        return _scheduler
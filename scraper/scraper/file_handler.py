@@ -1,36 +1,225 @@
 from google.cloud import storage
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+import gzip
+import itertools
 import os
-from typing import List
+import threading
+from logger import get_logger
 
 class FileHandler:
-    def __init__(self, is_cloud: bool = False, bucket_name: str = None):
-        self.is_cloud = is_cloud
+    """
+    Reads and writes scraper state on local disk or in a GCS bucket.
+
+    In cloud mode:
+    - list_files returns bare filenames, and listings are cached for the
+      lifetime of the handler (one run), updated by our own writes;
+    - with batch_writes, writes are held in memory, visible to reads, until
+      flush() uploads them on a thread pool. Writes made inside one
+      write_group() (or, outside any group, by one thread) are uploaded in the
+      order they were made, so a snapshot still lands before the manifest and
+      validators that point at it; separate groups upload concurrently;
+    - text larger than compress_min_size is streamed up gzip-encoded.
+    """
+    def __init__(self, is_cloud: bool = False, bucket_name: str = None, bucket=None,
+                 max_workers: int = 16, batch_writes: bool = False, compress_min_size: int = 64 * 1024):
+        self.is_cloud = is_cloud or bucket is not None
         self.bucket_name = bucket_name
-        if is_cloud:
+        self.max_workers = max(1, max_workers)
+        self.batch_writes = batch_writes
+        self.compress_min_size = compress_min_size
+        if bucket is not None:
+            self.bucket = bucket
+        elif is_cloud:
             self.client = storage.Client()
             self.bucket = self.client.get_bucket(bucket_name)
 
+        self._listings: Dict[str, set] = {}
+        self._pending: Dict[str, Tuple[bytes, bool]] = {}
+        self._queues: Dict[object, List[str]] = {}
+        self._groups = itertools.count()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="gcs-io")
+            return self._executor
+
+    @contextmanager
+    def write_group(self) -> Iterator[None]:
+        """
+        Batched writes made in this block are uploaded in order, as one unit.
+        """
+        previous = getattr(self._local, 'group', None)
+        self._local.group = ('group', next(self._groups))
+        try:
+            yield
+        finally:
+            self._local.group = previous
+
     def read_file(self, file_path: str) -> str:
         if self.is_cloud:
+            pending = self._pending.get(file_path)
+            if pending is not None:
+                return pending[0].decode('utf-8')
             blob = self.bucket.blob(file_path)
             return blob.download_as_text()
         else:
             with open(file_path, 'r') as file:
                 return file.read()
 
-    def write_file(self, file_path: str, content: str) -> None:
+    def read_bytes(self, file_path: str) -> bytes:
         if self.is_cloud:
+            pending = self._pending.get(file_path)
+            if pending is not None:
+                return pending[0]
             blob = self.bucket.blob(file_path)
-            blob.upload_from_string(content)
+            return blob.download_as_bytes()
+        else:
+            with open(file_path, 'rb') as file:
+                return file.read()
+
+    def read_files(self, file_paths: List[str]) -> Dict[str, bytes]:
+        """
+        Download several files concurrently. If any of them cannot be read, every
+        failure is logged once all reads have finished and the first one is raised.
+        """
+        def read(file_path):
+            try:
+                return file_path, self.read_bytes(file_path), None
+            except Exception as e:
+                return file_path, None, e
+
+        if not self.is_cloud or len(file_paths) < 2:
+            results = list(map(read, file_paths))
+        else:
+            results = list(self._pool().map(read, file_paths))
+        errors = [(file_path, error) for file_path, _, error in results if error is not None]
+        if errors:
+            logger = get_logger(__name__)
+            for file_path, error in errors:
+                logger.error(f"Error reading {file_path}: {error}")
+            raise errors[0][1]
+        return {file_path: content for file_path, content, _ in results}
+
+    def write_file(self, file_path: str, content: str, batch: bool = True) -> None:
+        """
+        With batch=False the file is uploaded straight away even when writes are batched.
+        """
+        if self.is_cloud:
+            self._write_cloud(file_path, content.encode('utf-8'), True, batch)
         else:
             os.makedirs(os.path.dirname(file_path), exist_ok=True)
             with open(file_path, 'w') as file:
                 file.write(content)
 
+    def write_bytes(self, file_path: str, content: bytes, batch: bool = True) -> None:
+        if self.is_cloud:
+            self._write_cloud(file_path, content, False, batch)
+        else:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, 'wb') as file:
+                file.write(content)
+
+    def _write_cloud(self, file_path: str, content: bytes, is_text: bool, batch: bool = True) -> None:
+        if self.batch_writes and batch:
+            with self._lock:
+                self._pending[file_path] = (content, is_text)
+                group = getattr(self._local, 'group', None) or ('thread', threading.get_ident())
+                self._queues.setdefault(group, []).append(file_path)
+        else:
+            with self._lock:
+                # An older batched copy must not be read back or uploaded over this one
+                self._pending.pop(file_path, None)
+            self._upload(file_path, content, is_text)
+        directory, filename = os.path.split(file_path)
+        with self._lock:
+            if directory in self._listings:
+                self._listings[directory].add(filename)
+
+    def _upload(self, file_path: str, content: bytes, is_text: bool) -> None:
+        blob = self.bucket.blob(file_path)
+        if is_text and len(content) >= self.compress_min_size:
+            # Stored gzip-encoded; GCS and the client library decompress it on download
+            blob.content_encoding = 'gzip'
+            with blob.open('wb', ignore_flush=True, content_type='text/plain') as raw:
+                with gzip.GzipFile(fileobj=raw, mode='wb') as compressed:
+                    compressed.write(content)
+        elif is_text:
+            blob.upload_from_string(content, content_type='text/plain')
+        else:
+            blob.upload_from_string(content, content_type='application/octet-stream')
+
+    def flush(self) -> int:
+        """
+        Upload every batched write. Returns the number of files uploaded and raises
+        the first upload error after all queues have been processed; a queue stops
+        at its first failure so nothing written after it is uploaded without it.
+        """
+        with self._lock:
+            queues = [list(dict.fromkeys(reversed(paths)))[::-1] for paths in self._queues.values()]
+            self._queues = {}
+
+        def upload_queue(paths):
+            uploaded = 0
+            for position, file_path in enumerate(paths):
+                with self._lock:
+                    pending = self._pending.get(file_path)
+                if pending is None:
+                    continue
+                try:
+                    self._upload(file_path, *pending)
+                except Exception as e:
+                    return uploaded, e, paths[position:]
+                with self._lock:
+                    if self._pending.get(file_path) is pending:
+                        del self._pending[file_path]
+                uploaded += 1
+            return uploaded, None, []
+
+        if not queues:
+            return 0
+        results = list(self._pool().map(upload_queue, queues))
+        errors = [error for _, error, _ in results if error is not None]
+        if errors:
+            # Keep what was not uploaded, in order, so a later flush can retry it
+            with self._lock:
+                for number, (_, _, remaining) in enumerate(results):
+                    if remaining:
+                        key = ('retry', number)
+                        self._queues[key] = remaining + self._queues.pop(key, [])
+            raise errors[0]
+        return sum(uploaded for uploaded, _, _ in results)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
     def list_files(self, directory: str) -> List[str]:
         if self.is_cloud:
-            return [blob.name for blob in self.bucket.list_blobs(prefix=directory)]
+            directory = directory.rstrip('/')
+            with self._lock:
+                cached = self._listings.get(directory)
+                if cached is not None:
+                    return sorted(cached)
+            prefix = f"{directory}/"
+            names = {
+                blob.name[len(prefix):] for blob in self.bucket.list_blobs(prefix=prefix, delimiter='/')
+                if blob.name != prefix
+            }
+            with self._lock:
+                names.update(
+                    os.path.basename(file_path) for file_path in self._pending
+                    if os.path.dirname(file_path) == directory
+                )
+                self._listings[directory] = names
+            return sorted(names)
         else:
             if not os.path.exists(directory):
                 return []
-            return [f for f in os.listdir(directory) if os.path.isfile(os.path.join(directory, f))]
\ No newline at end of file
+            return [f for f in os.listdir(directory) if os.path.isfile(os.path.join(directory, f))]
@@ -0,0 +1,171 @@
+"""
+Optional fused scrape-to-diff mode, FUSED_DIFF=true.
+
+When save_data stores a changed snapshot it hands the previous and new data to
+a FusedDiffer, which diffs them on a worker thread with the differ's own
+generate_diff and generate_diff_summary, writes diffs/<domain>/diff_<from>_<to>.json
+and tells the backend to refresh. A later differ run skips the pair, since the
+file already exists.
+
+Diff files are uploaded as soon as they are written, even when the run batches
+its other writes, so the backend can read every diff it is told about. Diffs
+written within notify_delay seconds of each other share one notification, and
+close() sends any that is still due.
+
+The differ is a separate package whose modules are imported by bare name, like
+the scraper's, so DIFFER_PATH must point at its module directory (differ/differ)
+and the differ's dependencies must be installed. It is appended to sys.path so
+the scraper's own config, file_handler and logger modules still win. Only
+diff_generator and diff_serializer are imported from it; the one scraper module
+they share a name with is config, whose get_env_var is the same in both.
+"""
+import json
+import os
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Union
+import requests
+from config import get_env_var
+from file_handler import FileHandler
+from logger import get_logger, timed
+
+class FusedDiffer:
+    def __init__(self, file_handler: FileHandler, differ_path: str, output_directory: str = 'diffs',
+                 max_workers: int = 2, notify_url: str = None, notify_token: str = None,
+                 notify_delay: float = 5.0):
+        if differ_path not in sys.path:
+            sys.path.append(differ_path)
+        from diff_generator import generate_diff
+        from diff_serializer import generate_diff_summary, serialize_diff
+        self.generate_diff = generate_diff
+        self.generate_diff_summary = generate_diff_summary
+        self.serialize_diff = serialize_diff
+
+        self.file_handler = file_handler
+        self.output_directory = output_directory
+        self.notify_url = notify_url
+        self.notify_token = notify_token
+        self.notify_delay = notify_delay
+        self.notifications = 0
+        self._notify_timer: Optional[threading.Timer] = None
+        self.executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="fused-diff")
+        self.futures: List[Future] = []
+        self.logger = get_logger(__name__)
+        self._lock = threading.Lock()
+
+    def submit(self, domain: str, from_version: str, to_version: str, data1: dict, data2: dict) -> Future:
+        future = self.executor.submit(self.diff, domain, from_version, to_version, data1, data2)
+        with self._lock:
+            self.futures.append(future)
+        return future
+
+    def diff(self, domain: str, from_version: str, to_version: str, data1: dict, data2: dict) -> Optional[str]:
+        try:
+            with timed('generate_diff', from_version=from_version, to_version=to_version):
+                diff = self.generate_diff(data1, data2)
+            result = {
+                'from_version': from_version,
+                'to_version': to_version,
+                'diff': self.serialize_diff(diff),
+                'summary': self.generate_diff_summary(diff)
+            }
+            filename = f"diff_{from_version.split('.')[0]}_{to_version.split('.')[0]}.json"
+            path = f"{self.output_directory}/{domain}/{filename}"
+            with timed('save_diffs', count=1, storage='json'):
+                self.file_handler.write_file(path, json.dumps(result), batch=False)
+            self.logger.info(f"Diff for {domain} written to {path}")
+            self.schedule_notify()
+            return path
+        except Exception as e:
+            self.logger.error(f"Error diffing {domain} {from_version} -> {to_version}: {e}")
+            return None
+
+    def schedule_notify(self) -> None:
+        """
+        Notify the backend notify_delay seconds from now, unless a notification is already due.
+        """
+        if not self.notify_url:
+            return
+        with self._lock:
+            if self._notify_timer is not None:
+                return
+            self._notify_timer = threading.Timer(self.notify_delay, self._send_due_notification)
+            self._notify_timer.daemon = True
+            self._notify_timer.start()
+
+    def _send_due_notification(self) -> None:
+        with self._lock:
+            if self._notify_timer is None:
+                return
+            self._notify_timer = None
+        self.notify()
+
+    def notify(self) -> None:
+        if not self.notify_url:
+            return
+        self.notifications += 1
+        headers = {'X-Refresh-Token': self.notify_token} if self.notify_token else {}
+        try:
+            requests.post(self.notify_url, headers=headers, timeout=5)
+        except requests.RequestException as e:
+            # The backend's own refresh interval picks the diff up regardless
+            self.logger.warning(f"Could not notify {self.notify_url}: {e}")
+
+    def close(self) -> int:
+        """
+        Wait for every submitted diff. Returns how many were written.
+        """
+        self.executor.shutdown(wait=True)
+        with self._lock:
+            futures, self.futures = self.futures, []
+            timer, self._notify_timer = self._notify_timer, None
+        if timer is not None:
+            timer.cancel()
+            self.notify()
+        return sum(1 for future in futures if future.result() is not None)
+
+# One FusedDiffer per FileHandler, so a run never writes diffs through another run's handler or bucket
+_differs: Dict[FileHandler, Union[FusedDiffer, bool]] = {}
+_differ_lock = threading.Lock()
+
+def get_fused_differ(file_handler: FileHandler) -> Optional[FusedDiffer]:
+    """
+    The FusedDiffer shared by scrapers using file_handler, or None when fused
+    mode is off or the differ cannot be imported.
+    """
+    if get_env_var('FUSED_DIFF', 'false').lower() != 'true':
+        return None
+    with _differ_lock:
+        differ = _differs.get(file_handler)
+        if differ is None:
+            default_path = os.path.join(os.path.dirname(__file__), '..', '..', 'differ', 'differ')
+            differ_path = os.path.abspath(get_env_var('DIFFER_PATH', default_path))
+            try:
+                differ = FusedDiffer(
+                    file_handler,
+                    differ_path,
+                    output_directory=get_env_var('DIFF_OUTPUT_DIRECTORY', 'diffs'),
+                    max_workers=int(get_env_var('FUSED_DIFF_WORKERS', '2')),
+                    notify_url=get_env_var('BACKEND_REFRESH_URL'),
+                    notify_token=get_env_var('BACKEND_REFRESH_TOKEN'),
+                    notify_delay=float(get_env_var('FUSED_DIFF_NOTIFY_DELAY', '5'))
+                )
+            except ImportError as e:
+                get_logger(__name__).error(f"Fused diff mode needs the differ at {differ_path}: {e}")
+                differ = False
+            _differs[file_handler] = differ
+        return differ or None
+
+def close_fused_differ(file_handler: FileHandler = None) -> int:
+    """
+    Close the FusedDiffer of file_handler, or every one when None, and forget
+    it. Returns how many diffs they wrote.
+    """
+    with _differ_lock:
+        if file_handler is None:
+            differs = list(_differs.values())
+            _differs.clear()
+        else:
+            differs = [_differs.pop(file_handler, None)]
+    return sum(differ.close() for differ in differs if differ)
@@ -1,7 +1,8 @@
 from config import get_env_var
 from file_handler import FileHandler
 from config_loader import load_all_configs
-from website_scraper import WebsiteScraper
+from scrape_runner import ScrapeRunner
+from fused_diff import close_fused_differ
 from logger import get_logger
 
 def main(event=None, context=None):
@@ -10,21 +11,36 @@ def main(event=None, context=None):
     is_cloud = get_env_var('IS_CLOUD', 'false').lower() == 'true'
     bucket_name = get_env_var('BUCKET_NAME')
     config_directory = get_env_var('CONFIG_DIRECTORY', 'configs')
+    max_workers = int(get_env_var('SCRAPE_CONCURRENCY', '8'))
+    per_domain_limit = int(get_env_var('SCRAPE_PER_DOMAIN_CONCURRENCY', '1'))
 
-    file_handler = FileHandler(is_cloud=is_cloud, bucket_name=bucket_name)
+    io_workers = int(get_env_var('GCS_IO_WORKERS', '16'))
+    # Off by default: batched writes only reach the bucket when the run flushes at the end
+    batch_writes = get_env_var('GCS_BATCH_WRITES', 'false').lower() == 'true'
+
+    file_handler = FileHandler(is_cloud=is_cloud, bucket_name=bucket_name,
+                               max_workers=io_workers, batch_writes=batch_writes)
 
     configs = load_all_configs(config_directory, file_handler)
+    logger.info(f"Loaded {len(configs)} website configs")
 
-    for website_config in configs:
-        scraper = WebsiteScraper(website_config, file_handler)
-        try:
-            scraper.scrape_and_save()
-        except Exception as e:
-            logger.error(f"Error scraping {website_config.url}: {e}")
+    runner = ScrapeRunner(file_handler, max_workers=max_workers, per_domain_limit=per_domain_limit)
+    try:
+        runner.run(configs)
+    finally:
+        # Diffs written in fused mode go out with the rest of the run's writes
+        diffed = close_fused_differ(file_handler)
+        if diffed:
+            logger.info(f"Wrote {diffed} diffs in fused mode")
+        # Upload whatever the run wrote in batch mode, even if it failed part way
+        uploaded = file_handler.flush()
+        file_handler.close()
+        if uploaded:
+            logger.info(f"Uploaded {uploaded} batched files")
 
 # Cloud Functions entry point
 def scrape_websites(event, context):
     main(event, context)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,66 @@
+"""
+Convert existing data/<domain>/*.json dumps into content-addressed snapshots.
+
+    python migrate_snapshots.py [domain ...]
+
+Uses the same IS_CLOUD, BUCKET_NAME and SNAPSHOT_COMPRESSION settings as the
+scraper. Snapshots are converted oldest first so each one dedupes against those
+before it; ones that are already manifests are left alone. Every converted
+snapshot is read back and compared before moving on, and restored from the
+original dump if it does not match. Set SNAPSHOT_FORMAT=cas afterwards so new
+snapshots are written the same way.
+"""
+import json
+import os
+import sys
+from datetime import datetime
+from typing import List
+from config import get_env_var
+from file_handler import FileHandler
+from snapshot_store import SnapshotStore, is_manifest
+
+DATA_DIRECTORY = "data"
+
+def list_domains(file_handler: FileHandler) -> List[str]:
+    if file_handler.is_cloud:
+        names = [blob.name for blob in file_handler.bucket.list_blobs(prefix=f"{DATA_DIRECTORY}/")]
+        return sorted({name.split('/')[1] for name in names if name.count('/') >= 2})
+    if not os.path.isdir(DATA_DIRECTORY):
+        return []
+    return sorted(d for d in os.listdir(DATA_DIRECTORY) if os.path.isdir(os.path.join(DATA_DIRECTORY, d)))
+
+def list_snapshots(file_handler: FileHandler, domain_dir: str) -> List[str]:
+    names = [name.rsplit('/', 1)[-1] for name in file_handler.list_files(domain_dir)]
+    return sorted(
+        (name for name in names if name.endswith('.json')),
+        key=lambda name: datetime.strptime(name.split('.')[0], "%Y%m%d_%H%M%S")
+    )
+
+def migrate_domain(store: SnapshotStore, domain: str) -> int:
+    domain_dir = f"{DATA_DIRECTORY}/{domain}"
+    converted = 0
+    previous = None
+    for snapshot in list_snapshots(store.file_handler, domain_dir):
+        original = store.file_handler.read_file(f"{domain_dir}/{snapshot}")
+        data = json.loads(original)
+        if not is_manifest(data):
+            timestamp = snapshot.split('.')[0]
+            store.write(domain_dir, timestamp, data, previous)
+            if store.read(domain_dir, snapshot) != data:
+                store.file_handler.write_file(f"{domain_dir}/{snapshot}", original)
+                raise RuntimeError(f"Migrated {domain_dir}/{snapshot} does not match the original, restored it")
+            converted += 1
+        previous = snapshot
+    return converted
+
+def main(domains: List[str]) -> None:
+    is_cloud = get_env_var('IS_CLOUD', 'false').lower() == 'true'
+    file_handler = FileHandler(is_cloud=is_cloud, bucket_name=get_env_var('BUCKET_NAME'))
+    store = SnapshotStore(file_handler, compression=get_env_var('SNAPSHOT_COMPRESSION', 'gzip'))
+
+    for domain in domains or list_domains(file_handler):
+        converted = migrate_domain(store, domain)
+        print(f"{domain}: converted {converted} snapshots")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,129 @@
+import re
+from typing import Dict, List, Optional
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer, FeatureNotFound
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# A leading compound selector we can turn into a SoupStrainer: tag, classes and an id
+SIMPLE_COMPOUND = re.compile(r'^(?P<tag>[a-zA-Z][\w-]*)?(?P<rest>(?:[.#][\w-]+)*)$')
+
+class ParserBackend:
+    """
+    Turns page content into the scraped data dict for a set of selectors.
+
+    The differ relies on the 'html' and 'text' values being stable, so a partial
+    backend must return exactly what the full parse with the same parser
+    returns. html.parser and lxml themselves do not always agree: they repair
+    malformed markup differently (lxml closes an unclosed <p> at the next <p>,
+    html.parser nests it), which changes the extracted text. Switching a site's
+    parser between them therefore needs a re-baseline, or its next snapshot
+    shows up as spurious changes.
+    """
+    def __init__(self, selectors: Dict[str, str], features: str = 'html.parser'):
+        self.selectors = selectors
+        self.features = features
+        # Compile selectors once per config rather than on every select call
+        self.compiled = {key: soupsieve.compile(selector) for key, selector in selectors.items()}
+
+    def build_soup(self, content: str) -> BeautifulSoup:
+        return BeautifulSoup(content, self.features)
+
+    def parse(self, content: str) -> dict:
+        soup = self.build_soup(content)
+        data = {}
+        for key, compiled in self.compiled.items():
+            data[key] = [
+                {
+                    'html': str(element),
+                    'text': element.get_text(strip=True)
+                }
+                for element in compiled.select(soup)
+            ]
+        return data
+
+def class_matcher(class_name: str):
+    def matches(value) -> bool:
+        if not value:
+            return False
+        values = value.split() if isinstance(value, str) else value
+        return class_name in values
+    return matches
+
+def leading_compound(selector: str) -> Optional[dict]:
+    """
+    Return the tag, class and id of the first compound selector, or None if the
+    selector could match outside that element's subtree (sibling combinators,
+    pseudo-classes, selector lists).
+    """
+    if any(token in selector for token in (',', '+', '~', ':', '[')):
+        return None
+    first = selector.replace('>', ' ').split()[0] if selector.strip() else ''
+    match = SIMPLE_COMPOUND.match(first)
+    if not first or not match:
+        return None
+    parts = re.findall(r'([.#])([\w-]+)', match.group('rest'))
+    return {
+        'tag': match.group('tag').lower() if match.group('tag') else None,
+        'classes': [value for prefix, value in parts if prefix == '.'],
+        'id': next((value for prefix, value in parts if prefix == '#'), None)
+    }
+
+class PartialParserBackend(ParserBackend):
+    """
+    Only builds the subtrees rooted at elements matching the first compound of
+    each selector, using a SoupStrainer. Falls back to a full parse when the
+    selectors can't be restricted safely.
+    """
+    def __init__(self, selectors: Dict[str, str], features: str = 'html.parser'):
+        super().__init__(selectors, features)
+        self.strainer = self.build_strainer()
+
+    def build_strainer(self) -> Optional[SoupStrainer]:
+        compounds = [leading_compound(selector) for selector in self.selectors.values()]
+        if not compounds or any(compound is None for compound in compounds):
+            return None
+
+        if len(compounds) == 1:
+            compound = compounds[0]
+            attrs = {}
+            if compound['classes']:
+                # Any one class is enough to narrow the parse, select() does the exact match
+                attrs['class'] = class_matcher(compound['classes'][0])
+            if compound['id']:
+                attrs['id'] = compound['id']
+            if not compound['tag'] and not attrs:
+                return None
+            return SoupStrainer(compound['tag'], attrs=attrs)
+
+        tags = [compound['tag'] for compound in compounds]
+        if any(tag is None for tag in tags):
+            return None
+        return SoupStrainer(sorted(set(tags)))
+
+    def build_soup(self, content: str) -> BeautifulSoup:
+        if self.strainer is None:
+            return super().build_soup(content)
+        return BeautifulSoup(content, self.features, parse_only=self.strainer)
+
+BACKENDS = {
+    'html.parser': (ParserBackend, 'html.parser'),
+    'lxml': (ParserBackend, 'lxml'),
+    'partial': (PartialParserBackend, 'html.parser'),
+    'lxml-partial': (PartialParserBackend, 'lxml'),
+}
+
+def get_parser_backend(name: str, selectors: Dict[str, str]) -> ParserBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown parser backend: {name}")
+    backend_class, features = BACKENDS[name]
+    try:
+        BeautifulSoup("", features)
+    except FeatureNotFound:
+        logger.warning(f"Parser '{features}' is not installed, falling back to html.parser")
+        features = 'html.parser'
+    return backend_class(selectors, features)
+
+def available_backends() -> List[str]:
+    return list(BACKENDS)
@@ -0,0 +1,216 @@
+import json
+import math
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+import requests
+from config import get_env_var
+from file_handler import FileHandler
+from logger import get_logger
+
+DEFAULT_TTL = 24 * 60 * 60
+MIN_TTL = 5 * 60
+FAILURE_TTL = 5 * 60
+
+def parse_crawl_delay(body: str, useragent: str = '*') -> Optional[float]:
+    """
+    The Crawl-delay, in seconds, that a robots.txt body gives useragent, falling
+    back to the * group. RobotFileParser.crawl_delay only accepts whole numbers
+    and returns None for a delay like 0.5, so the body is read here instead.
+    """
+    agent = useragent.split('/')[0].lower()
+    delays: Dict[str, float] = {}
+    group_agents, in_rules = [], False
+    for line in body.splitlines():
+        line = line.split('#', 1)[0].strip()
+        if ':' not in line:
+            continue
+        field, value = (part.strip() for part in line.split(':', 1))
+        field = field.lower()
+        if field == 'user-agent':
+            # User-agent lines after rules start a new group
+            if in_rules:
+                group_agents, in_rules = [], False
+            group_agents.append(value.lower())
+            continue
+        in_rules = True
+        if field == 'crawl-delay':
+            try:
+                delay = float(value)
+            except ValueError:
+                continue
+            if math.isfinite(delay) and delay >= 0:
+                for name in group_agents:
+                    delays.setdefault(name, delay)
+    # Matched the way RobotFileParser matches agents, * last
+    for name, delay in delays.items():
+        if name != '*' and name in agent:
+            return delay
+    return delays.get('*')
+
+class RobotsEntry:
+    def __init__(self, status: int, body: str, fetched_at: float, expires_at: float):
+        self.status = status
+        self.body = body
+        self.fetched_at = fetched_at
+        self.expires_at = expires_at
+        self.parser = self.build_parser()
+
+    def build_parser(self) -> RobotFileParser:
+        # Same status handling as RobotFileParser.read
+        parser = RobotFileParser()
+        if self.status in (401, 403):
+            parser.disallow_all = True
+        elif 400 <= self.status < 500:
+            parser.allow_all = True
+        elif self.status >= 500 or self.status == 0:
+            parser.disallow_all = True
+        else:
+            parser.parse(self.body.splitlines())
+        return parser
+
+    def crawl_delay(self, useragent: str = '*') -> Optional[float]:
+        # Only a robots.txt that was actually parsed has rules, as in build_parser
+        if not 200 <= self.status < 400:
+            return None
+        return parse_crawl_delay(self.body, useragent)
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.expires_at
+
+    def to_dict(self) -> Dict:
+        return {
+            'status': self.status,
+            'body': self.body,
+            'fetched_at': self.fetched_at,
+            'expires_at': self.expires_at
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RobotsEntry':
+        return cls(data['status'], data['body'], data['fetched_at'], data['expires_at'])
+
+def cache_ttl(headers, default_ttl: float) -> float:
+    """
+    Work out how long a robots.txt response may be cached from its
+    Cache-Control and Expires headers, falling back to default_ttl.
+    """
+    cache_control = headers.get('Cache-Control', '').lower()
+    if 'no-store' in cache_control or 'no-cache' in cache_control:
+        return MIN_TTL
+    match = re.search(r'max-age=(\d+)', cache_control)
+    if match:
+        return max(MIN_TTL, int(match.group(1)))
+    expires = headers.get('Expires')
+    if expires:
+        try:
+            return max(MIN_TTL, parsedate_to_datetime(expires).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    return default_ttl
+
+class RobotsRegistry:
+    """
+    Process-wide cache of parsed robots.txt files keyed by host.
+    Entries are kept in memory and persisted through the FileHandler under
+    cache_directory, so each host is fetched at most once per TTL window
+    across scrapers, threads and runs.
+    """
+    def __init__(self, file_handler: FileHandler, cache_directory: str = "robots",
+                 default_ttl: float = DEFAULT_TTL, timeout: float = 10):
+        self.file_handler = file_handler
+        self.cache_directory = cache_directory
+        self.default_ttl = default_ttl
+        self.timeout = timeout
+        self.logger = get_logger(__name__)
+        self._entries: Dict[str, RobotsEntry] = {}
+        self._host_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _host_lock(self, host: str) -> threading.Lock:
+        with self._lock:
+            return self._host_locks.setdefault(host, threading.Lock())
+
+    def _cache_path(self, host: str) -> str:
+        return f"{self.cache_directory}/{host}.json"
+
+    def _load_persisted(self, host: str) -> Optional[RobotsEntry]:
+        try:
+            return RobotsEntry.from_dict(json.loads(self.file_handler.read_file(self._cache_path(host))))
+        except Exception:
+            return None
+
+    def _persist(self, host: str, entry: RobotsEntry) -> None:
+        try:
+            self.file_handler.write_file(self._cache_path(host), json.dumps(entry.to_dict()))
+        except Exception as e:
+            self.logger.warning(f"Could not persist robots.txt for {host}: {e}")
+
+    def _fetch(self, root_url: str, stale: Optional[RobotsEntry]) -> RobotsEntry:
+        now = time.time()
+        try:
+            response = requests.get(f"{root_url}/robots.txt", timeout=self.timeout)
+        except requests.RequestException as e:
+            self.logger.warning(f"Error fetching robots.txt for {root_url}: {e}")
+            if stale:
+                # Keep honouring the last known rules until the host is reachable again
+                return RobotsEntry(stale.status, stale.body, stale.fetched_at, now + FAILURE_TTL)
+            return RobotsEntry(0, "", now, now + FAILURE_TTL)
+
+        if response.status_code >= 500:
+            ttl = FAILURE_TTL
+        else:
+            ttl = cache_ttl(response.headers, self.default_ttl)
+        return RobotsEntry(response.status_code, response.text, now, now + ttl)
+
+    def get_entry(self, url: str) -> RobotsEntry:
+        parsed = urlparse(url)
+        host = parsed.netloc
+        now = time.time()
+
+        entry = self._entries.get(host)
+        if entry and entry.is_fresh(now):
+            return entry
+
+        with self._host_lock(host):
+            # Another thread may have refreshed it while we waited
+            entry = self._entries.get(host)
+            if entry and entry.is_fresh(now):
+                return entry
+
+            persisted = self._load_persisted(host)
+            if persisted and persisted.is_fresh(now):
+                entry = persisted
+            else:
+                entry = self._fetch(f"{parsed.scheme}://{host}", persisted or entry)
+                if entry.status:
+                    self._persist(host, entry)
+
+            self._entries[host] = entry
+            return entry
+
+    def get_parser(self, url: str) -> RobotFileParser:
+        return self.get_entry(url).parser
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_robots_registry(file_handler: FileHandler) -> RobotsRegistry:
+    """
+    The registry shared by scrapers using file_handler. A run with a different
+    handler, e.g. the next invocation of a warm worker, gets a registry of its
+    own instead of persisting through the previous run's handler or bucket.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None or _registry.file_handler is not file_handler:
+            _registry = RobotsRegistry(
+                file_handler,
+                cache_directory=get_env_var('ROBOTS_CACHE_DIRECTORY', 'robots'),
+                default_ttl=float(get_env_var('ROBOTS_TTL', str(DEFAULT_TTL)))
+            )
+        return _registry
@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict
+from itertools import zip_longest
+from typing import List
+from urllib.parse import urlparse
+from website_config import WebsiteConfig
+from website_scraper import WebsiteScraper
+from fetch_scheduler import get_fetch_scheduler, reset_fetch_scheduler
+from file_handler import FileHandler
+from logger import get_logger
+
+class ScrapeRunner:
+    """
+    Runs WebsiteScraper.scrape_and_save for many configs on a bounded thread pool.
+    max_workers caps the total number of sites in flight, per_domain_limit caps
+    how many of them may hit the same host at once.
+
+    Each domain's configs are split into at most per_domain_limit lanes that are
+    scraped one after another, and a pool task runs a whole lane. No worker ever
+    sits blocked waiting for a busy domain while other domains have work.
+    """
+    def __init__(self, file_handler: FileHandler, max_workers: int = 8, per_domain_limit: int = 1):
+        self.file_handler = file_handler
+        self.max_workers = max(1, max_workers)
+        self.per_domain_limit = max(1, per_domain_limit)
+        self.logger = get_logger(__name__)
+
+    def domain_lanes(self, configs: List[WebsiteConfig]) -> List[List[WebsiteConfig]]:
+        by_domain = OrderedDict()
+        for website_config in configs:
+            by_domain.setdefault(urlparse(website_config.url).netloc, []).append(website_config)
+
+        lanes_by_domain = []
+        for domain_configs in by_domain.values():
+            lane_count = min(self.per_domain_limit, len(domain_configs))
+            lanes_by_domain.append([domain_configs[i::lane_count] for i in range(lane_count)])
+
+        # Interleave domains, so the first tasks submitted cover as many hosts as possible
+        return [lane for lanes in zip_longest(*lanes_by_domain) for lane in lanes if lane]
+
+    def scrape_one(self, website_config: WebsiteConfig) -> bool:
+        try:
+            scraper = WebsiteScraper(website_config, self.file_handler)
+            scraper.scrape_and_save()
+            return True
+        except Exception as e:
+            self.logger.error(f"Error scraping {website_config.url}: {e}")
+            return False
+
+    def scrape_lane(self, lane: List[WebsiteConfig]) -> int:
+        return sum(self.scrape_one(website_config) for website_config in lane)
+
+    def run(self, configs: List[WebsiteConfig]) -> int:
+        # A warm Cloud Function reuses the process, each run starts with fresh host state
+        reset_fetch_scheduler()
+        if self.max_workers == 1:
+            succeeded = sum(self.scrape_one(website_config) for website_config in configs)
+        else:
+            succeeded = 0
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(self.scrape_lane, lane) for lane in self.domain_lanes(configs)]
+                for future in as_completed(futures):
+                    succeeded += future.result()
+        self.logger.info(f"Scraped {succeeded}/{len(configs)} websites")
+        get_fetch_scheduler().log_metrics()
+        return succeeded
@@ -1,14 +1,16 @@
+from typing import Dict
 from scrapers.requests_scraper import RequestsScraper
 from scrapers.selenium_scraper import SeleniumScraper
+from scrapers.browser_pool import get_browser_pool
 from scrapers.base_scraper import BaseScraper
 from file_handler import FileHandler
 
 class ScraperFactory:
     @staticmethod
-    def get_scraper(url: str, scraper_type: str, file_handler: FileHandler) -> BaseScraper:
+    def get_scraper(url: str, scraper_type: str, file_handler: FileHandler, selectors: Dict[str, str] = None) -> BaseScraper:
         if scraper_type == "requests":
             return RequestsScraper(url, file_handler)
         elif scraper_type == "selenium":
-            return SeleniumScraper(url, file_handler)
+            return SeleniumScraper(url, file_handler, selectors=selectors, pool=get_browser_pool())
         else:
-            raise ValueError(f"Unknown scraper type: {scraper_type}")
\ No newline at end of file
+            raise ValueError(f"Unknown scraper type: {scraper_type}")
@@ -1,47 +1,116 @@
 from abc import ABC, abstractmethod
-from urllib.robotparser import RobotFileParser
 from urllib.parse import urlparse
 from file_handler import FileHandler
 from logger import get_logger
+from robots_registry import get_robots_registry
+from snapshot_store import get_snapshot_store
+from fused_diff import get_fused_differ
 import json
+import hashlib
+import re
 from datetime import datetime
 import logging
 
+SNAPSHOT_NAME = re.compile(r'^\d{8}_\d{6}\.json$')
+
 class BaseScraper(ABC):
     def __init__(self, url: str, file_handler: FileHandler):
         self.url = url
         self.root_url = f"{urlparse(url).scheme}://{urlparse(url).netloc}"
-        self.robot_parser = RobotFileParser()
-        self.robot_parser.set_url(f"{self.root_url}/robots.txt")
-        self.robot_parser.read()
+        self.robots = get_robots_registry(file_handler).get_entry(url)
+        self.robot_parser = self.robots.parser
         self.logger = get_logger(__name__)
         self.file_handler = file_handler
+        self.snapshot_store = get_snapshot_store(file_handler)
 
     def can_fetch(self) -> bool:
         return self.robot_parser.can_fetch("*", self.url)
 
+    def crawl_delay(self) -> float:
+        # Read from the robots.txt body, which keeps fractional delays the parser drops
+        return self.robots.crawl_delay("*")
+
     @abstractmethod
     def scrape(self) -> str:
         pass
 
+    def commit_fetch_state(self) -> None:
+        # Called once scraped content has been saved, for scrapers that track fetch state
+        pass
+
     def save_data(self, data: dict) -> None:
         if not data:
             return
 
-        previous_data = self.load_previous_dump()
-        
-        if previous_data == data:
+        data_hash = self.hash_data(data)
+        manifest = self.load_latest_manifest()
+        previous_data = None
+
+        if manifest is None:
+            # No manifest yet, fall back to the previous dump once and record its hash
+            latest_file = self.find_latest_snapshot()
+            if latest_file is not None:
+                previous_data = self.load_previous_dump(latest_file)
+                manifest = self.save_latest_manifest(latest_file, self.hash_data(previous_data))
+
+        if manifest is not None and manifest['hash'] == data_hash:
             self.logger.info(f"No changes detected for {self.url}. Skipping save.")
             return
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"data/{urlparse(self.url).netloc}/{timestamp}.json"
-        
-        self.file_handler.write_file(filename, json.dumps(data, indent=2))
+        domain = urlparse(self.url).netloc
+        data_dir = f"data/{domain}"
+        filename = f"{data_dir}/{timestamp}.json"
+
+        previous_snapshot = manifest['snapshot'] if manifest is not None else None
+        self.snapshot_store.write(data_dir, timestamp, data, previous_snapshot)
+        self.save_latest_manifest(f"{timestamp}.json", data_hash)
         
         self.logger.info(f"Changes detected. New data saved to {filename}")
 
-    def load_previous_dump(self) -> dict:
+        fused_differ = get_fused_differ(self.file_handler)
+        if fused_differ is not None and previous_snapshot is not None:
+            # Only a change costs a read of the previous snapshot, the hash check above needs none
+            if previous_data is None:
+                try:
+                    previous_data = self.load_previous_dump(previous_snapshot)
+                except Exception as e:
+                    # The manifest named a snapshot that is gone, the differ run picks the pair up instead
+                    self.logger.warning(f"Cannot read {data_dir}/{previous_snapshot} for the fused diff: {e}")
+                    return
+            fused_differ.submit(domain, previous_snapshot, f"{timestamp}.json", previous_data, data)
+
+    @staticmethod
+    def hash_data(data: dict) -> str:
+        canonical = json.dumps(data, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def manifest_path(self) -> str:
+        return f"data/{urlparse(self.url).netloc}/latest.manifest"
+
+    def load_latest_manifest(self) -> dict:
+        """
+        The manifest of the last saved snapshot, or None when it is missing,
+        unreadable or malformed, so save_data falls back to the snapshot listing
+        and writes a fresh one.
+        """
+        try:
+            manifest = json.loads(self.file_handler.read_file(self.manifest_path()))
+        except Exception:
+            return None
+        if not (isinstance(manifest, dict)
+                and isinstance(manifest.get('snapshot'), str) and SNAPSHOT_NAME.match(manifest['snapshot'])
+                and isinstance(manifest.get('hash'), str)):
+            self.logger.warning(f"Ignoring malformed manifest {self.manifest_path()}")
+            return None
+        return manifest
+
+    def save_latest_manifest(self, snapshot: str, data_hash: str) -> dict:
+        manifest = {'snapshot': snapshot, 'hash': data_hash}
+        self.file_handler.write_file(self.manifest_path(), json.dumps(manifest))
+        return manifest
+
+    def find_latest_snapshot(self) -> str:
         domain = urlparse(self.url).netloc
         data_dir = f"data/{domain}"
         files = [f for f in self.file_handler.list_files(data_dir) if f.endswith(".json")]
@@ -49,6 +118,14 @@ class BaseScraper(ABC):
         if not files:
             return None
 
-        latest_file = max(files, key=lambda f: datetime.strptime(f.split('.')[0], "%Y%m%d_%H%M%S"))
-        content = self.file_handler.read_file(f"{data_dir}/{latest_file}")
-        return json.loads(content)
\ No newline at end of file
+        return max(files, key=lambda f: datetime.strptime(f.split('.')[0], "%Y%m%d_%H%M%S"))
+
+    def load_previous_dump(self, latest_file: str = None) -> dict:
+        domain = urlparse(self.url).netloc
+        data_dir = f"data/{domain}"
+        latest_file = latest_file or self.find_latest_snapshot()
+
+        if latest_file is None:
+            return None
+
+        return self.snapshot_store.read(data_dir, latest_file)
\ No newline at end of file
@@ -0,0 +1,106 @@
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import List
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+from config import get_env_var
+from logger import get_logger
+
+@lru_cache(maxsize=None)
+def get_driver_path() -> str:
+    # Resolving the driver hits the network and the disk, so only do it once per process
+    return ChromeDriverManager().install()
+
+class BrowserPool:
+    """
+    A thread-safe pool of warm headless Chrome drivers.
+    Drivers are started lazily up to max_size and handed back after each page,
+    so a run pays Chrome startup once per driver instead of once per URL.
+    A caller waits at most acquire_timeout seconds for a driver to come free.
+    """
+    def __init__(self, max_size: int = 2, acquire_timeout: float = 300):
+        self.max_size = max(1, max_size)
+        self.acquire_timeout = acquire_timeout
+        self.logger = get_logger(__name__)
+        self._idle: List[webdriver.Chrome] = []
+        self._created = 0
+        # Guards _idle and _created; notified whenever a driver is returned or a slot frees up
+        self._available = threading.Condition()
+
+    def _create_driver(self) -> webdriver.Chrome:
+        chrome_options = Options()
+        chrome_options.add_argument("--headless")
+        service = Service(get_driver_path())
+        return webdriver.Chrome(service=service, options=chrome_options)
+
+    def _take(self) -> webdriver.Chrome:
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._available:
+            while not self._idle and self._created >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No browser became available within {self.acquire_timeout}s")
+                self._available.wait(remaining)
+            if self._idle:
+                return self._idle.pop()
+            self._created += 1
+
+        try:
+            return self._create_driver()
+        except Exception:
+            self._free_slot()
+            raise
+
+    def _free_slot(self) -> None:
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def _release(self, driver: webdriver.Chrome) -> None:
+        with self._available:
+            self._idle.append(driver)
+            self._available.notify()
+
+    def _discard(self, driver: webdriver.Chrome) -> None:
+        self._free_slot()
+        try:
+            driver.quit()
+        except Exception as e:
+            self.logger.warning(f"Error closing browser: {e}")
+
+    @contextmanager
+    def acquire(self):
+        driver = self._take()
+        try:
+            yield driver
+        except Exception:
+            # The browser may be in a bad state, replace it rather than reuse it
+            self._discard(driver)
+            raise
+        else:
+            self._release(driver)
+
+    def close(self) -> None:
+        with self._available:
+            drivers, self._idle = self._idle, []
+        for driver in drivers:
+            self._discard(driver)
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+def get_browser_pool() -> BrowserPool:
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = BrowserPool(
+                int(get_env_var('BROWSER_POOL_SIZE', '2')),
+                float(get_env_var('BROWSER_POOL_TIMEOUT', '300'))
+            )
+            atexit.register(_default_pool.close)
+        return _default_pool
@@ -1,20 +1,58 @@
 import requests
 from scrapers.base_scraper import BaseScraper
+from scrapers.validator_store import ValidatorStore, content_hash
+from config import get_env_var
+from fetch_scheduler import get_fetch_scheduler
 
 class RequestsScraper(BaseScraper):
     def __init__(self, url: str, file_handler):
         super().__init__(url, file_handler)
         self.session = requests.Session()
+        self.scheduler = get_fetch_scheduler()
+        self.validator_store = ValidatorStore(file_handler, get_env_var('VALIDATORS_DIRECTORY', 'validators'))
+        self.pending_validators = None
+
+    def conditional_headers(self, validators: dict) -> dict:
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        return headers
 
     def scrape(self) -> str:
         if not self.can_fetch():
             self.logger.warning(f"Scraping not allowed for {self.url}")
             return None
 
+        validators = self.validator_store.load(self.url) or {}
+
         try:
-            response = self.session.get(self.url)
+            # Rate limited, retried and timed out per host by the shared scheduler
+            response = self.scheduler.fetch(self.session, self.url, self.conditional_headers(validators),
+                                            crawl_delay=self.crawl_delay())
+            if response.status_code == 304:
+                self.logger.info(f"{self.url} not modified since last fetch. Skipping.")
+                return None
             response.raise_for_status()
-            return response.text
         except requests.RequestException as e:
             self.logger.error(f"Error fetching {self.url}: {e}")
-            return None
\ No newline at end of file
+            return None
+
+        body_hash = content_hash(response.text)
+        if body_hash == validators.get('content_hash'):
+            self.logger.info(f"Content for {self.url} is identical to last fetch. Skipping.")
+            return None
+
+        # Only stored once the content has been processed, see commit_fetch_state
+        self.pending_validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_hash': body_hash
+        }
+        return response.text
+
+    def commit_fetch_state(self) -> None:
+        if self.pending_validators:
+            self.validator_store.save(self.url, self.pending_validators)
+            self.pending_validators = None
@@ -1,32 +1,59 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from scrapers.base_scraper import BaseScraper
 import time
+from typing import Dict
+from urllib.parse import urlparse
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+from scrapers.base_scraper import BaseScraper
+from scrapers.browser_pool import BrowserPool, get_browser_pool
+from fetch_scheduler import get_fetch_scheduler
 
 class SeleniumScraper(BaseScraper):
-    def __init__(self, url: str, file_handler):
+    def __init__(self, url: str, file_handler, selectors: Dict[str, str] = None,
+                 pool: BrowserPool = None, wait_timeout: float = 15):
         super().__init__(url, file_handler)
-        self.driver = self.setup_driver()
+        self.selectors = selectors or {}
+        self.pool = pool or get_browser_pool()
+        self.wait_timeout = wait_timeout
+        self.scheduler = get_fetch_scheduler()
 
-    def setup_driver(self):
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        service = Service(ChromeDriverManager().install())
-        return webdriver.Chrome(service=service, options=chrome_options)
+    def wait_for_selectors(self, driver) -> None:
+        # Wait for JavaScript to render the content we are going to extract.
+        # wait_timeout bounds the whole wait, not each selector.
+        deadline = time.monotonic() + self.wait_timeout
+        if not self.selectors:
+            WebDriverWait(driver, self.wait_timeout).until(
+                lambda d: d.execute_script("return document.readyState") == "complete")
+            return
+        for selector in self.selectors.values():
+            remaining = max(0.0, deadline - time.monotonic())
+            try:
+                WebDriverWait(driver, remaining).until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
+            except TimeoutException:
+                self.logger.warning(f"Timed out waiting for '{selector}' on {self.url}")
 
     def scrape(self) -> str:
         if not self.can_fetch():
             self.logger.warning(f"Scraping not allowed for {self.url}")
             return None
 
+        # The browser does its own retrying, the scheduler only paces and measures it.
+        # The host's turn comes first, so no browser sits idle waiting for it.
+        host = urlparse(self.url).netloc
         try:
-            self.driver.get(self.url)
-            time.sleep(5)  # Wait for JavaScript to render
-            return self.driver.page_source
+            self.scheduler.acquire(host, self.crawl_delay())
+            with self.pool.acquire() as driver:
+                driver.set_page_load_timeout(sum(self.scheduler.timeout))
+                start = time.perf_counter()
+                try:
+                    driver.get(self.url)
+                except Exception:
+                    self.scheduler.record(host, time.perf_counter() - start, error=True)
+                    raise
+                self.scheduler.record(host, time.perf_counter() - start)
+                self.wait_for_selectors(driver)
+                return driver.page_source
         except Exception as e:
             self.logger.error(f"Error fetching {self.url}: {e}")
             return None
-        finally:
-            self.driver.quit()
\ No newline at end of file
@@ -0,0 +1,30 @@
+import hashlib
+import json
+from typing import Dict, Optional
+from urllib.parse import urlparse
+from file_handler import FileHandler
+
+class ValidatorStore:
+    """
+    Persists HTTP validators (ETag, Last-Modified) and a body hash per URL,
+    so the next run can send a conditional request and skip unchanged pages.
+    """
+    def __init__(self, file_handler: FileHandler, directory: str = "validators"):
+        self.file_handler = file_handler
+        self.directory = directory
+
+    def _path(self, url: str) -> str:
+        url_hash = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return f"{self.directory}/{urlparse(url).netloc}/{url_hash}.json"
+
+    def load(self, url: str) -> Optional[Dict[str, str]]:
+        try:
+            return json.loads(self.file_handler.read_file(self._path(url)))
+        except Exception:
+            return None
+
+    def save(self, url: str, validators: Dict[str, str]) -> None:
+        self.file_handler.write_file(self._path(url), json.dumps(validators))
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
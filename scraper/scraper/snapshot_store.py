@@ -0,0 +1,160 @@
+import gzip
+import hashlib
+import json
+from typing import Dict, List, Optional, Tuple
+from file_handler import FileHandler
+from config import get_env_var
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FORMAT = "cas-v1"
+PACK_EXTENSIONS = {'none': '.pack.json', 'gzip': '.pack.gz', 'zstd': '.pack.zst'}
+# Per domain, the pack holding every element stored so far: {hash: pack}
+OBJECT_INDEX = "objects/index.json"
+
+def element_hash(element: dict) -> str:
+    canonical = json.dumps(element, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]
+
+def compress(content: bytes, compression: str) -> bytes:
+    if compression == 'gzip':
+        return gzip.compress(content)
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor().compress(content)
+    return content
+
+def decompress(content: bytes, pack_name: str) -> bytes:
+    if pack_name.endswith(PACK_EXTENSIONS['gzip']):
+        return gzip.decompress(content)
+    if pack_name.endswith(PACK_EXTENSIONS['zstd']):
+        return zstandard.ZstdDecompressor().decompress(content)
+    return content
+
+def is_manifest(data: dict) -> bool:
+    return isinstance(data, dict) and data.get('format') == FORMAT
+
+class SnapshotStore:
+    """
+    Content-addressed snapshot storage. Each element is stored once, by hash,
+    in a pack written alongside the snapshot that first contained it; the
+    snapshot file itself becomes a manifest of element hashes:
+
+        data/<domain>/<timestamp>.json              {"format": "cas-v1", "elements": {key: [hash, ...]},
+                                                     "objects": {pack: [hash, ...]}}
+        data/<domain>/objects/<timestamp>.pack.gz   {hash: {"html": ..., "text": ...}}
+        data/<domain>/objects/index.json            {hash: pack}
+
+    Elements already stored for the domain, by any earlier snapshot, point at
+    their existing pack, so an unchanged paragraph costs one hash in the
+    manifest and a paragraph that comes back is not stored again. The object
+    index is written after the manifest and only ever names packs that exist;
+    if it is missing, or a concurrent writer's update is lost, the previous
+    snapshot's objects are used and some elements are stored twice, never lost.
+    """
+    def __init__(self, file_handler: FileHandler, compression: str = 'gzip', content_addressed: bool = True):
+        if compression not in PACK_EXTENSIONS:
+            raise ValueError(f"Unknown snapshot compression: {compression}")
+        if compression == 'zstd' and zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package")
+        self.file_handler = file_handler
+        self.compression = compression
+        self.content_addressed = content_addressed
+
+    def load_manifest(self, domain_dir: str, snapshot: str) -> Optional[dict]:
+        try:
+            data = json.loads(self.file_handler.read_file(f"{domain_dir}/{snapshot}"))
+        except Exception:
+            return None
+        return data if is_manifest(data) else None
+
+    def load_object_index(self, domain_dir: str) -> Dict[str, str]:
+        try:
+            return json.loads(self.file_handler.read_file(f"{domain_dir}/{OBJECT_INDEX}"))
+        except Exception:
+            return {}
+
+    def build_manifest(self, data: dict, timestamp: str, known_locations: Dict[str, str]) -> Tuple[dict, Dict[str, dict]]:
+        """
+        Return the manifest for data and the elements that need a new pack.
+        known_locations maps the hash of every element already stored to its pack.
+        """
+        pack_name = f"objects/{timestamp}{PACK_EXTENSIONS[self.compression]}"
+        new_elements: Dict[str, dict] = {}
+        objects: Dict[str, List[str]] = {}
+        elements: Dict[str, List[str]] = {}
+        for key, items in data.items():
+            elements[key] = []
+            for element in items:
+                hash_value = element_hash(element)
+                elements[key].append(hash_value)
+                location = known_locations.get(hash_value)
+                if location is None:
+                    location = pack_name
+                    new_elements[hash_value] = element
+                if hash_value not in objects.setdefault(location, []):
+                    objects[location].append(hash_value)
+
+        return {'format': FORMAT, 'elements': elements, 'objects': objects}, new_elements
+
+    def write(self, domain_dir: str, timestamp: str, data: dict, previous_snapshot: Optional[str]) -> None:
+        if not self.content_addressed:
+            self.file_handler.write_file(f"{domain_dir}/{timestamp}.json", json.dumps(data, indent=2))
+            return
+
+        known_locations = self.load_object_index(domain_dir)
+        indexed = len(known_locations)
+        previous = self.load_manifest(domain_dir, previous_snapshot) if previous_snapshot else None
+        if previous:
+            # Covers snapshots written before the object index, or while its update was lost
+            for previous_pack, hashes in previous['objects'].items():
+                for hash_value in hashes:
+                    known_locations.setdefault(hash_value, previous_pack)
+
+        manifest, new_elements = self.build_manifest(data, timestamp, known_locations)
+        pack_name = f"objects/{timestamp}{PACK_EXTENSIONS[self.compression]}"
+        if new_elements:
+            pack = json.dumps(new_elements, separators=(',', ':')).encode('utf-8')
+            self.file_handler.write_bytes(f"{domain_dir}/{pack_name}", compress(pack, self.compression))
+        # The manifest goes after its pack, so a snapshot never references a missing pack
+        self.file_handler.write_file(f"{domain_dir}/{timestamp}.json", json.dumps(manifest))
+        known_locations.update((hash_value, pack_name) for hash_value in new_elements)
+        if len(known_locations) > indexed:
+            self.file_handler.write_file(f"{domain_dir}/{OBJECT_INDEX}",
+                                         json.dumps(known_locations, separators=(',', ':')))
+
+    def resolve(self, domain_dir: str, manifest: dict) -> dict:
+        """
+        Rebuild the full scraped dict from a manifest.
+
+        Every pack the manifest references is downloaded in full, even when it
+        only needs a few elements from it. A snapshot whose paragraphs date from
+        many earlier scrapes therefore costs one download per such scrape; packs
+        are small compressed JSON, so this is left as is rather than fetching
+        byte ranges of individual elements.
+        """
+        paths = [f"{domain_dir}/{pack_name}" for pack_name in manifest['objects']]
+        contents = self.file_handler.read_files(paths)
+        lookup = {}
+        for pack_name, path in zip(manifest['objects'], paths):
+            lookup.update(json.loads(decompress(contents[path], pack_name)))
+        return {key: [lookup[hash_value] for hash_value in hashes] for key, hashes in manifest['elements'].items()}
+
+    def read(self, domain_dir: str, snapshot: str) -> dict:
+        """
+        Read a snapshot in either the content-addressed or the plain JSON format.
+        """
+        data = json.loads(self.file_handler.read_file(f"{domain_dir}/{snapshot}"))
+        return self.resolve(domain_dir, data) if is_manifest(data) else data
+
+def get_snapshot_store(file_handler: FileHandler) -> SnapshotStore:
+    """
+    SNAPSHOT_FORMAT is "json" (one full dump per snapshot) or "cas"; reads handle both.
+    """
+    return SnapshotStore(
+        file_handler,
+        compression=get_env_var('SNAPSHOT_COMPRESSION', 'gzip'),
+        content_addressed=get_env_var('SNAPSHOT_FORMAT', 'json') == 'cas'
+    )
@@ -0,0 +1,145 @@
+"""
+A synthetic privacy policy corpus and a local HTTP server that serves it, so
+the pipeline can be benchmarked without touching real sites.
+
+generate_versions builds successive versions of one policy page. Between two
+versions a churn fraction of the paragraphs is edited, inserted or deleted,
+which is roughly how real policies change.
+"""
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+WORDS = (
+    "we collect use share personal information data services account device location cookies "
+    "third parties partners advertising security retention rights request access delete "
+    "consent law processing purposes legitimate interests transfer countries safeguards "
+    "contact policy update notice children email payment analytics improve provide"
+).split()
+
+SELECTORS = {'content': 'div.policy p', 'headings': 'div.policy h2'}
+
+def sentence(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randint(8, 20))
+    return " ".join(words).capitalize() + "."
+
+def paragraph(rng: random.Random) -> str:
+    return " ".join(sentence(rng) for _ in range(rng.randint(2, 5)))
+
+def churn(paragraphs: List[str], rate: float, rng: random.Random) -> List[str]:
+    paragraphs = list(paragraphs)
+    for _ in range(max(1, round(len(paragraphs) * rate))):
+        action = rng.choice(('edit', 'insert', 'delete'))
+        position = rng.randrange(len(paragraphs))
+        if action == 'edit':
+            words = paragraphs[position].split()
+            for _ in range(max(1, len(words) // 10)):
+                words[rng.randrange(len(words))] = rng.choice(WORDS)
+            paragraphs[position] = " ".join(words)
+        elif action == 'insert':
+            paragraphs.insert(position, paragraph(rng))
+        elif len(paragraphs) > 1:
+            del paragraphs[position]
+    return paragraphs
+
+def render(paragraphs: List[str], section_size: int = 10) -> str:
+    body = []
+    for start in range(0, len(paragraphs), section_size):
+        body.append(f"<h2>Section {start // section_size + 1}</h2>")
+        body.extend(f"<p class=\"clause\">{text}</p>" for text in paragraphs[start:start + section_size])
+    return (
+        "<html><head><title>Privacy Policy</title></head><body>"
+        "<nav><a href=\"/\">Home</a></nav>"
+        f"<div class=\"policy\">{''.join(body)}</div>"
+        "<footer>Example Inc.</footer></body></html>"
+    )
+
+def generate_versions(paragraphs: int = 200, churn_rate: float = 0.05, versions: int = 5, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    current = [paragraph(rng) for _ in range(paragraphs)]
+    pages = [render(current)]
+    for _ in range(versions - 1):
+        current = churn(current, churn_rate, rng)
+        pages.append(render(current))
+    return pages
+
+class PolicyServer:
+    """
+    Serves pages[version] at /policy and an allow-all /robots.txt on 127.0.0.1.
+    Set version to switch the page the next request sees.
+
+    For exercising the fetch path, /policy can misbehave: each request is
+    delayed by `delay` seconds, and a fraction `error_rate` of them answer
+    `error_status` instead, with a Retry-After header when `retry_after` is set.
+    `crawl_delay` adds a Crawl-delay line to robots.txt. Requests are counted in
+    `hits`.
+    """
+    def __init__(self, pages: List[str], port: int = 0, delay: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, retry_after: int = None, crawl_delay: float = None, seed: int = 0):
+        self.pages = pages
+        self.version = 0
+        self.delay = delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.crawl_delay = crawl_delay
+        self.hits = 0
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/robots.txt':
+                    robots = "User-agent: *\nAllow: /\n"
+                    if server.crawl_delay:
+                        robots += f"Crawl-delay: {server.crawl_delay}\n"
+                    self.respond(200, robots, 'text/plain')
+                elif self.path == '/policy':
+                    with server.lock:
+                        server.hits += 1
+                        failing = server.rng.random() < server.error_rate
+                    if server.delay:
+                        time.sleep(server.delay)
+                    if failing:
+                        headers = {'Retry-After': str(server.retry_after)} if server.retry_after is not None else {}
+                        self.respond(server.error_status, "Unavailable", 'text/plain', headers)
+                    else:
+                        self.respond(200, server.pages[server.version], 'text/html; charset=utf-8')
+                else:
+                    self.respond(404, "Not found", 'text/plain')
+
+            def respond(self, status, body, content_type, headers=None):
+                content = body.encode('utf-8')
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                try:
+                    self.wfile.write(content)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up waiting, as it should when the server is slow
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="policy-server", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/policy"
+
+    def start(self) -> 'PolicyServer':
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -4,4 +4,5 @@ class WebsiteConfig:
     def __init__(self, config_data: Dict):
         self.url = config_data['url']
         self.scraper_type = config_data['scraper_type']
-        self.selectors = config_data['selectors']
\ No newline at end of file
+        self.selectors = config_data['selectors']
+        self.parser = config_data.get('parser', 'html.parser')
\ No newline at end of file
@@ -1,34 +1,31 @@
-from bs4 import BeautifulSoup
 from website_config import WebsiteConfig
 from scraper_factory import ScraperFactory
 from file_handler import FileHandler
 from scrapers.base_scraper import BaseScraper
+from parsing import get_parser_backend
+from logger import timed
 
 class WebsiteScraper(BaseScraper):
     def __init__(self, config: WebsiteConfig, file_handler: FileHandler):
         super().__init__(config.url, file_handler)
         self.config = config
-        self.scraper = ScraperFactory.get_scraper(config.url, config.scraper_type, file_handler)
+        self.scraper = ScraperFactory.get_scraper(config.url, config.scraper_type, file_handler, config.selectors)
+        self.parser_backend = get_parser_backend(config.parser, config.selectors)
 
     def scrape(self) -> str:
         return self.scraper.scrape()
 
     def parse_data(self, content: str) -> dict:
-        soup = BeautifulSoup(content, 'html.parser')
-        data = {}
-        for key, selector in self.config.selectors.items():
-            elements = soup.select(selector)
-            data[key] = [
-                {
-                    'html': str(element),
-                    'text': element.get_text(strip=True)
-                }
-                for element in elements
-            ]
-        return data
+        return self.parser_backend.parse(content)
     
     def scrape_and_save(self) -> None:
-        content = self.scrape()
+        with timed('scrape', url=self.url) as timing:
+            content = self.scrape()
+            timing['changed'] = bool(content)
         if content:
-            parsed_data = self.parse_data(content)
-            self.save_data(parsed_data)
\ No newline at end of file
+            with timed('parse_data', url=self.url, size=len(content)):
+                parsed_data = self.parse_data(content)
+            # Keeps the snapshot ahead of the validators when writes are batched
+            with timed('save_data', url=self.url), self.file_handler.write_group():
+                self.save_data(parsed_data)
+                self.scraper.commit_fetch_state()
\ No newline at end of file
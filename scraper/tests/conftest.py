@@ -0,0 +1,20 @@
+import os
+import sys
+import pytest
+
+# The scraper's modules import each other by bare name, as when run from scraper/scraper
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scraper'))
+
+@pytest.fixture(autouse=True)
+def fresh_singletons(monkeypatch):
+    """
+    Each test gets its own robots registry, fused differs and a fast fetch
+    scheduler, rather than the process-wide ones a run would share.
+    """
+    import fetch_scheduler
+    import fused_diff
+    import robots_registry
+    monkeypatch.setattr(robots_registry, '_registry', None)
+    monkeypatch.setattr(fused_diff, '_differs', {})
+    monkeypatch.setattr(fetch_scheduler, '_scheduler', fetch_scheduler.FetchScheduler(
+        rate=1000, burst=10, backoff_base=0.01, connect_timeout=2, read_timeout=2))
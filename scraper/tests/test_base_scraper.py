@@ -0,0 +1,116 @@
+import json
+from datetime import datetime, timedelta
+import pytest
+from fake_gcs import FakeBucket
+from file_handler import FileHandler
+from logger import get_logger
+from scrapers import base_scraper
+from scrapers.base_scraper import BaseScraper
+from snapshot_store import SnapshotStore
+
+URL = "https://example.com/privacy"
+DATA_DIR = "data/example.com"
+MANIFEST = f"{DATA_DIR}/latest.manifest"
+
+class StaticScraper(BaseScraper):
+    def __init__(self, file_handler):
+        # Skips BaseScraper's robots.txt fetch
+        self.url = URL
+        self.file_handler = file_handler
+        self.logger = get_logger(__name__)
+        self.snapshot_store = SnapshotStore(file_handler, content_addressed=False)
+
+    def scrape(self):
+        return None
+
+@pytest.fixture
+def handler(monkeypatch):
+    handler = FileHandler(bucket=FakeBucket())
+    handler.listings = 0
+    list_files = handler.list_files
+
+    def counting_list_files(directory):
+        handler.listings += 1
+        return list_files(directory)
+
+    monkeypatch.setattr(handler, 'list_files', counting_list_files)
+    return handler
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    # One second per save, so every snapshot gets its own file name
+    times = iter(datetime(2024, 1, 1) + timedelta(seconds=n) for n in range(1000))
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return next(times)
+
+    monkeypatch.setattr(base_scraper, 'datetime', Clock)
+
+def data(text):
+    return {'content': [{'html': f"<p>{text}</p>", 'text': text}]}
+
+def snapshots(handler):
+    return sorted(name for name in FileHandler.list_files(handler, DATA_DIR) if name.endswith('.json'))
+
+def manifest(handler):
+    return json.loads(handler.read_file(MANIFEST))
+
+def test_manifest_hit_skips_the_listing(handler):
+    scraper = StaticScraper(handler)
+    scraper.save_data(data("a"))
+    handler.listings = 0
+    scraper.save_data(data("a"))
+    assert handler.listings == 0
+    assert snapshots(handler) == ['20240101_000000.json']
+
+def test_first_run_without_a_manifest_falls_back_and_records_one(handler):
+    handler.write_file(f"{DATA_DIR}/20231231_000000.json", json.dumps(data("a")))
+    scraper = StaticScraper(handler)
+    scraper.save_data(data("a"))
+    assert handler.listings == 1
+    assert snapshots(handler) == ['20231231_000000.json']
+    assert manifest(handler) == {'snapshot': '20231231_000000.json', 'hash': BaseScraper.hash_data(data("a"))}
+    handler.listings = 0
+    scraper.save_data(data("a"))
+    assert handler.listings == 0
+
+def test_manifest_is_rewritten_on_save(handler):
+    scraper = StaticScraper(handler)
+    scraper.save_data(data("a"))
+    scraper.save_data(data("b"))
+    assert snapshots(handler) == ['20240101_000000.json', '20240101_000001.json']
+    assert manifest(handler) == {'snapshot': '20240101_000001.json', 'hash': BaseScraper.hash_data(data("b"))}
+    assert scraper.load_previous_dump() == data("b")
+
+@pytest.mark.parametrize('content', [
+    'not json',
+    '[]',
+    '{"snapshot": "20240101_000000.json"}',
+    '{"snapshot": "../elsewhere.json", "hash": "x"}',
+    '{"snapshot": 5, "hash": "x"}',
+])
+def test_corrupt_manifest_falls_back_to_the_listing(handler, content):
+    handler.write_file(f"{DATA_DIR}/20231231_000000.json", json.dumps(data("a")))
+    handler.write_file(MANIFEST, content)
+    scraper = StaticScraper(handler)
+    scraper.save_data(data("a"))
+    assert handler.listings == 1
+    assert snapshots(handler) == ['20231231_000000.json']
+    assert manifest(handler)['snapshot'] == '20231231_000000.json'
+
+def test_manifest_naming_a_missing_snapshot_still_saves(handler, monkeypatch):
+    submitted = []
+
+    class Differ:
+        def submit(self, *args):
+            submitted.append(args)
+
+    monkeypatch.setattr(base_scraper, 'get_fused_differ', lambda file_handler: Differ())
+    handler.write_file(MANIFEST, json.dumps({'snapshot': '20231231_000000.json', 'hash': 'stale'}))
+    scraper = StaticScraper(handler)
+    scraper.save_data(data("a"))
+    assert snapshots(handler) == ['20240101_000000.json']
+    assert manifest(handler)['snapshot'] == '20240101_000000.json'
+    assert submitted == []
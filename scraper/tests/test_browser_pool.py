@@ -0,0 +1,98 @@
+import threading
+import time
+import pytest
+from selenium.common.exceptions import NoSuchElementException
+from scrapers.browser_pool import BrowserPool
+from scrapers.selenium_scraper import SeleniumScraper
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_called = False
+
+    def quit(self):
+        self.quit_called = True
+
+class FakePool(BrowserPool):
+    def __init__(self, *args, fail=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail = fail
+        self.drivers = []
+
+    def _create_driver(self):
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("chrome did not start")
+        driver = FakeDriver()
+        self.drivers.append(driver)
+        return driver
+
+def test_drivers_are_reused():
+    pool = FakePool(max_size=2)
+    with pool.acquire() as first:
+        pass
+    with pool.acquire() as second:
+        pass
+    assert first is second
+    assert len(pool.drivers) == 1
+
+def test_acquire_times_out_when_pool_is_exhausted():
+    pool = FakePool(max_size=1, acquire_timeout=0.1)
+    with pool.acquire():
+        with pytest.raises(TimeoutError):
+            with pool.acquire():
+                pass
+
+def test_waiter_is_woken_when_driver_is_discarded():
+    pool = FakePool(max_size=1, acquire_timeout=5)
+    taken = threading.Event()
+    result = []
+
+    def waiter():
+        taken.wait()
+        with pool.acquire() as driver:
+            result.append(driver)
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    with pytest.raises(ValueError):
+        with pool.acquire() as broken:
+            taken.set()
+            time.sleep(0.05)
+            raise ValueError("page crashed")
+    thread.join(timeout=2)
+    assert broken.quit_called
+    assert result and result[0] is not broken
+
+def test_waiter_is_woken_when_creation_fails():
+    pool = FakePool(max_size=1, acquire_timeout=5)
+    pool.fail = 1
+    with pytest.raises(RuntimeError):
+        with pool.acquire():
+            pass
+    # The failed start gave its slot back
+    with pool.acquire() as driver:
+        assert driver is pool.drivers[0]
+
+def test_close_quits_idle_drivers():
+    pool = FakePool(max_size=2)
+    with pool.acquire():
+        pass
+    pool.close()
+    assert pool.drivers[0].quit_called
+    with pool.acquire() as driver:
+        assert driver is pool.drivers[1]
+
+class MissingElementDriver:
+    def find_element(self, by, value):
+        raise NoSuchElementException(value)
+
+def test_wait_for_selectors_shares_one_deadline():
+    scraper = SeleniumScraper.__new__(SeleniumScraper)
+    scraper.url = "https://example.com"
+    scraper.selectors = {'a': 'p.a', 'b': 'p.b', 'c': 'p.c'}
+    scraper.wait_timeout = 0.3
+    scraper.logger = type('Logger', (), {'warning': lambda self, message: None})()
+    start = time.monotonic()
+    scraper.wait_for_selectors(MissingElementDriver())
+    # One poll interval of 0.5s at most, rather than one timeout per selector
+    assert time.monotonic() - start < 1.0
@@ -0,0 +1,99 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from fake_gcs import FakeBucket
+from file_handler import FileHandler
+from scrapers.requests_scraper import RequestsScraper
+from scrapers.validator_store import ValidatorStore, content_hash
+
+class ValidatingServer:
+    """
+    Serves `body` at /page with an ETag, answering 304 to a matching If-None-Match.
+    """
+    def __init__(self, body="<p>v1</p>", etag='"v1"', send_etag=True):
+        self.body = body
+        self.etag = etag
+        self.send_etag = send_etag
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/robots.txt':
+                    return self.respond(200, "User-agent: *\nAllow: /\n")
+                server.requests.append(dict(self.headers))
+                if server.send_etag and self.headers.get('If-None-Match') == server.etag:
+                    return self.respond(304, "")
+                headers = {'ETag': server.etag} if server.send_etag else {}
+                self.respond(200, server.body, headers)
+
+            def respond(self, status, body, headers=None):
+                content = body.encode('utf-8')
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        host, port = self.httpd.server_address[:2]
+        self.url = f"http://{host}:{port}/page"
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def server():
+    server = ValidatingServer()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def handler():
+    return FileHandler(bucket=FakeBucket())
+
+def test_first_fetch_sends_no_validators(server, handler):
+    scraper = RequestsScraper(server.url, handler)
+    assert scraper.scrape() == server.body
+    assert 'If-None-Match' not in server.requests[0]
+
+def test_validators_are_only_saved_on_commit(server, handler):
+    scraper = RequestsScraper(server.url, handler)
+    scraper.scrape()
+    # Not processed yet, so the next run must fetch the page again
+    assert RequestsScraper(server.url, handler).scrape() == server.body
+    scraper.commit_fetch_state()
+    assert ValidatorStore(handler).load(server.url) == {
+        'etag': server.etag, 'last_modified': None, 'content_hash': content_hash(server.body)}
+
+def test_not_modified_skips_the_page(server, handler):
+    scraper = RequestsScraper(server.url, handler)
+    scraper.scrape()
+    scraper.commit_fetch_state()
+    assert RequestsScraper(server.url, handler).scrape() is None
+    assert server.requests[-1]['If-None-Match'] == server.etag
+
+def test_changed_page_is_returned(server, handler):
+    scraper = RequestsScraper(server.url, handler)
+    scraper.scrape()
+    scraper.commit_fetch_state()
+    server.body, server.etag = "<p>v2</p>", '"v2"'
+    assert RequestsScraper(server.url, handler).scrape() == "<p>v2</p>"
+
+def test_identical_body_without_validators_is_skipped(handler):
+    server = ValidatingServer(send_etag=False)
+    try:
+        scraper = RequestsScraper(server.url, handler)
+        scraper.scrape()
+        scraper.commit_fetch_state()
+        assert RequestsScraper(server.url, handler).scrape() is None
+        server.body = "<p>v2</p>"
+        assert RequestsScraper(server.url, handler).scrape() == "<p>v2</p>"
+    finally:
+        server.stop()
@@ -0,0 +1,150 @@
+import time
+from contextlib import contextmanager
+import pytest
+import fetch_scheduler
+from fake_gcs import FakeBucket
+from fetch_scheduler import FetchScheduler, get_fetch_scheduler, reset_fetch_scheduler, retry_after
+from file_handler import FileHandler
+from robots_registry import RobotsEntry, parse_crawl_delay
+from scrapers.requests_scraper import RequestsScraper
+from scrapers.selenium_scraper import SeleniumScraper
+from synthetic_site import PolicyServer, generate_versions
+
+PAGES = generate_versions(paragraphs=5, versions=1)
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(**kwargs):
+        server = PolicyServer(PAGES, **kwargs).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+def use_scheduler(monkeypatch, **kwargs):
+    scheduler = FetchScheduler(**{'rate': 1000, 'burst': 10, 'backoff_base': 0.01, **kwargs})
+    monkeypatch.setattr(fetch_scheduler, '_scheduler', scheduler)
+    return scheduler
+
+def scraper_for(server):
+    return RequestsScraper(server.url, FileHandler(bucket=FakeBucket()))
+
+def test_errors_are_retried_until_the_page_loads(serve):
+    # With seed 7 the first two requests fail and the third succeeds
+    server = serve(error_rate=0.5, seed=7)
+    scraper = scraper_for(server)
+    assert scraper.scrape() == PAGES[0]
+    assert server.hits == 3
+    metrics = get_fetch_scheduler().metrics()[server.url.split('/')[2]]
+    assert metrics['retries'] == 2
+    assert metrics['statuses'] == {503: 2, 200: 1}
+
+def test_retry_after_is_honoured(serve, monkeypatch):
+    use_scheduler(monkeypatch, max_retries=1)
+    server = serve(error_rate=1.0, retry_after=1)
+    start = time.monotonic()
+    assert scraper_for(server).scrape() is None
+    assert server.hits == 2
+    assert time.monotonic() - start >= 1.0
+
+def test_long_retry_after_gives_up(serve, monkeypatch):
+    use_scheduler(monkeypatch, max_retry_after=10)
+    server = serve(error_rate=1.0, retry_after=300)
+    assert scraper_for(server).scrape() is None
+    assert server.hits == 1
+
+def test_fractional_crawl_delay_paces_requests(serve):
+    server = serve(crawl_delay=0.5)
+    assert scraper_for(server).crawl_delay() == 0.5
+    start = time.monotonic()
+    for _ in range(3):
+        # A fresh scraper each time, so no stored validator turns the fetch into a 304
+        assert scraper_for(server).scrape() == PAGES[0]
+    assert time.monotonic() - start >= 0.95
+
+def test_parse_crawl_delay():
+    body = """
+    User-agent: slowbot
+    Crawl-delay: 10
+
+    User-agent: otherbot
+    User-agent: *
+    Disallow: /private # comment
+    Crawl-delay: 0.25
+    """
+    assert parse_crawl_delay(body) == 0.25
+    assert parse_crawl_delay(body, 'SlowBot/2.0') == 10
+    assert parse_crawl_delay(body, 'otherbot') == 0.25
+    assert parse_crawl_delay("User-agent: *\nCrawl-delay: soon\n") is None
+    assert parse_crawl_delay("User-agent: *\nCrawl-delay: nan\n") is None
+    assert parse_crawl_delay("") is None
+
+def test_crawl_delay_needs_a_parsed_robots_txt():
+    assert RobotsEntry(200, "User-agent: *\nCrawl-delay: 1.5\n", 0, 0).crawl_delay() == 1.5
+    assert RobotsEntry(404, "User-agent: *\nCrawl-delay: 1.5\n", 0, 0).crawl_delay() is None
+
+def test_retry_after_header():
+    assert retry_after({'Retry-After': '3'}) == 3.0
+    assert retry_after({'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}, now=1445412470.0) == 10.0
+    assert retry_after({'Retry-After': 'soon'}) is None
+    assert retry_after({}) is None
+
+def test_throttling_halves_the_rate_and_recovers():
+    scheduler = FetchScheduler(rate=4, min_rate=0.5)
+    scheduler.record('a.com', 0.1, 503, error=True)
+    assert scheduler.host_state('a.com').rate == 2
+    scheduler.record('a.com', 0.1, 200)
+    assert scheduler.host_state('a.com').rate == 2.4
+
+def test_reset_starts_each_run_afresh(monkeypatch):
+    monkeypatch.setenv('FETCH_RATE', '3')
+    reset_fetch_scheduler()
+    scheduler = get_fetch_scheduler()
+    scheduler.record('a.com', 0.1, 429, error=True)
+    assert get_fetch_scheduler() is scheduler
+    reset_fetch_scheduler()
+    fresh = get_fetch_scheduler()
+    assert fresh is not scheduler
+    assert fresh.rate == 3
+    assert fresh.metrics() == {}
+
+def test_selenium_waits_for_the_host_before_taking_a_browser():
+    events = []
+
+    class Scheduler:
+        timeout = (1, 1)
+
+        def acquire(self, host, crawl_delay=None):
+            events.append('token')
+
+        def record(self, host, seconds, status=None, error=False):
+            pass
+
+    class Driver:
+        page_source = "<p>page</p>"
+
+        def set_page_load_timeout(self, seconds):
+            pass
+
+        def get(self, url):
+            events.append('get')
+
+    class Pool:
+        @contextmanager
+        def acquire(self):
+            events.append('browser')
+            yield Driver()
+
+    scraper = SeleniumScraper.__new__(SeleniumScraper)
+    scraper.url = "https://example.com/policy"
+    scraper.robots = RobotsEntry(200, "User-agent: *\nAllow: /\n", 0, 0)
+    scraper.robot_parser = scraper.robots.parser
+    scraper.scheduler = Scheduler()
+    scraper.pool = Pool()
+    scraper.wait_for_selectors = lambda driver: None
+    assert scraper.scrape() == "<p>page</p>"
+    assert events == ['token', 'browser', 'get']
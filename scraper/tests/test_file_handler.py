@@ -0,0 +1,127 @@
+import gzip
+import threading
+import pytest
+from google.api_core.exceptions import NotFound
+import config_loader
+from fake_gcs import FakeBucket
+from file_handler import FileHandler
+
+class FlakyBucket(FakeBucket):
+    """
+    Fails the first upload of every name in fail_once.
+    """
+    def __init__(self, fail_once=()):
+        super().__init__()
+        self.fail_once = set(fail_once)
+        self.order = []
+
+    def put(self, name, content, content_encoding=None):
+        if name in self.fail_once:
+            self.fail_once.discard(name)
+            raise ConnectionError(f"upload of {name} failed")
+        self.order.append(name)
+        super().put(name, content, content_encoding)
+
+def test_immediate_writes_and_reads():
+    bucket = FakeBucket()
+    handler = FileHandler(bucket=bucket)
+    handler.write_file("data/a.com/x.json", "{}")
+    handler.write_bytes("data/a.com/objects/p.pack", b"\x00\x01")
+    assert bucket.objects["data/a.com/x.json"][0] == b"{}"
+    assert handler.read_bytes("data/a.com/objects/p.pack") == b"\x00\x01"
+
+def test_listing_is_cached_and_updated_by_writes():
+    bucket = FakeBucket()
+    bucket.put("configs/a.yaml", b"")
+    bucket.put("configs/nested/b.yaml", b"")
+    handler = FileHandler(bucket=bucket)
+    assert handler.list_files("configs") == ["a.yaml"]
+    requests = bucket.requests
+    handler.write_file("configs/c.yaml", "")
+    assert handler.list_files("configs/") == ["a.yaml", "c.yaml"]
+    assert bucket.requests == requests + 1
+
+def test_batched_writes_are_visible_before_flush():
+    bucket = FakeBucket()
+    handler = FileHandler(bucket=bucket, batch_writes=True)
+    handler.write_file("data/a.com/x.json", "v1")
+    assert bucket.objects == {}
+    assert handler.read_file("data/a.com/x.json") == "v1"
+    assert handler.list_files("data/a.com") == ["x.json"]
+    handler.write_file("data/a.com/x.json", "v2")
+    assert handler.flush() == 1
+    assert bucket.objects["data/a.com/x.json"][0] == b"v2"
+    assert handler.flush() == 0
+
+def test_write_group_uploads_in_order():
+    bucket = FlakyBucket()
+    handler = FileHandler(bucket=bucket, batch_writes=True, max_workers=4)
+
+    def scrape(domain):
+        with handler.write_group():
+            for name in ("objects/p.pack", "1.json", "latest.manifest"):
+                handler.write_file(f"data/{domain}/{name}", name)
+
+    threads = [threading.Thread(target=scrape, args=(f"{n}.com",)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert handler.flush() == 12
+    for n in range(4):
+        uploaded = [name for name in bucket.order if name.startswith(f"data/{n}.com/")]
+        assert uploaded == [f"data/{n}.com/objects/p.pack", f"data/{n}.com/1.json", f"data/{n}.com/latest.manifest"]
+
+def test_failed_flush_keeps_the_rest_of_the_group_for_a_retry():
+    bucket = FlakyBucket(fail_once={"data/a.com/1.json"})
+    handler = FileHandler(bucket=bucket, batch_writes=True)
+    with handler.write_group():
+        for name in ("objects/p.pack", "1.json", "latest.manifest"):
+            handler.write_file(f"data/a.com/{name}", name)
+    with pytest.raises(ConnectionError):
+        handler.flush()
+    # Nothing written after the failed file went up without it
+    assert bucket.order == ["data/a.com/objects/p.pack"]
+    assert handler.read_file("data/a.com/latest.manifest") == "latest.manifest"
+    assert handler.flush() == 2
+    assert bucket.order[1:] == ["data/a.com/1.json", "data/a.com/latest.manifest"]
+
+def test_large_text_is_stored_gzip_encoded():
+    bucket = FakeBucket()
+    handler = FileHandler(bucket=bucket, compress_min_size=100)
+    text = "clause " * 100
+    handler.write_file("data/a.com/x.json", text)
+    content, encoding = bucket.objects["data/a.com/x.json"]
+    assert encoding == 'gzip'
+    assert gzip.decompress(content).decode('utf-8') == text
+    assert handler.read_file("data/a.com/x.json") == text
+    handler.write_file("data/a.com/small.json", "{}")
+    assert bucket.objects["data/a.com/small.json"] == (b"{}", None)
+
+def test_read_files_raises_and_logs_failures(caplog):
+    bucket = FakeBucket()
+    bucket.put("configs/a.yaml", b"url: https://a.com")
+    handler = FileHandler(bucket=bucket)
+    assert handler.read_files(["configs/a.yaml"]) == {"configs/a.yaml": b"url: https://a.com"}
+    with pytest.raises(NotFound):
+        handler.read_files(["configs/a.yaml", "configs/missing.yaml", "configs/gone.yaml"])
+    assert "configs/missing.yaml" in caplog.text and "configs/gone.yaml" in caplog.text
+
+def test_config_loader_surfaces_read_errors(monkeypatch):
+    bucket = FakeBucket()
+    bucket.put("configs/a.yaml", b"url: https://a.com\nscraper_type: requests\nselectors:\n  content: p\n")
+    bucket.put("configs/b.yaml", b"url: https://b.com\nscraper_type: requests\nselectors:\n  content: p\n")
+    handler = FileHandler(bucket=bucket)
+    assert [config.url for config in config_loader.load_all_configs("configs", handler)] == ["https://a.com", "https://b.com"]
+    bucket.objects.pop("configs/b.yaml")
+    with pytest.raises(NotFound):
+        config_loader.load_all_configs("configs", handler)
+
+def test_local_mode(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    handler = FileHandler()
+    handler.write_file("data/a.com/x.json", "{}")
+    assert handler.list_files("data/a.com") == ["x.json"]
+    assert handler.read_files(["data/a.com/x.json"]) == {"data/a.com/x.json": b"{}"}
+    with pytest.raises(FileNotFoundError):
+        handler.read_files(["data/a.com/missing.json"])
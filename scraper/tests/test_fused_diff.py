@@ -0,0 +1,81 @@
+import json
+import os
+import time
+import pytest
+import fused_diff
+from fake_gcs import FakeBucket
+from file_handler import FileHandler
+from fused_diff import FusedDiffer
+
+DIFFER_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'differ', 'differ'))
+
+def snapshot(*texts):
+    return {'content': [{'html': f"<p>{text}</p>", 'text': text} for text in texts]}
+
+@pytest.fixture
+def posts(monkeypatch):
+    calls = []
+    monkeypatch.setattr(fused_diff.requests, 'post', lambda url, headers=None, timeout=None: calls.append((url, headers)))
+    return calls
+
+@pytest.fixture
+def bucket():
+    return FakeBucket()
+
+def make_differ(bucket, notify_delay):
+    handler = FileHandler(bucket=bucket, batch_writes=True)
+    return FusedDiffer(handler, DIFFER_PATH, notify_url="http://backend/api/refresh", notify_token="secret",
+                       notify_delay=notify_delay)
+
+def test_diffs_are_uploaded_before_the_backend_is_notified(bucket, posts, monkeypatch):
+    differ = make_differ(bucket, notify_delay=0.01)
+    seen_at_notify = []
+    monkeypatch.setattr(fused_diff.requests, 'post',
+                        lambda url, headers=None, timeout=None: seen_at_notify.append(sorted(bucket.objects)))
+    differ.submit("a.com", "20240101_000000.json", "20240102_000000.json", snapshot("a"), snapshot("a", "b")).result()
+    deadline = time.monotonic() + 2
+    while not seen_at_notify and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert seen_at_notify == [["diffs/a.com/diff_20240101_000000_20240102_000000.json"]]
+    differ.close()
+
+def test_one_notification_per_batch(bucket, posts):
+    differ = make_differ(bucket, notify_delay=60)
+    for day in range(1, 5):
+        differ.submit("a.com", f"202401{day:02d}_000000.json", f"202401{day + 1:02d}_000000.json",
+                      snapshot("a"), snapshot("a", str(day)))
+    assert differ.close() == 4
+    assert posts == [("http://backend/api/refresh", {'X-Refresh-Token': 'secret'})]
+    written = json.loads(bucket.objects["diffs/a.com/diff_20240101_000000_20240102_000000.json"][0])
+    assert written['from_version'] == "20240101_000000.json"
+
+def test_no_notification_without_diffs(bucket, posts):
+    differ = make_differ(bucket, notify_delay=60)
+    assert differ.close() == 0
+    assert posts == []
+
+def test_failed_diff_is_logged_not_raised(bucket, posts):
+    differ = make_differ(bucket, notify_delay=60)
+    differ.generate_diff = lambda data1, data2: 1 / 0
+    assert differ.submit("a.com", "x.json", "y.json", snapshot("a"), snapshot("b")).result() is None
+    assert differ.close() == 0
+    assert posts == []
+
+def test_each_file_handler_gets_its_own_differ(monkeypatch, posts):
+    monkeypatch.setenv('FUSED_DIFF', 'true')
+    monkeypatch.setenv('DIFFER_PATH', DIFFER_PATH)
+    first_bucket, second_bucket = FakeBucket(), FakeBucket()
+    first, second = FileHandler(bucket=first_bucket), FileHandler(bucket=second_bucket)
+    differ = fused_diff.get_fused_differ(first)
+    assert fused_diff.get_fused_differ(first) is differ
+    other = fused_diff.get_fused_differ(second)
+    assert other is not differ and other.file_handler is second
+
+    other.submit("a.com", "20240101_000000.json", "20240102_000000.json", snapshot("a"), snapshot("b"))
+    assert fused_diff.close_fused_differ(second) == 1
+    assert sorted(second_bucket.objects) == ["diffs/a.com/diff_20240101_000000_20240102_000000.json"]
+    assert first_bucket.objects == {}
+    # The first run's differ is untouched until its own close
+    assert fused_diff.get_fused_differ(first) is differ
+    assert fused_diff.close_fused_differ() == 0
+    assert fused_diff._differs == {}
@@ -0,0 +1,54 @@
+import json
+import logging
+import pytest
+import logger
+from logger import add_timing_listener, record_timing, timed
+
+class Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(record.getMessage())
+
+@pytest.fixture
+def timing(monkeypatch):
+    monkeypatch.setattr(logger, 'timing_listeners', [])
+    monkeypatch.setattr(logger, 'TIMING_LOGS', False)
+    handler = Collect()
+    timing_logger = logger.get_timing_logger()
+    timing_logger.addHandler(handler)
+    yield handler
+    timing_logger.removeHandler(handler)
+
+def test_nothing_is_measured_when_off(timing, monkeypatch):
+    clock_reads = []
+    monkeypatch.setattr(logger.time, 'perf_counter', lambda: clock_reads.append(1) or 0.0)
+    with timed('stage', key='value') as fields:
+        fields['extra'] = 1
+    record_timing('stage', 1.0)
+    assert clock_reads == []
+    assert timing.lines == []
+
+def test_one_json_event_per_stage(timing, monkeypatch):
+    monkeypatch.setattr(logger, 'TIMING_LOGS', True)
+    with timed('load', path='a.json') as fields:
+        fields['count'] = 2
+    with timed('save'):
+        pass
+    events = [json.loads(line) for line in timing.lines]
+    assert [event['stage'] for event in events] == ['load', 'save']
+    assert events[0]['path'] == 'a.json' and events[0]['count'] == 2
+    assert all(event['seconds'] >= 0 for event in events)
+
+def test_listeners_get_events_without_logging(timing):
+    events = []
+    add_timing_listener(events.append)
+    with pytest.raises(RuntimeError):
+        with timed('fails'):
+            raise RuntimeError("boom")
+    record_timing('direct', 0.1234567, status=200)
+    assert [event['stage'] for event in events] == ['fails', 'direct']
+    assert events[1] == {'stage': 'direct', 'seconds': 0.123457, 'status': 200}
+    assert timing.lines == []
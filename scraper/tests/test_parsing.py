@@ -0,0 +1,71 @@
+import pytest
+from parsing import PartialParserBackend, available_backends, get_parser_backend, leading_compound
+
+PAGE = """
+<html><body>
+<nav class="menu"><a href="/">Home</a></nav>
+<div id="policy" class="policy legal">
+  <h2>Data we collect</h2>
+  <p>We collect your <b>email</b> address.</p>
+  <p class="note">Cookies &amp; similar technologies.</p>
+  <ul><li>Analytics</li><li>Advertising</li></ul>
+</div>
+<div class="footer"><p>Contact us</p></div>
+</body></html>
+"""
+
+SELECTORS = {
+    'headings': 'div.policy h2',
+    'paragraphs': '#policy p',
+    'items': 'div > ul li',
+}
+
+@pytest.mark.parametrize('name', available_backends())
+def test_well_formed_markup_parses_the_same_everywhere(name):
+    expected = get_parser_backend('html.parser', SELECTORS).parse(PAGE)
+    assert get_parser_backend(name, SELECTORS).parse(PAGE) == expected
+    assert expected['paragraphs'][0] == {'html': '<p>We collect your <b>email</b> address.</p>',
+                                         'text': 'We collect youremailaddress.'}
+
+@pytest.mark.parametrize('full, partial', [('html.parser', 'partial'), ('lxml', 'lxml-partial')])
+def test_partial_matches_its_own_parser_on_malformed_markup(full, partial):
+    page = '<div class="policy"><p>one<p>two <b>bold</div><p>tail'
+    selectors = {'paragraphs': 'div.policy p'}
+    assert get_parser_backend(partial, selectors).parse(page) == get_parser_backend(full, selectors).parse(page)
+
+def test_parsers_repair_unclosed_paragraphs_differently():
+    # Why switching a site between html.parser and lxml needs a re-baseline
+    pytest.importorskip('lxml')
+    page = '<div class="policy"><p>one<p>two</div>'
+    selectors = {'paragraphs': 'div.policy p'}
+    builtin = get_parser_backend('html.parser', selectors).parse(page)['paragraphs']
+    lxml = get_parser_backend('lxml', selectors).parse(page)['paragraphs']
+    assert [element['text'] for element in builtin] == ['onetwo', 'two']
+    assert [element['text'] for element in lxml] == ['one', 'two']
+
+@pytest.mark.parametrize('selector', ['h2 + p', 'h2 ~ p', 'p:first-of-type', 'p:not(.note)',
+                                      'div[id=policy] p', 'h2, li'])
+def test_selectors_that_escape_the_subtree_parse_everything(selector):
+    assert leading_compound(selector) is None
+    for name in ('partial', 'lxml-partial'):
+        backend = get_parser_backend(name, {'key': selector})
+        assert backend.strainer is None
+        full = get_parser_backend('lxml' if name == 'lxml-partial' else 'html.parser', {'key': selector})
+        assert backend.parse(PAGE) == full.parse(PAGE)
+        assert backend.parse(PAGE)['key']
+
+def test_leading_compound():
+    assert leading_compound('div.policy.legal > p') == {'tag': 'div', 'classes': ['policy', 'legal'], 'id': None}
+    assert leading_compound('#policy p') == {'tag': None, 'classes': [], 'id': 'policy'}
+    assert leading_compound('') is None
+
+def test_strainer_restricts_the_parse():
+    backend = PartialParserBackend({'key': 'div.policy p'})
+    soup = backend.build_soup(PAGE)
+    assert soup.find('nav') is None
+    assert soup.find('div', class_='footer') is None
+    assert [p.get_text() for p in soup.find_all('p')] == ['We collect your email address.', 'Cookies & similar technologies.']
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_parser_backend('html5', SELECTORS)
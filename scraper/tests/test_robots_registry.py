@@ -0,0 +1,114 @@
+import threading
+import time
+import pytest
+import requests
+import robots_registry
+from fake_gcs import FakeBucket
+from file_handler import FileHandler
+from robots_registry import FAILURE_TTL, MIN_TTL, RobotsEntry, RobotsRegistry, cache_ttl
+
+class FakeResponse:
+    def __init__(self, status_code=200, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+@pytest.fixture
+def fetches(monkeypatch):
+    calls = []
+    responses = []
+
+    def get(url, timeout=None):
+        calls.append(url)
+        response = responses.pop(0) if len(responses) > 1 else responses[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(robots_registry.requests, 'get', get)
+    return calls, responses
+
+def test_robots_is_fetched_once_per_host(fetches):
+    calls, responses = fetches
+    responses.append(FakeResponse(200, "User-agent: *\nDisallow: /private\n"))
+    registry = RobotsRegistry(FileHandler(bucket=FakeBucket()))
+    parser = registry.get_parser("https://example.com/a")
+    assert registry.get_parser("https://example.com/b") is parser
+    assert calls == ["https://example.com/robots.txt"]
+    assert not parser.can_fetch("*", "https://example.com/private/x")
+    assert parser.can_fetch("*", "https://example.com/public")
+
+def test_concurrent_scrapers_share_one_fetch(fetches):
+    calls, responses = fetches
+    responses.append(FakeResponse(200, "User-agent: *\nAllow: /\n"))
+    registry = RobotsRegistry(FileHandler(bucket=FakeBucket()))
+    threads = [threading.Thread(target=registry.get_parser, args=("https://example.com/",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+
+def test_persisted_entry_is_reused_across_runs(fetches):
+    calls, responses = fetches
+    responses.append(FakeResponse(200, "User-agent: *\nDisallow: /\n"))
+    bucket = FakeBucket()
+    RobotsRegistry(FileHandler(bucket=bucket)).get_parser("https://example.com/")
+    parser = RobotsRegistry(FileHandler(bucket=bucket)).get_parser("https://example.com/")
+    assert len(calls) == 1
+    assert not parser.can_fetch("*", "https://example.com/page")
+
+def test_expired_entry_is_refetched(fetches):
+    calls, responses = fetches
+    responses.append(FakeResponse(200, "User-agent: *\nAllow: /\n"))
+    registry = RobotsRegistry(FileHandler(bucket=FakeBucket()), default_ttl=0)
+    registry.get_parser("https://example.com/")
+    registry.get_parser("https://example.com/")
+    assert len(calls) == 2
+
+def test_status_handling(fetches):
+    calls, responses = fetches
+    registry = RobotsRegistry(FileHandler(bucket=FakeBucket()))
+    responses[:] = [FakeResponse(404)]
+    assert registry.get_parser("https://missing.com/").can_fetch("*", "https://missing.com/x")
+    responses[:] = [FakeResponse(403)]
+    assert not registry.get_parser("https://forbidden.com/").can_fetch("*", "https://forbidden.com/x")
+    responses[:] = [FakeResponse(503)]
+    entry = registry.get_entry("https://down.com/")
+    assert not entry.parser.can_fetch("*", "https://down.com/x")
+    assert entry.expires_at - entry.fetched_at == FAILURE_TTL
+
+def test_network_error_keeps_stale_rules(fetches):
+    calls, responses = fetches
+    bucket = FakeBucket()
+    stale = RobotsEntry(200, "User-agent: *\nDisallow: /private\n", time.time() - 100, time.time() - 1)
+    FileHandler(bucket=bucket).write_file("robots/example.com.json", robots_registry.json.dumps(stale.to_dict()))
+    responses.append(requests.ConnectionError("unreachable"))
+    entry = RobotsRegistry(FileHandler(bucket=bucket)).get_entry("https://example.com/")
+    assert entry.body == stale.body
+    assert entry.is_fresh(time.time())
+    assert not entry.parser.can_fetch("*", "https://example.com/private")
+
+def test_unreachable_host_without_history_is_disallowed(fetches):
+    calls, responses = fetches
+    responses.append(requests.ConnectionError("unreachable"))
+    handler = FileHandler(bucket=FakeBucket())
+    entry = RobotsRegistry(handler).get_entry("https://example.com/")
+    assert not entry.parser.can_fetch("*", "https://example.com/")
+    # Failures are not persisted, the next run tries again
+    assert handler.list_files("robots/") == []
+
+def test_cache_ttl():
+    assert cache_ttl({'Cache-Control': 'max-age=7200'}, 100) == 7200
+    assert cache_ttl({'Cache-Control': 'max-age=1'}, 100) == MIN_TTL
+    assert cache_ttl({'Cache-Control': 'no-cache'}, 100) == MIN_TTL
+    assert cache_ttl({'Expires': 'not a date'}, 100) == 100
+    assert cache_ttl({}, 100) == 100
+
+def test_registry_follows_the_file_handler():
+    first, second = FileHandler(bucket=FakeBucket()), FileHandler(bucket=FakeBucket())
+    registry = robots_registry.get_robots_registry(first)
+    assert robots_registry.get_robots_registry(first) is registry
+    other = robots_registry.get_robots_registry(second)
+    assert other is not registry
+    assert other.file_handler is second
@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import defaultdict
+import scrape_runner
+from scrape_runner import ScrapeRunner
+from website_config import WebsiteConfig
+
+def config(url):
+    return WebsiteConfig({'url': url, 'scraper_type': 'requests', 'selectors': {'content': 'p'}})
+
+class FakeScraper:
+    running = defaultdict(int)
+    peak = defaultdict(int)
+    started = {}
+    lock = threading.Lock()
+    delay = 0.05
+
+    def __init__(self, website_config, file_handler):
+        self.url = website_config.url
+
+    def scrape_and_save(self):
+        domain = self.url.split('/')[2]
+        with FakeScraper.lock:
+            FakeScraper.started.setdefault(self.url, time.monotonic())
+            FakeScraper.running[domain] += 1
+            FakeScraper.peak[domain] = max(FakeScraper.peak[domain], FakeScraper.running[domain])
+        time.sleep(FakeScraper.delay)
+        with FakeScraper.lock:
+            FakeScraper.running[domain] -= 1
+        if 'fail' in self.url:
+            raise RuntimeError("boom")
+
+def reset_fake(monkeypatch):
+    FakeScraper.running.clear()
+    FakeScraper.peak.clear()
+    FakeScraper.started.clear()
+    monkeypatch.setattr(scrape_runner, 'WebsiteScraper', FakeScraper)
+
+def test_per_domain_limit_is_respected(monkeypatch):
+    reset_fake(monkeypatch)
+    configs = [config(f"https://a.com/{i}") for i in range(6)] + [config(f"https://b.com/{i}") for i in range(3)]
+    runner = ScrapeRunner(file_handler=None, max_workers=8, per_domain_limit=2)
+    assert runner.run(configs) == 9
+    assert FakeScraper.peak['a.com'] == 2
+    assert FakeScraper.peak['b.com'] == 2
+
+def test_busy_domain_does_not_hold_workers(monkeypatch):
+    reset_fake(monkeypatch)
+    configs = [config(f"https://slow.com/{i}") for i in range(4)] + [config("https://other.com/x")]
+    start = time.monotonic()
+    ScrapeRunner(file_handler=None, max_workers=2, per_domain_limit=1).run(configs)
+    # other.com starts straight away instead of waiting behind slow.com's queue
+    assert FakeScraper.started["https://other.com/x"] - start < FakeScraper.delay
+
+def test_failures_are_counted_not_raised(monkeypatch):
+    reset_fake(monkeypatch)
+    configs = [config("https://a.com/ok"), config("https://a.com/fail"), config("https://b.com/ok")]
+    assert ScrapeRunner(file_handler=None, max_workers=4).run(configs) == 2
+
+def test_domain_lanes_interleave_domains():
+    runner = ScrapeRunner(file_handler=None, per_domain_limit=2)
+    configs = [config(f"https://a.com/{i}") for i in range(4)] + [config("https://b.com/0")]
+    lanes = runner.domain_lanes(configs)
+    assert [[c.url for c in lane] for lane in lanes] == [
+        ["https://a.com/0", "https://a.com/2"],
+        ["https://b.com/0"],
+        ["https://a.com/1", "https://a.com/3"],
+    ]
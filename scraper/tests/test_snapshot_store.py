@@ -0,0 +1,74 @@
+import gzip
+import json
+import pytest
+import migrate_snapshots
+from fake_gcs import FakeBucket
+from file_handler import FileHandler
+from snapshot_store import OBJECT_INDEX, SnapshotStore, element_hash, is_manifest
+
+DOMAIN_DIR = "data/example.com"
+
+def element(text):
+    return {'html': f"<p>{text}</p>", 'text': text}
+
+def snapshot(*texts):
+    return {'content': [element(text) for text in texts], 'headings': [element("Privacy")]}
+
+@pytest.fixture
+def handler():
+    return FileHandler(bucket=FakeBucket())
+
+def pack_elements(handler, name):
+    return json.loads(gzip.decompress(handler.read_bytes(f"{DOMAIN_DIR}/{name}")))
+
+def test_round_trip(handler):
+    store = SnapshotStore(handler)
+    data = snapshot("a", "b", "a")
+    store.write(DOMAIN_DIR, "20240101_000000", data, None)
+    assert is_manifest(json.loads(handler.read_file(f"{DOMAIN_DIR}/20240101_000000.json")))
+    assert store.read(DOMAIN_DIR, "20240101_000000.json") == data
+
+def test_unchanged_elements_are_not_stored_again(handler):
+    store = SnapshotStore(handler)
+    store.write(DOMAIN_DIR, "20240101_000000", snapshot("a", "b"), None)
+    store.write(DOMAIN_DIR, "20240102_000000", snapshot("a", "b", "c"), "20240101_000000.json")
+    assert list(pack_elements(handler, "objects/20240102_000000.pack.gz")) == [element_hash(element("c"))]
+    assert store.read(DOMAIN_DIR, "20240102_000000.json") == snapshot("a", "b", "c")
+
+def test_elements_dedupe_across_the_whole_store(handler):
+    store = SnapshotStore(handler)
+    store.write(DOMAIN_DIR, "20240101_000000", snapshot("a", "b"), None)
+    store.write(DOMAIN_DIR, "20240102_000000", snapshot("a"), "20240101_000000.json")
+    # "b" comes back, it is still in the first pack
+    store.write(DOMAIN_DIR, "20240103_000000", snapshot("a", "b"), "20240102_000000.json")
+    assert "objects/20240103_000000.pack.gz" not in handler.list_files(f"{DOMAIN_DIR}/objects")
+    manifest = json.loads(handler.read_file(f"{DOMAIN_DIR}/20240103_000000.json"))
+    assert list(manifest['objects']) == ["objects/20240101_000000.pack.gz"]
+    assert store.read(DOMAIN_DIR, "20240103_000000.json") == snapshot("a", "b")
+
+def test_missing_object_index_falls_back_to_previous_snapshot(handler):
+    store = SnapshotStore(handler)
+    store.write(DOMAIN_DIR, "20240101_000000", snapshot("a"), None)
+    handler.bucket.objects.pop(f"{DOMAIN_DIR}/{OBJECT_INDEX}")
+    store.write(DOMAIN_DIR, "20240102_000000", snapshot("a", "b"), "20240101_000000.json")
+    assert list(pack_elements(handler, "objects/20240102_000000.pack.gz")) == [element_hash(element("b"))]
+    index = json.loads(handler.read_file(f"{DOMAIN_DIR}/{OBJECT_INDEX}"))
+    assert index[element_hash(element("a"))] == "objects/20240101_000000.pack.gz"
+    assert index[element_hash(element("b"))] == "objects/20240102_000000.pack.gz"
+
+def test_plain_json_snapshots_still_read(handler):
+    handler.write_file(f"{DOMAIN_DIR}/20240101_000000.json", json.dumps(snapshot("a")))
+    assert SnapshotStore(handler).read(DOMAIN_DIR, "20240101_000000.json") == snapshot("a")
+    SnapshotStore(handler, content_addressed=False).write(DOMAIN_DIR, "20240102_000000", snapshot("b"), None)
+    assert json.loads(handler.read_file(f"{DOMAIN_DIR}/20240102_000000.json")) == snapshot("b")
+
+def test_migration_converts_and_dedupes(handler):
+    versions = [snapshot("a", "b"), snapshot("a"), snapshot("a", "b", "c")]
+    for day, data in enumerate(versions, 1):
+        handler.write_file(f"{DOMAIN_DIR}/202401{day:02d}_000000.json", json.dumps(data))
+    store = SnapshotStore(handler)
+    assert migrate_snapshots.migrate_domain(store, "example.com") == 3
+    for day, data in enumerate(versions, 1):
+        assert store.read(DOMAIN_DIR, f"202401{day:02d}_000000.json") == data
+    assert list(pack_elements(handler, "objects/20240103_000000.pack.gz")) == [element_hash(element("c"))]
+    assert migrate_snapshots.migrate_domain(store, "example.com") == 0